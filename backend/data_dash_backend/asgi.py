@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "data_dash_backend.settings")
 
 application = get_asgi_application()
+
+# Load the hot tier off the request path once the apps are ready
+from datavisualizer.hottier import warm_in_background  # noqa: E402
+
+warm_in_background()
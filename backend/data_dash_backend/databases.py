@@ -0,0 +1,68 @@
+"""Database profiles selected with DATABASE_PROFILE
+
+sqlite (the default) runs SQLite in WAL mode, where readers keep reading
+while the collector writes and only writers wait for each other.
+synchronous=NORMAL is durable in WAL mode except for the last
+transactions before a power loss, and the page cache and memory map keep
+the hot part of the time-series tables in memory. Transactions start
+IMMEDIATE so a writer takes its lock up front and waits out the busy
+timeout, instead of failing with "database is locked" when it tries to
+upgrade a read lock halfway through.
+
+postgres connects with the POSTGRES_* settings. Migration 0005 turns
+DataPoint into a table partitioned by month with a BRIN index on
+timestamp there; run the manage_partitions command (daily, say) to keep
+partitions ahead of the clock.
+
+Both profiles keep connections open for DATABASE_CONN_MAX_AGE seconds
+and check them before reuse.
+"""
+from decouple import config
+
+PROFILES = ['sqlite', 'postgres']
+
+
+def sqlite_profile(name):
+    """Settings for a SQLite database file tuned for concurrent ingest and reads"""
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)}",
+        # Negative sizes are in KiB
+        f"PRAGMA cache_size=-{config('SQLITE_CACHE_KB', default=64 * 1024, cast=int)}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': {
+            'init_command': '; '.join(pragmas),
+            'transaction_mode': 'IMMEDIATE',
+            # Seconds a connection waits for a lock before giving up
+            'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=float),
+        },
+    }
+
+
+def postgres_profile():
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config('POSTGRES_DB', default='data_dash'),
+        'USER': config('POSTGRES_USER', default='data_dash'),
+        'PASSWORD': config('POSTGRES_PASSWORD', default=''),
+        'HOST': config('POSTGRES_HOST', default='localhost'),
+        'PORT': config('POSTGRES_PORT', default='5432'),
+    }
+
+
+def database_profile(profile, sqlite_name):
+    """DATABASES['default'] for a profile name"""
+    if profile == 'sqlite':
+        database = sqlite_profile(sqlite_name)
+    elif profile == 'postgres':
+        database = postgres_profile()
+    else:
+        raise ValueError(f"Unknown DATABASE_PROFILE {profile!r}, expected one of {PROFILES}")
+    database['CONN_MAX_AGE'] = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+    database['CONN_HEALTH_CHECKS'] = True
+    return database
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from .databases import database_profile
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "datavisualizer.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -78,11 +80,12 @@ WSGI_APPLICATION = "data_dash_backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# 'sqlite' (WAL, tuned for the collector writing while the API reads) or 'postgres'
+# (partitioned DataPoint with BRIN indexes); see data_dash_backend/databases.py
+DATABASE_PROFILE = config('DATABASE_PROFILE', default='sqlite')
+
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_profile(DATABASE_PROFILE, BASE_DIR / "db.sqlite3"),
 }
 
 
@@ -133,7 +136,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'datavisualizer.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -152,8 +155,135 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = config('CORS_ALLOW_ALL_ORIGINS', default=True, cast=bool)
 
+# Server-Sent Events (/api/stream/, needs an ASGI server)
+REALTIME_POLL_INTERVAL = config('REALTIME_POLL_INTERVAL', default=0.5, cast=float)  # seconds between checks for new points
+REALTIME_QUEUE_SIZE = config('REALTIME_QUEUE_SIZE', default=100, cast=int)  # batches buffered per client before it must resync
+REALTIME_HEARTBEAT = config('REALTIME_HEARTBEAT', default=15, cast=int)  # seconds between keepalive comments
+
+# Delta cursor returned by chart_data, summary and datapoints for since= polling
+CORS_EXPOSE_HEADERS = ['X-Data-Cursor']
+
 # API Keys (reading from .env file)
 COINGECKO_API_KEY = config('COINGECKO_API_KEY', default='')
 ALPHA_VANTAGE_API_KEY = config('ALPHA_VANTAGE_API_KEY', default='')
 OPENWEATHER_API_KEY = config('OPENWEATHER_API_KEY', default='')
 EXCHANGE_RATE_API_KEY = config('EXCHANGE_RATE_API_KEY', default='')
+
+# Maximum number of concurrent requests per provider during a collection round
+PROVIDER_MAX_CONCURRENCY = {
+    'coingecko': config('COINGECKO_MAX_CONCURRENCY', default=2, cast=int),
+    'alphavantage': config('ALPHA_VANTAGE_MAX_CONCURRENCY', default=4, cast=int),
+    'openweather': config('OPENWEATHER_MAX_CONCURRENCY', default=8, cast=int),
+    'exchangerate': config('EXCHANGE_RATE_MAX_CONCURRENCY', default=2, cast=int),
+}
+
+# Bulk write path for collected data points
+INGEST_BATCH_SIZE = config('INGEST_BATCH_SIZE', default=500, cast=int)
+# 'ignore' keeps the stored row on a duplicate timestamp/source/symbol, 'update' overwrites it
+INGEST_CONFLICT_POLICY = config('INGEST_CONFLICT_POLICY', default='ignore')
+
+# Provider quotas enforced by a shared token bucket per provider.
+# Windows: per_second, per_minute, per_day; omit a window to leave it unlimited.
+PROVIDER_RATE_LIMITS = {
+    'coingecko': {'per_minute': config('COINGECKO_CALLS_PER_MINUTE', default=30, cast=int)},
+    'alphavantage': {
+        'per_minute': config('ALPHA_VANTAGE_CALLS_PER_MINUTE', default=5, cast=int),
+        'per_day': config('ALPHA_VANTAGE_CALLS_PER_DAY', default=25, cast=int),
+    },
+    'openweather': {
+        'per_minute': config('OPENWEATHER_CALLS_PER_MINUTE', default=60, cast=int),
+        'per_day': config('OPENWEATHER_CALLS_PER_DAY', default=1000, cast=int),
+    },
+    'exchangerate': {'per_minute': config('EXCHANGE_RATE_CALLS_PER_MINUTE', default=30, cast=int)},
+}
+# Longest a request waits for quota before the call is skipped for this round
+RATE_LIMIT_MAX_WAIT = config('RATE_LIMIT_MAX_WAIT', default=120, cast=int)
+
+# Outbound HTTP resilience for provider APIs
+HTTP_CONNECT_TIMEOUT = config('HTTP_CONNECT_TIMEOUT', default=5, cast=float)
+HTTP_READ_TIMEOUT = config('HTTP_READ_TIMEOUT', default=15, cast=float)
+HTTP_MAX_RETRIES = config('HTTP_MAX_RETRIES', default=2, cast=int)
+HTTP_BACKOFF_BASE = config('HTTP_BACKOFF_BASE', default=0.5, cast=float)
+HTTP_BACKOFF_CAP = config('HTTP_BACKOFF_CAP', default=8, cast=float)
+# Retry-After or backoff waits longer than this give up until the next round
+HTTP_MAX_RETRY_WAIT = config('HTTP_MAX_RETRY_WAIT', default=30, cast=float)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = config('CIRCUIT_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+CIRCUIT_BREAKER_RESET_TIMEOUT = config('CIRCUIT_BREAKER_RESET_TIMEOUT', default=60, cast=float)
+# Skip points whose value and provider update marker match the last stored point
+INGEST_SKIP_UNCHANGED = config('INGEST_SKIP_UNCHANGED', default=True, cast=bool)
+# Compact Series/SeriesPoint schema (datavisualizer/compactstore.py): 'off', 'write'
+# (also write it, while migrate_compact_storage backfills) or 'read' (serve range scans from it)
+COMPACT_STORAGE = config('COMPACT_STORAGE', default='off')
+
+# Django cache, shared by the web server and the collector unless it is 'locmem'
+# ('locmem', 'file' or 'redis'; CACHE_LOCATION is the directory or redis:// URL).
+# The response cache relies on it being shared and is bypassed with 'locmem'.
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CACHES = {
+    'default': {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'redis': 'django.core.cache.backends.redis.RedisCache',
+        }[CACHE_BACKEND],
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache') if CACHE_BACKEND == 'file' else ''),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    }
+}
+# Tests run against a temporary file cache instead of the shared one above
+TEST_RUNNER = 'data_dash_backend.test_runner.TestRunner'
+
+# Response compression: brotli (when installed) or gzip, per Accept-Encoding
+BROTLI_QUALITY = config('BROTLI_QUALITY', default=5, cast=int)
+
+# Versioned cache for summary and chart_data responses
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+RESPONSE_CACHE_TTL = config('RESPONSE_CACHE_TTL', default=60, cast=int)
+# Longest one worker may hold a cold key while others wait for it
+RESPONSE_CACHE_LOCK_TIMEOUT = config('RESPONSE_CACHE_LOCK_TIMEOUT', default=10, cast=int)
+
+# Cache for upstream provider responses ('memory' or 'file')
+HTTP_CACHE_BACKEND = config('HTTP_CACHE_BACKEND', default='memory')
+HTTP_CACHE_DIR = config('HTTP_CACHE_DIR', default=str(BASE_DIR / 'http_cache'))
+HTTP_CACHE_MAX_ENTRIES = config('HTTP_CACHE_MAX_ENTRIES', default=1000, cast=int)
+# How long past its TTL an entry may be served while it is refreshed in the background
+HTTP_CACHE_STALE_WHILE_REVALIDATE = config('HTTP_CACHE_STALE_WHILE_REVALIDATE', default=300, cast=int)
+# Per-endpoint TTL overrides in seconds, e.g. {'exchangerate': {'latest': 7200}}
+HTTP_CACHE_TTLS = {}
+
+# Alert evaluation on ingested points
+ALERTS_ENABLED = config('ALERTS_ENABLED', default=True, cast=bool)
+# Percent-change conditions compare against the oldest point in this window (seconds)
+ALERT_CHANGE_WINDOW = config('ALERT_CHANGE_WINDOW', default=24 * 60 * 60, cast=int)
+# Seconds an alert stays quiet after firing
+ALERT_COOLDOWN = config('ALERT_COOLDOWN', default=60 * 60, cast=int)
+# Seconds between re-reading active alerts, as alerts may be edited by another process
+ALERT_RELOAD_INTERVAL = config('ALERT_RELOAD_INTERVAL', default=60, cast=int)
+# Where notifications go: dotted paths of classes with a send(notifications) method.
+# Add datavisualizer.alerts.EmailSink to mail alerts that have an address, through
+# Django's EMAIL_* settings (EMAIL_HOST, EMAIL_PORT, DEFAULT_FROM_EMAIL, ...)
+ALERT_SINKS = config('ALERT_SINKS', default='datavisualizer.alerts.LogSink', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+
+# In-process hot tier serving recent windows from memory (datavisualizer/hottier.py)
+HOT_TIER_ENABLED = config('HOT_TIER_ENABLED', default=True, cast=bool)
+# Points kept per series, 16 bytes each, and the hours loaded at warm-up
+HOT_TIER_CAPACITY = config('HOT_TIER_CAPACITY', default=4096, cast=int)
+HOT_TIER_HOURS = config('HOT_TIER_HOURS', default=24, cast=int)
+# Seconds between looking for rows inserted by other processes, and between full reloads
+HOT_TIER_REFRESH_INTERVAL = config('HOT_TIER_REFRESH_INTERVAL', default=1.0, cast=float)
+HOT_TIER_RESYNC_INTERVAL = config('HOT_TIER_RESYNC_INTERVAL', default=600, cast=int)
+
+# Retention per source type, in days per tier ('raw' is DataPoint rows, the rest are
+# Rollup intervals; None keeps a tier forever). Source types without an entry use 'default'.
+DATA_RETENTION = {
+    'default': {
+        'raw': config('RETENTION_RAW_DAYS', default=7, cast=int),
+        '1m': config('RETENTION_1M_DAYS', default=7, cast=int),
+        '5m': config('RETENTION_5M_DAYS', default=90, cast=int),
+        '1h': config('RETENTION_1H_DAYS', default=365, cast=int),
+        '1d': None,
+    },
+}
+# Rows deleted per transaction by compact_data, keeping write locks short
+DATA_RETENTION_CHUNK_SIZE = config('DATA_RETENTION_CHUNK_SIZE', default=5000, cast=int)
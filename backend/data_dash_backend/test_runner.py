@@ -0,0 +1,32 @@
+import shutil
+import tempfile
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the suite against a throwaway file cache
+
+    The configured cache is shared with the running web server and
+    collector, and tests fill and clear it, so each run gets an empty
+    directory of its own. It stays file based because the response cache
+    is bypassed on locmem.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='data-dash-test-cache-')
+        self.cache_settings = override_settings(CACHES={
+            'default': {
+                **settings.CACHES['default'],
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.cache_dir,
+            },
+        })
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
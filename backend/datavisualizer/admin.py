@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DataPoint, DataSource, Alert
+from .models import DataPoint, DataSource, Alert, LatestValue, Rollup, Series
 
 
 @admin.register(DataPoint)
@@ -14,6 +14,32 @@ class DataPointAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related()
 
 
+@admin.register(LatestValue)
+class LatestValueAdmin(admin.ModelAdmin):
+    list_display = ['source_type', 'symbol', 'value', 'timestamp', 'data_points']
+    list_filter = ['source_type']
+    search_fields = ['symbol']
+    ordering = ['source_type', 'symbol']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Rollup)
+class RollupAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'interval', 'source_type', 'symbol', 'open', 'high', 'low', 'close', 'count']
+    list_filter = ['interval', 'source_type']
+    search_fields = ['symbol']
+    ordering = ['-bucket']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Series)
+class SeriesAdmin(admin.ModelAdmin):
+    list_display = ['source_type', 'symbol', 'attributes']
+    list_filter = ['source_type']
+    search_fields = ['symbol']
+    ordering = ['source_type', 'symbol']
+
+
 @admin.register(DataSource)
 class DataSourceAdmin(admin.ModelAdmin):
     list_display = ['name', 'source_type', 'is_active', 'update_interval_minutes', 'last_updated']
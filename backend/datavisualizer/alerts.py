@@ -0,0 +1,300 @@
+"""Inline evaluation of user alerts against newly ingested points
+
+Alerts fire when a series crosses their threshold, not on every point
+beyond it. Active alerts are indexed per (source_type, symbol) in sorted
+threshold arrays, one per condition, so checking a new point is a pair of
+bisects returning exactly the thresholds between the previous and the new
+value. ``below`` and ``change_down`` are evaluated on the negated value or
+change, which turns every condition into the same "crossed upward" range
+query. ``change_down`` thresholds are drop sizes, so only ``below``
+thresholds are negated too.
+
+Percent change is measured against the oldest point inside
+ALERT_CHANGE_WINDOW, kept per series in a deque that is appended to and
+trimmed as points arrive. Each alert then stays quiet for ALERT_COOLDOWN
+seconds after firing. Notifications of one batch are handed to the
+configured sinks together and last_triggered is saved in one query.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+from .models import Alert, DataPoint
+
+logger = logging.getLogger(__name__)
+
+# Conditions evaluated on the negated quantity, so they too fire on an upward crossing
+NEGATED = {'below', 'change_down'}
+# change_down 5 means a drop of 5%, so unlike below its threshold keeps its sign
+NEGATED_THRESHOLDS = {'below'}
+CHANGE_CONDITIONS = {'change_up', 'change_down'}
+
+
+class LogSink:
+    """Writes notifications to the log"""
+
+    def send(self, notifications):
+        for notification in notifications:
+            logger.warning(
+                f"Alert {notification['alert']}: {notification['symbol']} {notification['condition']} "
+                f"{notification['threshold']} (value {notification['value']}, change {notification['change']})"
+            )
+
+
+class MemorySink:
+    """Keeps notifications in memory; a local stand-in for a real delivery channel"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, notifications):
+        self.sent.extend(notifications)
+
+
+class EmailSink:
+    """Emails alerts that have an address, over one connection per batch"""
+
+    def send(self, notifications):
+        messages = [
+            EmailMessage(
+                subject=f"{notification['symbol']} {notification['condition']} {notification['threshold']}",
+                body=f"{notification['symbol']} is at {notification['value']} ({notification['timestamp']:%Y-%m-%d %H:%M} UTC)",
+                to=[notification['email']],
+            )
+            for notification in notifications if notification['email']
+        ]
+        if messages:
+            get_connection().send_messages(messages)
+
+
+class ThresholdIndex:
+    """Sorted thresholds of one condition on one series"""
+
+    def __init__(self, entries):
+        """entries: (threshold, alert id) pairs in any order"""
+        entries = sorted(entries)
+        self.thresholds = [threshold for threshold, _ in entries]
+        self.alerts = [alert_id for _, alert_id in entries]
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def crossed(self, previous, current):
+        """Alerts whose threshold t satisfies previous <= t < current"""
+        if current <= previous:
+            return []
+        low = bisect_left(self.thresholds, previous)
+        high = bisect_left(self.thresholds, current, low)
+        return self.alerts[low:high]
+
+
+class SeriesState:
+    """Last evaluated value, change and change window of one series"""
+
+    def __init__(self, points, window):
+        self.window = window
+        self.points = deque(points)
+        self.timestamp, self.value = self.points[-1] if self.points else (None, None)
+        self.change = self._change()
+
+    def _change(self):
+        reference = self.points[0][1] if self.points else 0
+        if not reference or self.value is None:
+            return None
+        return (self.value - reference) / abs(reference) * 100
+
+    def advance(self, timestamp, value):
+        self.points.append((timestamp, value))
+        cutoff = timestamp - self.window
+        while self.points[0][0] < cutoff:
+            self.points.popleft()
+        self.timestamp, self.value = timestamp, value
+        self.change = self._change()
+
+
+class AlertEngine:
+    """Evaluates ingested points against every active alert of this process
+
+    The index is rebuilt from the database every reload_interval seconds and
+    straight away when an Alert is saved or deleted in this process.
+    """
+
+    def __init__(self, sinks=None, cooldown=None, change_window=None, reload_interval=None, clock=time.monotonic):
+        self.sinks = sinks if sinks is not None else [import_string(path)() for path in settings.ALERT_SINKS]
+        self.cooldown = timedelta(seconds=settings.ALERT_COOLDOWN if cooldown is None else cooldown)
+        self.change_window = timedelta(seconds=change_window or settings.ALERT_CHANGE_WINDOW)
+        self.reload_interval = settings.ALERT_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        self.clock = clock
+
+        # (source_type, symbol) -> {condition: ThresholdIndex}
+        self.index = {}
+        # alert id -> (source_type, symbol, condition, threshold, email)
+        self.alerts = {}
+        self.last_fired = {}
+        self.series = {}
+        self._next_reload = 0
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        self._next_reload = 0
+
+    def load(self):
+        entries = {}
+        alerts = {}
+        last_fired = {}
+        rows = Alert.objects.filter(is_active=True).values_list(
+            'id', 'source_type', 'symbol', 'condition', 'threshold_value', 'email', 'last_triggered'
+        )
+        for pk, source_type, symbol, condition, threshold, email, last_triggered in rows.iterator(chunk_size=10000):
+            threshold = float(threshold)
+            entries.setdefault((source_type, symbol, condition), []).append(
+                (-threshold if condition in NEGATED_THRESHOLDS else threshold, pk)
+            )
+            alerts[pk] = (source_type, symbol, condition, threshold, email)
+            if last_triggered:
+                last_fired[pk] = last_triggered
+
+        index = {}
+        for (source_type, symbol, condition), pairs in entries.items():
+            index.setdefault((source_type, symbol), {})[condition] = ThresholdIndex(pairs)
+
+        with self._lock:
+            self.index, self.alerts, self.last_fired = index, alerts, last_fired
+            # Series nobody watches any more need no state
+            self.series = {key: state for key, state in self.series.items() if key in index}
+            self._next_reload = self.clock() + self.reload_interval
+        logger.debug(f"Loaded {len(alerts)} active alerts on {len(index)} series")
+
+    def _state(self, key, timestamp):
+        state = self.series.get(key)
+        if state is None:
+            source_type, symbol = key
+            points = DataPoint.objects.filter(
+                source_type=source_type,
+                symbol=symbol,
+                timestamp__gte=timestamp - self.change_window,
+                timestamp__lt=timestamp,
+            ).order_by('timestamp').values_list('timestamp', 'value')
+            state = self.series[key] = SeriesState(
+                [(ts, float(value)) for ts, value in points], self.change_window
+            )
+        return state
+
+    def process(self, points):
+        """Evaluate (source_type, symbol, timestamp, value) tuples; returns notifications sent
+
+        Points older than the last one seen for their series (backfills,
+        re-sent duplicates) update nothing and fire nothing.
+        """
+        if self.clock() >= self._next_reload:
+            self.load()
+
+        notifications = []
+        with self._lock:
+            for source_type, symbol, timestamp, value in sorted(points, key=lambda point: point[2]):
+                conditions = self.index.get((source_type, symbol))
+                if conditions is None:
+                    continue
+                state = self._state((source_type, symbol), timestamp)
+                if state.timestamp is not None and timestamp <= state.timestamp:
+                    continue
+
+                previous_value, previous_change = state.value, state.change
+                value = float(value)
+                state.advance(timestamp, value)
+                if previous_value is None:
+                    continue
+
+                for condition, thresholds in conditions.items():
+                    if condition in CHANGE_CONDITIONS:
+                        if previous_change is None or state.change is None:
+                            continue
+                        previous, current = previous_change, state.change
+                    else:
+                        previous, current = previous_value, value
+                    if condition in NEGATED:
+                        previous, current = -previous, -current
+                    for pk in thresholds.crossed(previous, current):
+                        if self._cooling_down(pk, timestamp):
+                            continue
+                        self.last_fired[pk] = timestamp
+                        notifications.append(self._notification(pk, timestamp, value, state.change))
+
+        if notifications:
+            self._dispatch(notifications)
+        return notifications
+
+    def _cooling_down(self, pk, timestamp):
+        last = self.last_fired.get(pk)
+        return last is not None and timestamp - last < self.cooldown
+
+    def _notification(self, pk, timestamp, value, change):
+        source_type, symbol, condition, threshold, email = self.alerts[pk]
+        return {
+            'alert': pk,
+            'source_type': source_type,
+            'symbol': symbol,
+            'condition': condition,
+            'threshold': threshold,
+            'value': value,
+            'change': change,
+            'timestamp': timestamp,
+            'email': email,
+        }
+
+    def _dispatch(self, notifications):
+        fired = {}
+        for notification in notifications:
+            fired[notification['alert']] = notification['timestamp']
+        # Group by time so a batch costs one UPDATE per distinct timestamp
+        by_time = {}
+        for pk, timestamp in fired.items():
+            by_time.setdefault(timestamp, []).append(pk)
+        for timestamp, pks in by_time.items():
+            Alert.objects.filter(id__in=pks).update(last_triggered=timestamp)
+
+        for sink in self.sinks:
+            try:
+                sink.send(notifications)
+            except Exception as e:
+                logger.error(f"Alert sink {type(sink).__name__} failed: {e}")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine():
+    """Return the process-wide alert engine configured in settings"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine()
+        return _engine
+
+
+def evaluate_alerts(points):
+    """Run ingested (source_type, symbol, timestamp, value) tuples through the alert engine"""
+    if not settings.ALERTS_ENABLED:
+        return []
+    try:
+        return get_alert_engine().process(points)
+    except Exception as e:
+        # Alerting must never break ingestion
+        logger.error(f"Alert evaluation failed: {e}")
+        return []
+
+
+def _alerts_changed(sender, **kwargs):
+    if _engine is not None:
+        _engine.invalidate()
+
+
+post_save.connect(_alerts_changed, sender=Alert, dispatch_uid='alerts_changed_save')
+post_delete.connect(_alerts_changed, sender=Alert, dispatch_uid='alerts_changed_delete')
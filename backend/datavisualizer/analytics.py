@@ -0,0 +1,222 @@
+"""Vectorized statistics over many series on a common time grid
+
+load_grid() reads the rollup averages of every requested series at one
+interval in a single query and places them in an (series x buckets)
+float array, NaN where a series has no bucket. Because rollups are
+maintained by ingestion, a month of hourly buckets for hundreds of
+series is a few hundred thousand rows however many raw points there are.
+Everything else works on whole arrays at once: nothing loops over series
+or buckets in Python.
+
+Empty buckets are filled with the series' previous value before returns
+are taken, so a series that did not trade over a gap shows a zero
+return there rather than breaking every window that spans it.
+"""
+from datetime import timezone as dt_timezone
+import numpy as np
+from django.db import connections
+from django.db.models import CharField, F, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Rollup
+from .rollups import INTERVALS, bucket_start
+from .timeseries import time_axis
+
+# Upper bound for the buckets of one analytics request
+MAX_BUCKETS = 10000
+
+# Default grids use the finest interval giving at most this many buckets
+TARGET_BUCKETS = 1000
+
+# Fewest overlapping returns a correlation is computed from
+MIN_CORRELATION_PERIODS = 3
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+
+def default_interval(start, end):
+    """Finest rollup interval covering start..end in at most TARGET_BUCKETS buckets"""
+    seconds = (end - start).total_seconds()
+    for interval, width in INTERVALS.items():
+        if seconds / width <= TARGET_BUCKETS:
+            return interval
+    return list(INTERVALS)[-1]
+
+
+def bucket_count(start, end, interval):
+    first = bucket_start(start, interval)
+    return int((end - first).total_seconds() // INTERVALS[interval]) + 1
+
+
+def load_grid(start, end, interval, source_type=None, symbols=None):
+    """Bucket averages of every matching series on one time grid, from one query
+
+    Returns (keys, axis, values): keys are the (source_type, symbol)
+    series in sorted order, axis the bucket starts and values a
+    len(keys) x len(axis) float64 array with NaN for empty buckets.
+    """
+    first = bucket_start(start, interval)
+    width = INTERVALS[interval]
+    axis = time_axis(start, end, interval)
+
+    rollups = Rollup.objects.filter(interval=interval, bucket__gte=first, bucket__lte=end)
+    if source_type:
+        rollups = rollups.filter(source_type=source_type)
+    if symbols:
+        rollups = rollups.filter(symbol__in=symbols)
+    # Averaged in the database so rows arrive as floats rather than Decimals, and buckets
+    # as text: converting every row to an aware datetime would cost more than the query,
+    # when the same few hundred buckets repeat for every series. The compiled query runs
+    # on a plain cursor, skipping the ORM's per-row converters.
+    rows = rollups.values_list(
+        'source_type', 'symbol', Cast('bucket', CharField()), Cast('total', FloatField()) / F('count')
+    )
+    sql, params = rows.query.sql_with_params()
+    with connections[rows.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    index = {}
+    columns = {}
+    source_types, row_symbols, buckets, averages = zip(*rows) if rows else ((), (), (), ())
+    series = [index.setdefault(key, len(index)) for key in zip(source_types, row_symbols)]
+    for bucket in set(buckets):
+        moment = parse_datetime(bucket)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, dt_timezone.utc)
+        columns[bucket] = int((moment - first).total_seconds() // width)
+
+    keys = sorted(index)
+    # Row of each series in sorted order
+    order = np.empty(len(index), dtype=np.intp)
+    order[[index[key] for key in keys]] = np.arange(len(keys))
+
+    values = np.full((len(keys), len(axis)), np.nan)
+    if averages:
+        rows = order[np.array(series, dtype=np.intp)]
+        values[rows, [columns[bucket] for bucket in buckets]] = np.array(averages, dtype=np.float64)
+    return keys, axis, values
+
+
+def fill_forward(values):
+    """Carry each series' last value across empty buckets; leading gaps stay NaN"""
+    present = ~np.isnan(values)
+    last = np.where(present, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return np.take_along_axis(values, last, axis=1)
+
+
+def rolling_mean_std(values, window):
+    """Mean and sample standard deviation over trailing windows of buckets
+
+    Both are NaN until a window holds window values. Running sums are
+    taken relative to each series' first value, which keeps the variance
+    accurate for large prices.
+    """
+    rows, columns = values.shape
+    mean = np.full((rows, columns), np.nan)
+    std = np.full((rows, columns), np.nan)
+    if window > columns:
+        return mean, std
+
+    present = ~np.isnan(values)
+    origin = values[np.arange(rows), present.argmax(axis=1)][:, None]
+    centred = np.where(present, values - origin, 0.0)
+
+    def window_sums(a):
+        sums = np.zeros((rows, columns + 1))
+        np.cumsum(a, axis=1, out=sums[:, 1:])
+        return sums[:, window:] - sums[:, :-window]
+
+    counts = window_sums(present.astype(np.float64))
+    total = window_sums(centred)
+    squares = window_sums(centred * centred)
+    full = counts == window
+
+    variance = np.maximum((squares - total * total / window) / (window - 1), 0.0)
+    mean[:, window - 1:] = np.where(full, total / window + origin, np.nan)
+    std[:, window - 1:] = np.where(full, np.sqrt(variance), np.nan)
+    return mean, std
+
+
+def returns(values):
+    """Simple returns from each bucket to the next, NaN for the first bucket and undefined ones"""
+    result = np.full(values.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[:, 1:] = values[:, 1:] / values[:, :-1] - 1
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def nan_std(values):
+    """Sample standard deviation of each row ignoring NaN, NaN with fewer than two values"""
+    present = ~np.isnan(values)
+    counts = present.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(present, values, 0.0).sum(axis=1) / counts
+        deviations = np.where(present, values - mean[:, None], 0.0)
+        std = np.sqrt((deviations * deviations).sum(axis=1) / (counts - 1))
+    std[counts < 2] = np.nan
+    return std
+
+
+def drawdown(values):
+    """Fall from the running peak as a fraction of it, for positive series such as prices"""
+    peak = np.fmax.accumulate(values, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(peak > 0, values / peak - 1, np.nan)
+    return result
+
+
+def total_return(values):
+    """Return from each series' first to its last value"""
+    present = ~np.isnan(values)
+    rows = np.arange(values.shape[0])
+    first = values[rows, present.argmax(axis=1)]
+    last = values[rows, values.shape[1] - 1 - present[:, ::-1].argmax(axis=1)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = last / first - 1
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def annualization(interval):
+    """Factor turning the volatility of interval returns into an annual one"""
+    return np.sqrt(SECONDS_PER_YEAR / INTERVALS[interval])
+
+
+def correlation(values, min_periods=MIN_CORRELATION_PERIODS):
+    """Pearson correlation matrix of the rows of values over their common buckets
+
+    Each pair is correlated over the buckets where both have a value, as
+    pandas does, but with a handful of matrix products instead of a loop
+    over pairs. Pairs with fewer than min_periods common values or no
+    variance are NaN.
+    """
+    present = ~np.isnan(values)
+    mask = present.astype(np.float64)
+    x = np.where(present, values, 0.0)
+
+    # [i, j] sums run over the buckets where both i and j have a value
+    n = mask @ mask.T
+    sum_x = x @ mask.T
+    sum_xx = (x * x) @ mask.T
+    sum_xy = x @ x.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sum_xy - sum_x * sum_x.T / n
+        variance_x = sum_xx - sum_x * sum_x / n
+        variance_y = sum_xx.T - sum_x.T * sum_x.T / n
+        result = covariance / np.sqrt(variance_x * variance_y)
+    result[(n < min_periods) | ~np.isfinite(result)] = np.nan
+    np.clip(result, -1.0, 1.0, out=result)
+    diagonal = np.diagonal(result).copy()
+    np.fill_diagonal(result, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return result
+
+
+def to_list(values):
+    """Nested lists of Python floats with None for NaN, ready for JSON"""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
@@ -0,0 +1,63 @@
+"""Async actions on DRF viewsets
+
+DRF dispatches synchronously. Under ASGI that means every request to a
+viewset holds a worker thread from the first middleware to the rendered
+response. AsyncViewSetMixin lets a viewset declare ``async def``
+actions: a route whose actions are all coroutines is served by an async
+copy of APIView.dispatch, so the request only occupies a thread while
+the async ORM runs its queries. Routes with synchronous actions keep
+DRF's own dispatch.
+
+Authentication is the one step of dispatch that may hit the database
+(session lookups), so with authentication classes configured it runs
+in a thread; viewsets serving public data can set
+authentication_classes = [] to skip it.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+
+class AsyncViewSetMixin:
+    """Serves routes whose actions are all ``async def`` asynchronously"""
+
+    async_dispatch = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        is_async = bool(actions) and all(iscoroutinefunction(getattr(cls, name)) for name in actions.values())
+        view = super().as_view(actions, async_dispatch=is_async, **initkwargs)
+        if is_async:
+            markcoroutinefunction(view)
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.async_dispatch:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch, awaiting the handler"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            if self.authentication_classes:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+            else:
+                self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if iscoroutinefunction(handler):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,66 @@
+from django.db import connection, models
+from django.db.models.constants import OnConflict
+
+INSERT_BATCH_SIZE = 1000
+
+
+# Distinct datetimes remembered per column; bulk loads repeat them a lot (bucket starts, now())
+DATETIME_CACHE_SIZE = 100000
+
+
+def _adapter(field):
+    """Fastest correct python -> driver conversion for one field"""
+    ops = connection.ops
+    if isinstance(field, models.DateTimeField):
+        cache = {}
+
+        def adapt_datetime(value):
+            adapted = cache.get(value)
+            if adapted is None:
+                if len(cache) >= DATETIME_CACHE_SIZE:
+                    cache.clear()
+                adapted = cache[value] = ops.adapt_datetimefield_value(value)
+            return adapted
+        return adapt_datetime
+    if isinstance(field, models.DecimalField):
+        return lambda value: ops.adapt_decimalfield_value(value, field.max_digits, field.decimal_places)
+    if isinstance(field, (models.CharField, models.IntegerField)):
+        # Drivers take str and int as they are
+        return lambda value: value
+    return lambda value: field.get_db_prep_save(value, connection)
+
+
+def insert_rows(model, fields, rows, ignore_conflicts=False, batch_size=INSERT_BATCH_SIZE):
+    """Insert tuples of field values with executemany, bypassing the ORM compiler
+
+    For bulk loads where bulk_create's per-value SQL compilation dominates.
+    Values must already be valid for their fields: no defaults, auto_now or
+    validation are applied. With ignore_conflicts, rows that violate a
+    unique constraint are skipped. Returns the number of rows submitted.
+    """
+    field_objs = [model._meta.get_field(name) for name in fields]
+    adapters = [_adapter(field) for field in field_objs]
+    ops = connection.ops
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(on_conflict=on_conflict),
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in field_objs),
+        ', '.join(['%s'] * len(field_objs)),
+        ops.on_conflict_suffix_sql(field_objs, on_conflict, None, None),
+    ).strip()
+
+    submitted = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append([adapt(value) for adapt, value in zip(adapters, row)])
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                submitted += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            submitted += len(batch)
+    return submitted
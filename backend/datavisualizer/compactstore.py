@@ -0,0 +1,228 @@
+"""Compact storage schema: a Series dimension table and narrow SeriesPoint rows
+
+DataPoint repeats the source type, symbol and a JSON metadata blob on
+every row, and keeps the value as a decimal. SeriesPoint stores a series
+id, a timestamp, a float value and the numeric metrics providers send as
+nullable float columns; metadata that is fixed per series goes to
+Series.attributes once. Text and bookkeeping metadata (a weather
+description, the provider's update marker) is not kept.
+
+COMPACT_STORAGE moves an installation over in steps:
+
+    off    DataPoint only (the default)
+    write  every write also goes to SeriesPoint; backfill the history
+           with the migrate_compact_storage command meanwhile
+    read   range scans (charts, series batches) read SeriesPoint too
+
+DataPoint stays the row-per-point source of the list, export and delta
+endpoints, so API output does not change. Values come back as decimals
+rounded to DataPoint's 8 places, which is exact for values below about
+10^7.
+"""
+import logging
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from .bulk import insert_rows
+from .models import DataPoint, Series, SeriesPoint
+
+logger = logging.getLogger(__name__)
+
+OFF = 'off'
+WRITE = 'write'
+READ = 'read'
+MODES = [OFF, WRITE, READ]
+
+# Metadata keys kept as SeriesPoint columns
+METRIC_COLUMNS = ['market_cap', 'volume_24h', 'change_24h', 'change', 'change_percent', 'humidity', 'pressure']
+# Metadata keys that describe the series rather than the point
+STATIC_ATTRIBUTES = ['base', 'target']
+
+POINT_INSERT_FIELDS = ['series', 'timestamp', 'value'] + METRIC_COLUMNS
+STREAM_CHUNK_SIZE = 2000
+BACKFILL_CHUNK_SIZE = 10000
+
+
+def _mode():
+    mode = getattr(settings, 'COMPACT_STORAGE', OFF)
+    if mode not in MODES:
+        raise ValueError(f"Unknown COMPACT_STORAGE mode: {mode}")
+    return mode
+
+
+def writes_enabled():
+    return _mode() != OFF
+
+
+def reads_enabled():
+    return _mode() == READ
+
+
+def _number(value):
+    """Metadata value as a float, or None; tolerates '1.5%' and empty strings"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(str(value).rstrip('%'))
+    except ValueError:
+        return None
+
+
+def split_metadata(metadata):
+    """(metric column values, static attributes) of one point's metadata"""
+    metadata = metadata or {}
+    metrics = [_number(metadata.get(column)) for column in METRIC_COLUMNS]
+    attributes = {key: metadata[key] for key in STATIC_ATTRIBUTES if metadata.get(key) is not None}
+    return metrics, attributes
+
+
+def existing_series_ids(series):
+    """{(source_type, symbol): Series id} of the keys that have a Series row"""
+    rows = Series.objects.filter(
+        source_type__in={source_type for source_type, _ in series},
+        symbol__in={symbol for _, symbol in series},
+    ).values_list('source_type', 'symbol', 'id')
+    return {(source_type, symbol): pk for source_type, symbol, pk in rows if (source_type, symbol) in series}
+
+
+def series_ids(series):
+    """{(source_type, symbol): Series id}, creating missing series
+
+    series maps keys to the attributes stored for series that are new.
+    """
+    ids = existing_series_ids(series)
+    missing = [key for key in series if key not in ids]
+    if missing:
+        Series.objects.bulk_create(
+            [Series(source_type=key[0], symbol=key[1], attributes=series[key]) for key in missing],
+            ignore_conflicts=True,
+        )
+        ids = existing_series_ids(series)
+    return ids
+
+
+def _decimal(value):
+    return Decimal(f"{value:.8f}")
+
+
+def write_points(objs, update=False):
+    """Mirror DataPoint objects (before or after saving) into SeriesPoint
+
+    With update an existing (series, timestamp) row takes the new value and
+    metrics, matching DataPointWriter's update conflict policy; otherwise
+    it wins.
+    """
+    series = {}
+    for obj in objs:
+        series.setdefault((obj.source_type, obj.symbol), split_metadata(obj.metadata)[1])
+    ids = series_ids(series)
+
+    points = []
+    for obj in objs:
+        metrics, _ = split_metadata(obj.metadata)
+        points.append(SeriesPoint(
+            series_id=ids[(obj.source_type, obj.symbol)],
+            timestamp=obj.timestamp,
+            value=float(obj.value),
+            **dict(zip(METRIC_COLUMNS, metrics)),
+        ))
+    if update:
+        SeriesPoint.objects.bulk_create(
+            points,
+            update_conflicts=True,
+            unique_fields=['series', 'timestamp'],
+            update_fields=['value'] + METRIC_COLUMNS,
+        )
+    else:
+        SeriesPoint.objects.bulk_create(points, ignore_conflicts=True)
+    return len(points)
+
+
+def insert_records(records):
+    """Bulk insert (timestamp, source_type, symbol, value, metadata) tuples, ignoring conflicts"""
+    records = list(records)
+    if not records:
+        return 0
+    ids = series_ids({
+        (source_type, symbol): split_metadata(metadata)[1] for _, source_type, symbol, _, metadata in records
+    })
+    rows = (
+        (ids[(source_type, symbol)], timestamp, float(value), *split_metadata(metadata)[0])
+        for timestamp, source_type, symbol, value, metadata in records
+    )
+    return insert_rows(SeriesPoint, POINT_INSERT_FIELDS, rows, ignore_conflicts=True)
+
+
+def backfill(after=0, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Copy DataPoint rows with an id above after into SeriesPoint, in id order
+
+    Yields the last copied id after each chunk, which is where an
+    interrupted backfill resumes. Rows already mirrored are left alone, so
+    running it while writes go to both schemas is safe.
+    """
+    while True:
+        rows = list(
+            DataPoint.objects.filter(id__gt=after).order_by('id')
+            .values_list('id', 'timestamp', 'source_type', 'symbol', 'value', 'metadata')[:chunk_size]
+        )
+        if not rows:
+            return
+        with transaction.atomic():
+            insert_records(row[1:] for row in rows)
+        after = rows[-1][0]
+        logger.debug(f"Backfilled compact storage up to DataPoint {after}")
+        yield after
+
+
+def _scope(source_type=None, symbol=None):
+    """{Series id: symbol} of the series a reader filtering this way sees"""
+    rows = Series.objects.all()
+    if source_type:
+        rows = rows.filter(source_type=source_type)
+    if symbol:
+        rows = rows.filter(symbol=symbol)
+    return dict(rows.values_list('id', 'symbol'))
+
+
+def oldest_timestamp(source_type=None, symbol=None):
+    scope = _scope(source_type, symbol)
+    if not scope:
+        return None
+    return SeriesPoint.objects.filter(series_id__in=scope).order_by('timestamp').values_list(
+        'timestamp', flat=True
+    ).first()
+
+
+def points(start, end, source_type=None, symbol=None):
+    """Yield (timestamp, value, symbol) in time order, like DataPoint rows"""
+    scope = _scope(source_type, symbol)
+    if not scope:
+        return
+    rows = SeriesPoint.objects.filter(
+        series_id__in=scope, timestamp__gte=start, timestamp__lte=end
+    ).order_by('timestamp').values_list('timestamp', 'value', 'series_id')
+    for timestamp, value, series_id in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield timestamp, _decimal(value), scope[series_id]
+
+
+def batch_points(series, start, end):
+    """{(source_type, symbol): [(timestamp, value)]} for several series in one range query"""
+    ids = {pk: key for key, pk in existing_series_ids(series).items()}
+    points = {key: [] for key in series}
+    rows = SeriesPoint.objects.filter(
+        series_id__in=ids, timestamp__gte=start, timestamp__lte=end
+    ).order_by('timestamp').values_list('series_id', 'timestamp', 'value')
+    for series_id, timestamp, value in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        points[ids[series_id]].append((timestamp, _decimal(value)))
+    return points
+
+
+def delete_before(source_type, cutoff, chunk_size):
+    """Delete one chunk of source_type points older than cutoff; returns how many"""
+    ids = list(
+        SeriesPoint.objects.filter(series__source_type=source_type, timestamp__lt=cutoff)
+        .order_by('timestamp').values_list('id', flat=True)[:chunk_size]
+    )
+    if ids:
+        SeriesPoint.objects.filter(id__in=ids).delete()
+    return len(ids)
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def parse_pair(symbol, default_base):
+    """Split 'EUR-GBP' into ('EUR', 'GBP'); a bare 'EUR' is quoted against default_base"""
+    if '-' in symbol:
+        base, target = symbol.split('-', 1)
+        return base.upper(), target.upper()
+    return default_base.upper(), symbol.upper()
+
+
+class CrossRateMatrix:
+    """Cross rates between every currency quoted in one base-currency document
+
+    A ``/latest/<base>`` payload gives units of each currency per one unit of
+    base. The rate from any currency A to any currency B is then
+    rates[B] / rates[A], so one download is enough for every pair. Rates are
+    held in a single float array and pairs are computed with vectorised
+    indexing rather than per-pair Python arithmetic.
+    """
+
+    def __init__(self, base, rates):
+        base = base.upper()
+        quoted = {code.upper(): float(rate) for code, rate in rates.items() if rate and float(rate) > 0}
+        quoted[base] = 1.0
+
+        self.base = base
+        self.codes = sorted(quoted)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.rates = np.array([quoted[code] for code in self.codes], dtype=np.float64)
+
+    def pair_rates(self, pairs):
+        """Rates for a list of (base, target) pairs; unknown currencies are skipped
+
+        Returns the list of pairs that could be priced and a float array of
+        their rates in the same order.
+        """
+        known = [(base, target) for base, target in pairs if base in self.index and target in self.index]
+        if not known:
+            return [], np.empty(0)
+
+        bases = np.fromiter((self.index[base] for base, _ in known), dtype=np.intp, count=len(known))
+        targets = np.fromiter((self.index[target] for _, target in known), dtype=np.intp, count=len(known))
+        return known, self.rates[targets] / self.rates[bases]
@@ -0,0 +1,75 @@
+"""Data versions that change whenever stored points change
+
+A version is an opaque token in the Django cache. Every write bumps the
+version of each scope a reader can filter by: the series itself, its
+source type, its symbol and everything. A response cached under the
+version of its scope therefore goes stale exactly when data it could
+include changes. Versions must live in a cache shared with the collector
+process (file, the default, or redis) for its writes to reach the web
+server; responsecache does not cache at all with locmem.
+
+Tokens are nanosecond timestamps, so they also tell when the data last
+changed, and a version that was evicted comes back as a new token.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+from .hottier import mark_written
+
+VERSION_KEY_PREFIX = 'dataversion'
+
+
+def _key(source_type=None, symbol=None):
+    return f"{VERSION_KEY_PREFIX}:{source_type or '*'}:{symbol or '*'}"
+
+
+def _new_token():
+    return str(time.time_ns())
+
+
+def data_version(source_type=None, symbol=None):
+    """Current version token for a reader filtering by source_type and/or symbol"""
+    key = _key(source_type, symbol)
+    version = cache.get(key)
+    if version is None:
+        # add() so concurrent readers agree on one token
+        cache.add(key, _new_token(), None)
+        version = cache.get(key)
+    return version
+
+
+async def adata_version(source_type=None, symbol=None):
+    """data_version() for async views"""
+    key = _key(source_type, symbol)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_token(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def version_time(version):
+    """Epoch seconds at which a version token was issued"""
+    return int(version) / 1e9
+
+
+def bump_data_versions(series):
+    """Invalidate every scope covering the given (source_type, symbol) pairs
+
+    Bumps right away, so the writing connection sees its own changes, and
+    again once the transaction commits: another reader may have cached
+    pre-commit data under the first new version in between. The series
+    are also reloaded into this process's hot tier on their next read.
+    """
+    keys = set()
+    for source_type, symbol in series:
+        keys.update([_key(source_type, symbol), _key(source_type), _key(None, symbol), _key()])
+
+    def bump():
+        token = _new_token()
+        cache.set_many(dict.fromkeys(keys, token), None)
+
+    if keys:
+        bump()
+        transaction.on_commit(bump)
+        mark_written(series)
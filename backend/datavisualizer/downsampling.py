@@ -0,0 +1,121 @@
+"""Reduce a time series to a fixed number of points without losing its shape
+
+Points are (x, y, payload) tuples where x is epoch seconds, y a float and
+payload whatever the caller wants back for points that are kept as-is.
+"""
+
+METHODS = ['lttb', 'minmax', 'min', 'max', 'avg']
+
+# Upper bound for downsampled chart requests, roughly a wide screen in pixels
+MAX_POINTS = 5000
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, for every bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket. Peaks and troughs survive far better
+    than with plain decimation.
+    """
+    points = list(points)
+    if threshold >= len(points):
+        return points
+    if threshold < 3:
+        return [points[0], points[-1]][:threshold]
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        start = int(i * every) + 1
+        end = next_start
+        ax, ay = points[a][0], points[a][1]
+
+        max_area = -1.0
+        chosen = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+
+        sampled.append(points[chosen])
+        a = chosen
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def bucket_downsample(points, start, end, buckets, method):
+    """Aggregate a time-sorted stream into equal-width time buckets
+
+    Consumes points lazily and only ever holds the current bucket, so memory
+    does not depend on how many rows the window contains. ``min``/``max``
+    keep the extreme original point of each bucket, ``minmax`` keeps both
+    (in time order) and ``avg`` yields one (x, mean, None) per bucket placed
+    at the bucket's centre.
+    """
+    if buckets < 1:
+        raise ValueError("buckets must be at least 1")
+    width = max((end - start) / buckets, 1e-9)
+
+    current = None
+    state = None
+    for point in points:
+        index = min(int((point[0] - start) // width), buckets - 1)
+        if index != current:
+            if state is not None:
+                yield from _emit(state, method, start + (current + 0.5) * width)
+            current = index
+            state = {'min': point, 'max': point, 'sum': 0.0, 'count': 0}
+
+        if point[1] < state['min'][1]:
+            state['min'] = point
+        if point[1] > state['max'][1]:
+            state['max'] = point
+        state['sum'] += point[1]
+        state['count'] += 1
+
+    if state is not None:
+        yield from _emit(state, method, start + (current + 0.5) * width)
+
+
+def _emit(state, method, centre):
+    if method == 'min':
+        yield state['min']
+    elif method == 'max':
+        yield state['max']
+    elif method == 'avg':
+        yield (centre, state['sum'] / state['count'], None)
+    elif method == 'minmax':
+        low, high = state['min'], state['max']
+        if low is high:
+            yield low
+        else:
+            yield from sorted((low, high), key=lambda p: p[0])
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+
+def downsample(points, threshold, method='lttb', start=None, end=None):
+    """Downsample time-sorted points to roughly threshold points using method"""
+    if method == 'lttb':
+        return lttb(points, threshold)
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    buckets = threshold // 2 if method == 'minmax' else threshold
+    if start is None or end is None:
+        points = list(points)
+        if not points:
+            return []
+        start, end = points[0][0], points[-1][0]
+    return list(bucket_downsample(points, start, end, max(1, buckets), method))
@@ -0,0 +1,211 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import DataPoint
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Arrow/Parquet export is optional
+    pyarrow = None
+
+COLUMNS = ['timestamp', 'source_type', 'symbol', 'value']
+
+EXPORT_CHUNK_SIZE = 5000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+FORMATS = list(CONTENT_TYPES)
+COLUMNAR_FORMATS = ['arrow', 'parquet']
+
+
+class ExportError(Exception):
+    pass
+
+
+def _parse_timestamp(value, name):
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ExportError(f"{name} must be an ISO 8601 datetime")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_window(start=None, end=None, hours=None):
+    """Turn start/end ISO strings or a trailing hours count into a (start, end) range
+
+    Missing bounds are None, so with no arguments the whole history is exported.
+    """
+    if start:
+        start = _parse_timestamp(start, 'start')
+    elif hours:
+        try:
+            start = timezone.now() - timedelta(hours=int(hours))
+        except ValueError:
+            raise ExportError("hours must be an integer")
+    end = _parse_timestamp(end, 'end') if end else None
+    return start or None, end
+
+
+def export_rows(source_type=None, symbol=None, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream (timestamp, source_type, symbol, value) tuples oldest first
+
+    Uses a server-side cursor where the database supports one, so only
+    chunk_size rows are held in memory at a time.
+    """
+    queryset = DataPoint.objects.all()
+    if source_type:
+        queryset = queryset.filter(source_type=source_type)
+    if symbol:
+        queryset = queryset.filter(symbol=symbol)
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lte=end)
+    return queryset.order_by('timestamp', 'id').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_chunks(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    for batch in _batches(rows, chunk_size):
+        # Values are written as plain-notation JSON numbers from the Decimal, keeping every digit
+        yield ''.join(
+            f'{{"timestamp":"{timestamp.isoformat()}","source_type":{json.dumps(source_type)},'
+            f'"symbol":{json.dumps(symbol)},"value":{value:f}}}\n'
+            for timestamp, source_type, symbol, value in batch
+        ).encode()
+
+
+def csv_chunks(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in _batches(rows, chunk_size):
+        writer.writerows(
+            (timestamp.isoformat(), source_type, symbol, f"{value:f}")
+            for timestamp, source_type, symbol, value in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema():
+    return pyarrow.schema([
+        ('timestamp', pyarrow.timestamp('us', tz='UTC')),
+        ('source_type', pyarrow.string()),
+        ('symbol', pyarrow.string()),
+        ('value', pyarrow.decimal128(20, 8)),
+    ])
+
+
+def columnar_chunks(rows, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Arrow IPC stream or Parquet, one record batch / row group per chunk"""
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if file_format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+
+    for batch in _batches(rows, chunk_size):
+        columns = list(zip(*batch))
+        writer.write_batch(pyarrow.record_batch(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema,
+        ))
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def export_chunks(file_format, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode rows from export_rows() as a stream of bytes chunks"""
+    if file_format == 'ndjson':
+        return ndjson_chunks(rows, chunk_size)
+    if file_format == 'csv':
+        return csv_chunks(rows, chunk_size)
+    if file_format in COLUMNAR_FORMATS:
+        if pyarrow is None:
+            raise ExportError(f"{file_format} export requires pyarrow to be installed")
+        return columnar_chunks(rows, file_format, chunk_size)
+    raise ExportError(f"Unknown export format: {file_format}")
+
+
+async def aiter_chunks(chunks):
+    """Async iterator over a chunk generator, advancing it in the sync thread
+
+    Django's ASGI handler reads a sync iterator into memory before sending
+    it, so the ASGI server is handed this instead. Each chunk is produced
+    by sync_to_async on the one thread sync code shares, which is also
+    where the database cursor behind export_rows() lives.
+    """
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # Closes the database cursor when the client goes away mid-export
+        await sync_to_async(chunks.close)()
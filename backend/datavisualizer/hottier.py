@@ -0,0 +1,319 @@
+"""In-process hot tier holding the recent window of every series
+
+Dashboards mostly read the last day of a few dozen series. The hot tier
+keeps each series' recent points in a fixed-capacity ring buffer of two
+array('d') (epoch seconds, value), 16 bytes per point, so memory is
+HOT_TIER_CAPACITY * 16 bytes per series however much data arrives.
+
+The server entry points (asgi.py, wsgi.py) warm it from the database on
+a background thread at startup; until that finishes reads go to the
+database. It then follows new rows by their id (the delta cursor): at
+most once per HOT_TIER_REFRESH_INTERVAL a read hands a catch-up to the
+same background thread, so the collector's inserts from its own process
+are appended without any read issuing SQL. A row older than the newest
+buffered point of its series (a backfill, a late point) cannot be
+appended in order and marks the series for reloading instead, as do
+writes made through DataPointWriter in this process. Points overwritten
+in place keep their id and show up at the next full resync
+(HOT_TIER_RESYNC_INTERVAL).
+
+All SQL runs on the background thread without the lock; only finished
+rows and buffers are applied under it, so readers never wait for the
+database. Reads whose window starts before what a buffer covers, or
+that touch a series waiting to be reloaded, return None and fall
+through to the database.
+"""
+import logging
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import DataPoint
+
+logger = logging.getLogger(__name__)
+
+TAIL_BATCH_SIZE = 5000
+
+
+class RingBuffer:
+    """Fixed-capacity time-ordered (epoch seconds, value) pairs; the oldest are overwritten"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, t, value):
+        end = (self.start + self.size) % self.capacity
+        self.times[end] = t
+        self.values[end] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def time_at(self, i):
+        return self.times[(self.start + i) % self.capacity]
+
+    def value_at(self, i):
+        return self.values[(self.start + i) % self.capacity]
+
+    def first_at_or_after(self, t):
+        """Logical index of the first point with time >= t"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.time_at(middle) < t:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def oldest(self):
+        return self.time_at(0) if self.size else None
+
+    def newest(self):
+        return self.time_at(self.size - 1) if self.size else None
+
+    def window(self, start, end):
+        """(t, value) pairs with start <= t <= end, oldest first"""
+        i = self.first_at_or_after(start)
+        while i < self.size:
+            t = self.time_at(i)
+            if t > end:
+                break
+            yield t, self.value_at(i)
+            i += 1
+
+
+class HotSeries:
+    """One series' buffer and the time from which it holds every point"""
+
+    def __init__(self, capacity, covered_from):
+        self.buffer = RingBuffer(capacity)
+        self.covered_from = covered_from
+
+    def append(self, t, value):
+        full = len(self.buffer) == self.buffer.capacity
+        self.buffer.append(t, value)
+        if full:
+            # The overwritten point is no longer available, nor is anything before it
+            self.covered_from = self.buffer.oldest()
+
+    def has(self, t, value):
+        i = self.buffer.first_at_or_after(t)
+        return i < len(self.buffer) and self.buffer.time_at(i) == t and self.buffer.value_at(i) == value
+
+
+class HotTier:
+    """Ring buffers for every series, kept current by following inserted rows"""
+
+    def __init__(self, capacity=None, hours=None, refresh_interval=None, resync_interval=None, clock=time.monotonic):
+        self.capacity = capacity or settings.HOT_TIER_CAPACITY
+        self.hours = hours or settings.HOT_TIER_HOURS
+        self.refresh_interval = settings.HOT_TIER_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.resync_interval = resync_interval or settings.HOT_TIER_RESYNC_INTERVAL
+        self.clock = clock
+
+        self.series = {}
+        self.stale = set()
+        self.reloading = set()
+        self.cursor = None
+        self._next_refresh = 0
+        self._next_resync = 0
+        self._lock = threading.RLock()
+        self._worker = None
+
+    def _window_start(self):
+        return (timezone.now() - timedelta(hours=self.hours)).timestamp()
+
+    def _load(self, keys=None):
+        """Buffers loaded from the database for every series, or just keys"""
+        covered_from = self._window_start()
+        rows = DataPoint.objects.filter(timestamp__gte=datetime.fromtimestamp(covered_from, tz=dt_timezone.utc))
+        if keys is not None:
+            source_types = {source_type for source_type, _ in keys}
+            symbols = {symbol for _, symbol in keys}
+            rows = rows.filter(source_type__in=source_types, symbol__in=symbols)
+        rows = rows.order_by('timestamp').values_list('source_type', 'symbol', 'timestamp', 'value')
+
+        loaded = {}
+        for source_type, symbol, timestamp, value in rows.iterator(chunk_size=TAIL_BATCH_SIZE):
+            key = (source_type, symbol)
+            if keys is not None and key not in keys:
+                continue
+            series = loaded.get(key)
+            if series is None:
+                series = loaded[key] = HotSeries(self.capacity, covered_from)
+            series.append(timestamp.timestamp(), float(value))
+        # A requested series with no recent points is known to be empty
+        for key in keys or ():
+            loaded.setdefault(key, HotSeries(self.capacity, covered_from))
+        return loaded
+
+    def warm(self):
+        """Load the recent window of every series and start following inserts from here
+
+        The buffers are built without holding the lock. Rows inserted
+        meanwhile are past the cursor taken first, so the next refresh
+        applies them, skipping those the load already saw.
+        """
+        from .deltas import current_cursor
+
+        cursor = current_cursor()
+        series = self._load()
+        with self._lock:
+            self.series = series
+            self.cursor = cursor
+            now = self.clock()
+            self._next_refresh = now + self.refresh_interval
+            self._next_resync = now + self.resync_interval
+        logger.info(f"Hot tier warmed with {len(series)} series")
+
+    def catch_up(self):
+        """Apply rows inserted since the cursor, then reload the series marked stale"""
+        while self.refresh() == TAIL_BATCH_SIZE:
+            pass
+        with self._lock:
+            stale, self.stale = self.stale, set()
+            self.reloading |= stale
+        if stale:
+            loaded = self._load(stale)
+            with self._lock:
+                self.series.update(loaded)
+                self.reloading -= stale
+
+    def warm_in_background(self):
+        return self._in_background(self.warm)
+
+    def _in_background(self, job):
+        """Run job on the background thread; False if that thread is still busy
+
+        One thread at a time keeps warm-ups and catch-ups from moving the
+        cursor under each other.
+        """
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return False
+            self._worker = threading.Thread(target=self._run, args=(job,), name='hot-tier-sync', daemon=True)
+            self._worker.start()
+            return True
+
+    def _run(self, job):
+        try:
+            job()
+        except Exception as e:
+            logger.error(f"Hot tier {job.__name__} failed: {e}")
+        finally:
+            connection.close()
+
+    def mark_stale(self, keys):
+        with self._lock:
+            self.stale.update(keys)
+
+    def refresh(self):
+        """Apply one batch of rows inserted since the cursor; returns how many were read"""
+        rows = list(
+            DataPoint.objects.filter(id__gt=self.cursor).order_by('id')
+            .values_list('id', 'source_type', 'symbol', 'timestamp', 'value')[:TAIL_BATCH_SIZE]
+        )
+        with self._lock:
+            self._apply(rows)
+        return len(rows)
+
+    def _apply(self, rows):
+        for pk, source_type, symbol, timestamp, value in rows:
+            key = (source_type, symbol)
+            series = self.series.get(key)
+            t, value = timestamp.timestamp(), float(value)
+            if series is None:
+                # A new series: it may have history beyond this row, so load it properly
+                self.stale.add(key)
+            elif series.buffer.newest() is None or t > series.buffer.newest():
+                series.append(t, value)
+            elif not series.has(t, value):
+                self.stale.add(key)
+            self.cursor = pk
+
+    def _current(self):
+        """Schedule due syncs in the background; False until the first warm-up has finished"""
+        if self.cursor is None:
+            return False
+        now = self.clock()
+        # Readers keep using the current buffers until the background work swaps its results in
+        if now >= self._next_resync:
+            if self.warm_in_background():
+                self._next_resync = now + self.resync_interval
+        elif now >= self._next_refresh or self.stale:
+            if self._in_background(self.catch_up):
+                self._next_refresh = now + self.refresh_interval
+        return True
+
+    def points(self, start, end, source_type=None, symbol=None):
+        """(timestamp, Decimal value, symbol) in time order, or None if the window is not all hot
+
+        Values come back from floats at DataPoint's 8 decimal places, which
+        is exact for values below about 10^7.
+        """
+        if not settings.HOT_TIER_ENABLED:
+            return None
+
+        def wanted(key):
+            return (source_type is None or key[0] == source_type) and (symbol is None or key[1] == symbol)
+
+        with self._lock:
+            if not self._current():
+                return None
+            start, end = start.timestamp(), end.timestamp()
+            if any(wanted(key) for key in self.stale | self.reloading):
+                # Being reloaded in the background; the database has the current points
+                return None
+            keys = [key for key in self.series if wanted(key)]
+            if source_type and symbol and not keys:
+                # Unknown series: the database may still hold older points
+                return None
+            if any(self.series[key].covered_from > start for key in keys):
+                return None
+            rows = [
+                (t, value, key[1]) for key in keys for t, value in self.series[key].buffer.window(start, end)
+            ]
+
+        rows.sort(key=lambda row: row[0])
+        return [
+            (datetime.fromtimestamp(t, tz=dt_timezone.utc), Decimal(f"{value:.8f}"), row_symbol)
+            for t, value, row_symbol in rows
+        ]
+
+
+_hot_tier = None
+_hot_tier_lock = threading.Lock()
+
+
+def get_hot_tier():
+    """Return the process-wide hot tier"""
+    global _hot_tier
+    with _hot_tier_lock:
+        if _hot_tier is None:
+            _hot_tier = HotTier()
+        return _hot_tier
+
+
+def warm_in_background():
+    """Warm the process-wide hot tier at server startup, off the request path"""
+    if settings.HOT_TIER_ENABLED:
+        get_hot_tier().warm_in_background()
+
+
+def mark_written(series):
+    """Reload these (source_type, symbol) series on their next read"""
+    if _hot_tier is not None:
+        _hot_tier.mark_stale(series)
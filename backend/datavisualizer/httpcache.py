@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheStore:
+    """In-process LRU store for cached provider responses"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FileCacheStore:
+    """On-disk store so cached responses survive collector restarts
+
+    Entries are JSON files named after a hash of the cache key and replaced
+    atomically, so concurrent writers never leave a half-written file.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, entry):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write HTTP cache entry: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+class ResponseCache:
+    """TTL cache for decoded provider responses with revalidation metadata
+
+    An entry younger than its TTL is fresh and served without a request. For
+    stale_while_revalidate seconds after that it is still served, while the
+    caller refreshes it in the background. Older entries keep their ETag and
+    Last-Modified so the next request can be conditional and a 304 costs no
+    body transfer.
+    """
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    EXPIRED = 'expired'
+
+    def __init__(self, store, stale_while_revalidate=0, clock=time.time):
+        self.store = store
+        self.stale_while_revalidate = stale_while_revalidate
+        self.clock = clock
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Return (entry, freshness) for key, or (None, None) when not cached"""
+        entry = self.store.get(key)
+        if entry is None:
+            return None, None
+
+        age = self.clock() - entry['stored_at']
+        if age < entry['ttl']:
+            return entry, self.FRESH
+        if age < entry['ttl'] + self.stale_while_revalidate:
+            return entry, self.STALE
+        return entry, self.EXPIRED
+
+    def store_response(self, key, data, ttl, etag=None, last_modified=None):
+        self.store.set(key, {
+            'data': data,
+            'ttl': ttl,
+            'stored_at': self.clock(),
+            'etag': etag,
+            'last_modified': last_modified,
+        })
+
+    def touch(self, key, entry):
+        """Mark an entry fresh again after the upstream answered 304"""
+        entry = dict(entry, stored_at=self.clock())
+        self.store.set(key, entry)
+        return entry
+
+    def start_refresh(self, key):
+        """Claim a background refresh for key; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+            }
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for revalidating entry"""
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache configured in settings"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = getattr(settings, 'HTTP_CACHE_BACKEND', 'memory')
+            if backend == 'file':
+                store = FileCacheStore(getattr(settings, 'HTTP_CACHE_DIR'))
+            elif backend == 'memory':
+                store = MemoryCacheStore(getattr(settings, 'HTTP_CACHE_MAX_ENTRIES', 1000))
+            else:
+                raise ValueError(f"Unknown HTTP cache backend: {backend}")
+            _cache = ResponseCache(store, getattr(settings, 'HTTP_CACHE_STALE_WHILE_REVALIDATE', 0))
+        return _cache
@@ -0,0 +1,286 @@
+import csv
+import json
+import logging
+import os
+import tempfile
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import compactstore
+from .bulk import insert_rows
+from .dataversions import bump_data_versions
+from .ingestion import new_points, update_latest_values
+from .models import DataPoint
+from .rollups import VALUE_QUANTUM, update_rollups
+
+try:
+    import pyarrow.parquet
+except ImportError:  # Parquet import is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 10000
+
+DATAPOINT_INSERT_FIELDS = ['timestamp', 'source_type', 'symbol', 'value', 'metadata', 'created_at', 'updated_at']
+
+# Largest value DataPoint.value (max_digits=20, decimal_places=8) can hold
+MAX_VALUE = Decimal('1e12')
+
+# name -> adapter class; adapters yield dicts with timestamp, value and optionally source_type/symbol
+ADAPTERS = {}
+
+
+class HistoryImportError(Exception):
+    pass
+
+
+def register_adapter(name):
+    """Class decorator adding a history adapter under name"""
+    def decorator(cls):
+        ADAPTERS[name] = cls
+        return cls
+    return decorator
+
+
+@register_adapter('csv')
+class CsvAdapter:
+    """CSV with a header row, e.g. the output of export_data --format csv"""
+
+    def __init__(self, path, **options):
+        self.path = path
+
+    def records(self):
+        with open(self.path, newline='') as f:
+            yield from csv.DictReader(f)
+
+
+@register_adapter('ndjson')
+class NdjsonAdapter:
+    """One JSON object per line, e.g. the output of export_data --format ndjson"""
+
+    def __init__(self, path, **options):
+        self.path = path
+
+    def records(self):
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    # Keep numbers as strings so values go through the same Decimal validation as CSV
+                    yield json.loads(line, parse_float=str, parse_int=str)
+
+
+@register_adapter('parquet')
+class ParquetAdapter:
+    """Parquet file read one record batch at a time (needs pyarrow)"""
+
+    def __init__(self, path, **options):
+        if pyarrow is None:
+            raise HistoryImportError("parquet import requires pyarrow to be installed")
+        self.path = path
+
+    def records(self):
+        for batch in pyarrow.parquet.ParquetFile(self.path).iter_batches(batch_size=IMPORT_CHUNK_SIZE):
+            yield from batch.to_pylist()
+
+
+@register_adapter('coingecko')
+class CoinGeckoHistoryAdapter:
+    """Price history for a CoinGecko coin id, e.g. --adapter coingecko bitcoin --days 365"""
+
+    def __init__(self, path, days=30, **options):
+        from .services import CoinGeckoService
+
+        self.coin = path
+        self.days = days
+        self.service = CoinGeckoService()
+
+    def records(self):
+        symbol = self.service.result_symbol(self.coin)
+        for timestamp, price in self.service.get_price_history(self.coin, self.days):
+            yield {'timestamp': timestamp, 'source_type': 'crypto', 'symbol': symbol, 'value': price}
+
+
+def parse_record(record, source_type=None, symbol=None):
+    """Validate one record into (timestamp, source_type, symbol, Decimal value)
+
+    Raises ValueError for anything DataPoint would reject, so bad rows are
+    counted and skipped instead of failing a whole bulk insert.
+    """
+    timestamp = record.get('timestamp')
+    if isinstance(timestamp, str):
+        timestamp = parse_datetime(timestamp)
+    if timestamp is None:
+        raise ValueError(f"invalid timestamp: {record.get('timestamp')!r}")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+
+    source_type = source_type or record.get('source_type')
+    symbol = symbol or record.get('symbol')
+    if source_type not in dict(DataPoint.SOURCE_CHOICES):
+        raise ValueError(f"invalid source_type: {source_type!r}")
+    if not symbol or len(symbol) > 20:
+        raise ValueError(f"invalid symbol: {symbol!r}")
+
+    try:
+        value = Decimal(str(record.get('value'))).quantize(VALUE_QUANTUM)
+    except InvalidOperation:
+        raise ValueError(f"invalid value: {record.get('value')!r}")
+    if not value.is_finite() or abs(value) >= MAX_VALUE:
+        raise ValueError(f"value out of range: {value}")
+    return timestamp, source_type, symbol, value
+
+
+class Checkpoint:
+    """Number of input records already committed, persisted atomically as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.position = json.load(f).get('position', 0)
+
+    def save(self, position):
+        self.position = position
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'position': position, 'updated': timezone.now().isoformat()}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class deferred_indexes:
+    """Drop DataPoint's secondary indexes for the duration of a bulk load
+
+    The unique (timestamp, source_type, symbol) constraint stays in place
+    because deduplication relies on it. On exit every missing index is
+    recreated, which also repairs a load that was interrupted earlier.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+
+    def _existing(self):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, DataPoint._meta.db_table))
+
+    def _editor(self):
+        # Only used to generate DDL; entering a schema_editor context is refused by SQLite
+        # inside a transaction, so the statements are executed directly instead
+        editor = connection.schema_editor()
+        editor.deferred_sql = []
+        return editor
+
+    def _execute(self, statements):
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(str(statement))
+
+    def __enter__(self):
+        if self.enabled:
+            existing = self._existing()
+            editor = self._editor()
+            self._execute(
+                index.remove_sql(DataPoint, editor) for index in DataPoint._meta.indexes if index.name in existing
+            )
+            logger.info("Dropped DataPoint secondary indexes for bulk load")
+        return self
+
+    def __exit__(self, *exc_info):
+        existing = self._existing()
+        missing = [index for index in DataPoint._meta.indexes if index.name not in existing]
+        if missing:
+            editor = self._editor()
+            self._execute(index.create_sql(DataPoint, editor) for index in missing)
+            logger.info(f"Recreated {len(missing)} DataPoint indexes")
+        return False
+
+
+class HistoryImporter:
+    """Loads history records into DataPoint in chunked bulk inserts
+
+    Each chunk is one transaction of executemany inserts with
+    ignore-on-conflict, so rows that already exist are skipped and a re-run
+    is harmless. Records are validated up front, which is what lets the
+    load bypass the ORM's per-value compilation. After each
+    chunk the checkpoint records how many input records are done, letting
+    an interrupted import resume where it stopped. The points a chunk
+    actually adds are merged into LatestValue and Rollup in the same
+    transaction, as ingestion does. Nothing is rebuilt from raw rows, so
+    rollups whose raw rows retention already deleted are kept.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, checkpoint=None, defer_indexes=False,
+                 source_type=None, symbol=None):
+        self.chunk_size = max(1, chunk_size)
+        self.checkpoint = Checkpoint(checkpoint)
+        self.defer_indexes = defer_indexes
+        self.source_type = source_type
+        self.symbol = symbol
+
+        self.read = 0
+        self.submitted = 0
+        self.invalid = 0
+
+    def run(self, records):
+        start = self.checkpoint.position
+        if start:
+            logger.info(f"Resuming import after {start} records")
+
+        series = set()
+        pending = {}
+        with deferred_indexes(self.defer_indexes):
+            for position, record in enumerate(records, 1):
+                if position <= start:
+                    continue
+                self.read += 1
+                try:
+                    timestamp, source_type, symbol, value = parse_record(record, self.source_type, self.symbol)
+                except ValueError as e:
+                    self.invalid += 1
+                    logger.debug(f"Skipping record {position}: {e}")
+                    continue
+
+                # First occurrence wins, matching the ignore policy against stored rows
+                pending.setdefault((timestamp, source_type, symbol), value)
+                series.add((source_type, symbol))
+                if len(pending) >= self.chunk_size:
+                    self._write(pending)
+                    pending = {}
+                    self.checkpoint.save(position)
+
+            self._write(pending)
+            self.checkpoint.save(start + self.read)
+
+        bump_data_versions(series)
+        self.checkpoint.clear()
+        return self.submitted
+
+    def _write(self, pending):
+        if not pending:
+            return
+        now = timezone.now()
+        points = [
+            DataPoint(timestamp=timestamp, source_type=source_type, symbol=symbol, value=value)
+            for (timestamp, source_type, symbol), value in pending.items()
+        ]
+        rows = ((point.timestamp, point.source_type, point.symbol, point.value, {}, now, now) for point in points)
+        with transaction.atomic():
+            # Rows already stored are ignored by the insert and must not be counted twice
+            inserted = new_points(points)
+            self.submitted += insert_rows(DataPoint, DATAPOINT_INSERT_FIELDS, rows, ignore_conflicts=True)
+            update_latest_values(inserted, inserted)
+            update_rollups(inserted)
+            if compactstore.writes_enabled():
+                compactstore.insert_records(
+                    (timestamp, source_type, symbol, value, None)
+                    for (timestamp, source_type, symbol), value in pending.items()
+                )
@@ -0,0 +1,302 @@
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from . import compactstore
+from .alerts import evaluate_alerts
+from .dataversions import bump_data_versions
+from .models import DataPoint, LatestValue
+from .rollups import update_rollups
+
+logger = logging.getLogger(__name__)
+
+# Metadata key holding the provider's own "last updated" marker for a value
+SOURCE_UPDATED_KEY = 'source_updated_at'
+
+# Look-back used for the summary's change figures
+CHANGE_WINDOW = timedelta(hours=24)
+
+LATEST_VALUE_UPDATE_FIELDS = [
+    'value', 'timestamp', 'reference_value', 'reference_timestamp', 'data_points', 'updated_at',
+]
+
+# (source_type, symbol) -> (value, source_updated_at, timestamp) of the newest stored point
+_last_stored = {}
+_last_stored_lock = threading.Lock()
+
+
+def _last_stored_point(source_type, symbol):
+    key = (source_type, symbol)
+    with _last_stored_lock:
+        if key in _last_stored:
+            return _last_stored[key]
+
+    latest = DataPoint.objects.filter(
+        source_type=source_type, symbol=symbol
+    ).values('value', 'metadata', 'timestamp').first()
+    known = None
+    if latest:
+        known = (
+            Decimal(latest['value']),
+            (latest['metadata'] or {}).get(SOURCE_UPDATED_KEY),
+            latest['timestamp'],
+        )
+
+    with _last_stored_lock:
+        _last_stored.setdefault(key, known)
+        return _last_stored[key]
+
+
+class DataPointWriter:
+    """Buffers data points and writes them in bulk inside a single transaction
+
+    Rows are keyed on DataPoint's unique (timestamp, source_type, symbol)
+    constraint. With the ``ignore`` conflict policy an existing row wins and the
+    new one is dropped; with ``update`` the new value and metadata overwrite it.
+    Either way a duplicate no longer aborts the rest of the round.
+
+    Points that carry the provider's own update marker (source_updated_at)
+    are skipped when both it and the value match the last stored point for
+    the series, so re-served cached responses do not create new rows.
+    """
+
+    CONFLICT_IGNORE = 'ignore'
+    CONFLICT_UPDATE = 'update'
+    CONFLICT_POLICIES = [CONFLICT_IGNORE, CONFLICT_UPDATE]
+
+    UNIQUE_FIELDS = ['timestamp', 'source_type', 'symbol']
+    UPDATE_FIELDS = ['value', 'metadata', 'updated_at']
+
+    def __init__(self, batch_size=None, conflict=None, skip_unchanged=None, update_derived=True):
+        if batch_size is None:
+            batch_size = getattr(settings, 'INGEST_BATCH_SIZE', 500)
+        if conflict is None:
+            conflict = getattr(settings, 'INGEST_CONFLICT_POLICY', self.CONFLICT_IGNORE)
+        if conflict not in self.CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy: {conflict}")
+        if skip_unchanged is None:
+            skip_unchanged = getattr(settings, 'INGEST_SKIP_UNCHANGED', True)
+
+        self.batch_size = max(1, batch_size)
+        self.conflict = conflict
+        self.skip_unchanged = skip_unchanged
+        # Bulk loaders can turn this off and rebuild derived tables (LatestValue, Rollup) once at the end
+        self.update_derived = update_derived
+        self.skipped = 0
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, source_type, symbol, value, metadata=None, timestamp=None, source_updated_at=None):
+        """Queue a data point for the next flush"""
+        metadata = dict(metadata or {})
+        if source_updated_at is not None:
+            metadata[SOURCE_UPDATED_KEY] = source_updated_at
+            if self.skip_unchanged:
+                known = _last_stored_point(source_type, symbol)
+                if known and known[:2] == (Decimal(str(value)), source_updated_at):
+                    self.skipped += 1
+                    return
+
+        timestamp = timestamp or timezone.now()
+        key = (timestamp, source_type, symbol)
+        if key in self._pending and self.conflict == self.CONFLICT_IGNORE:
+            return
+        self._pending[key] = DataPoint(
+            timestamp=timestamp,
+            source_type=source_type,
+            symbol=symbol,
+            value=value,
+            metadata=metadata,
+        )
+
+    def flush(self):
+        """Write every queued data point and return how many rows landed
+
+        With ``ignore`` that is the rows inserted, leaving out duplicates of
+        stored points; with ``update`` every row is inserted or overwritten.
+        """
+        if not self._pending:
+            return 0
+
+        objs = list(self._pending.values())
+        self._pending = {}
+
+        inserted = []
+        with transaction.atomic():
+            for start in range(0, len(objs), self.batch_size):
+                batch = objs[start:start + self.batch_size]
+                if self.update_derived or self.conflict == self.CONFLICT_IGNORE:
+                    inserted.extend(new_points(batch))
+                self._write_batch(batch)
+                if compactstore.writes_enabled():
+                    compactstore.write_points(batch, update=self.conflict == self.CONFLICT_UPDATE)
+
+            if self.update_derived:
+                # An ignored duplicate never reaches the table, so it cannot become the latest value
+                candidates = objs if self.conflict == self.CONFLICT_UPDATE else inserted
+                update_latest_values(candidates, inserted)
+
+                replaced = []
+                if self.conflict == self.CONFLICT_UPDATE:
+                    new_keys = {(obj.timestamp, obj.source_type, obj.symbol) for obj in inserted}
+                    replaced = [obj for obj in objs if (obj.timestamp, obj.source_type, obj.symbol) not in new_keys]
+                update_rollups(inserted, replaced)
+
+            bump_data_versions({(obj.source_type, obj.symbol) for obj in objs})
+
+        if self.update_derived:
+            evaluate_alerts((obj.source_type, obj.symbol, obj.timestamp, obj.value) for obj in objs)
+
+        written = objs if self.conflict == self.CONFLICT_UPDATE else inserted
+        with _last_stored_lock:
+            # An ignored duplicate never reached the table, so it is not the last stored point
+            for obj in written:
+                key = (obj.source_type, obj.symbol)
+                known = _last_stored.get(key)
+                if known is None or obj.timestamp >= known[2]:
+                    _last_stored[key] = (
+                        Decimal(str(obj.value)), obj.metadata.get(SOURCE_UPDATED_KEY), obj.timestamp
+                    )
+
+        logger.debug(
+            f"Flushed {len(objs)} data points, {len(written)} written "
+            f"({self.conflict} on conflict, {self.skipped} unchanged skipped)"
+        )
+        return len(written)
+
+    def _write_batch(self, batch):
+        if self.conflict == self.CONFLICT_UPDATE:
+            DataPoint.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=self.UNIQUE_FIELDS,
+                update_fields=self.UPDATE_FIELDS,
+            )
+        else:
+            DataPoint.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def new_points(batch):
+    """Points in batch that do not exist yet (one range query per batch)"""
+    timestamps = [obj.timestamp for obj in batch]
+    existing = set(DataPoint.objects.filter(
+        timestamp__gte=min(timestamps),
+        timestamp__lte=max(timestamps),
+        source_type__in={obj.source_type for obj in batch},
+        symbol__in={obj.symbol for obj in batch},
+    ).values_list('timestamp', 'source_type', 'symbol'))
+    return [obj for obj in batch if (obj.timestamp, obj.source_type, obj.symbol) not in existing]
+
+
+def _reference_point(source_type, symbol, latest_timestamp):
+    return DataPoint.objects.filter(
+        source_type=source_type,
+        symbol=symbol,
+        timestamp__lte=latest_timestamp - CHANGE_WINDOW,
+    ).values('value', 'timestamp').first()
+
+
+def update_latest_values(candidates, inserted):
+    """Fold freshly written points into the LatestValue table
+
+    candidates are the points whose values actually landed in DataPoint and
+    may become a series' latest value; inserted are the ones that added a
+    row and therefore count towards data_points. Costs one query to load the
+    affected LatestValue rows, one insert and one update, plus one indexed
+    lookup per series whose 24h reference point may have moved.
+    """
+    newest = {}
+    for obj in candidates:
+        key = (obj.source_type, obj.symbol)
+        if key not in newest or obj.timestamp > newest[key].timestamp:
+            newest[key] = obj
+
+    counts = Counter((obj.source_type, obj.symbol) for obj in inserted)
+    oldest_inserted = {}
+    for obj in inserted:
+        key = (obj.source_type, obj.symbol)
+        if key not in oldest_inserted or obj.timestamp < oldest_inserted[key]:
+            oldest_inserted[key] = obj.timestamp
+
+    keys = set(newest) | set(counts)
+    if not keys:
+        return
+
+    existing = {
+        (row.source_type, row.symbol): row
+        for row in LatestValue.objects.filter(
+            source_type__in={key[0] for key in keys},
+            symbol__in={key[1] for key in keys},
+        )
+    }
+
+    created, updated = [], []
+    now = timezone.now()
+    for key in keys:
+        row = existing.get(key)
+        point = newest.get(key)
+        moved = False
+        if row is None:
+            if point is None:
+                continue
+            row = LatestValue(source_type=key[0], symbol=key[1], value=point.value, timestamp=point.timestamp)
+            created.append(row)
+            moved = True
+        else:
+            updated.append(row)
+            row.updated_at = now
+            if point is not None and point.timestamp >= row.timestamp:
+                moved = True
+                row.value = point.value
+                row.timestamp = point.timestamp
+
+        row.data_points += counts[key]
+
+        # The reference is the newest point at least CHANGE_WINDOW older than the latest one;
+        # it can only change if the latest moved or an old enough point was just inserted
+        cutoff = row.timestamp - CHANGE_WINDOW
+        if moved or (key in oldest_inserted and oldest_inserted[key] <= cutoff):
+            reference = _reference_point(key[0], key[1], row.timestamp)
+            row.reference_value = reference['value'] if reference else None
+            row.reference_timestamp = reference['timestamp'] if reference else None
+
+    if created:
+        LatestValue.objects.bulk_create(created)
+    if updated:
+        LatestValue.objects.bulk_update(updated, LATEST_VALUE_UPDATE_FIELDS)
+
+
+def rebuild_latest_values():
+    """Recompute the whole LatestValue table from DataPoint
+
+    For repairs and after bulk loads that ran with update_derived=False.
+    Returns the number of series.
+    """
+    rows = []
+    series = DataPoint.objects.order_by().values('source_type', 'symbol').annotate(total=Count('id'))
+    for entry in series:
+        latest = DataPoint.objects.filter(
+            source_type=entry['source_type'], symbol=entry['symbol']
+        ).values('value', 'timestamp').first()
+        reference = _reference_point(entry['source_type'], entry['symbol'], latest['timestamp'])
+        rows.append(LatestValue(
+            source_type=entry['source_type'],
+            symbol=entry['symbol'],
+            value=latest['value'],
+            timestamp=latest['timestamp'],
+            reference_value=reference['value'] if reference else None,
+            reference_timestamp=reference['timestamp'] if reference else None,
+            data_points=entry['total'],
+        ))
+
+    with transaction.atomic():
+        LatestValue.objects.all().delete()
+        LatestValue.objects.bulk_create(rows)
+    return len(rows)
@@ -0,0 +1,134 @@
+from django.core.management.base import BaseCommand
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from datavisualizer.ratelimit import RateLimiter
+from datavisualizer.services import DataCollectionService
+import json
+import threading
+import time
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """Answers every provider endpoint with canned JSON after a fixed delay"""
+
+    latency = 0.2
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path.endswith('/simple/price'):
+            body = {
+                coin: {'usd': 100.0 + i, 'usd_market_cap': 1e9, 'usd_24h_vol': 1e6, 'usd_24h_change': 1.5}
+                for i, coin in enumerate(params.get('ids', '').split(','))
+            }
+        elif url.path.endswith('/query'):
+            body = {'Global Quote': {
+                '01. symbol': params.get('symbol'),
+                '05. price': '123.4500',
+                '09. change': '1.2500',
+                '10. change percent': '1.0230%',
+            }}
+        elif url.path.endswith('/weather'):
+            body = {
+                'main': {'temp': 18.5, 'humidity': 60, 'pressure': 1012},
+                'weather': [{'description': 'clear sky'}],
+            }
+        else:
+            body = {'base': 'USD', 'rates': {'EUR': 0.91, 'GBP': 0.78, 'JPY': 151.2, 'AUD': 1.52, 'CAD': 1.36, 'CHF': 0.88}}
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark serial vs concurrent collection rounds against a local fake HTTP server. '
+        'Response caching is off for the benchmark, so every round makes its HTTP calls.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            type=int,
+            default=20,
+            help='Number of symbols/cities to fetch for each per-symbol provider',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.2,
+            help='Simulated upstream latency per request in seconds',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=1,
+            help='Number of rounds to time for each mode',
+        )
+
+    def handle(self, *args, **options):
+        FakeProviderHandler.latency = options['latency']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeProviderHandler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        count = options['symbols']
+        symbols = {
+            'crypto': [f"coin{i}" for i in range(count)],
+            'stock': [f"SYM{i}" for i in range(count)],
+            'weather': [f"City {i}" for i in range(count)],
+        }
+
+        self.stdout.write(
+            f"Fake providers at {base_url}, {count} symbols per provider, "
+            f"{options['latency'] * 1000:.0f}ms latency"
+        )
+
+        try:
+            results = {}
+            for label, concurrent in (('serial', False), ('concurrent', True)):
+                service = self._build_service(concurrent, base_url)
+                elapsed = []
+                for _ in range(options['rounds']):
+                    started = time.perf_counter()
+                    fetched = service.fetch_all_data(symbols)
+                    elapsed.append(time.perf_counter() - started)
+                results[label] = fetched
+                best = min(elapsed)
+                total = sum(len(items) for items in fetched.values())
+                self.stdout.write(f"{label:>10}: {best:.3f}s for {total} items (best of {len(elapsed)})")
+
+            if results['serial'] == results['concurrent']:
+                self.stdout.write(self.style.SUCCESS("Serial and concurrent rounds returned identical results"))
+            else:
+                self.stdout.write(self.style.ERROR("Serial and concurrent rounds returned different results"))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _build_service(self, concurrent, base_url):
+        service = DataCollectionService(concurrent=concurrent)
+        service.crypto_service.BASE_URL = base_url
+        service.stock_service.BASE_URL = f"{base_url}/query"
+        service.stock_service.api_key = 'benchmark'
+        service.weather_service.BASE_URL = base_url
+        service.weather_service.api_key = 'benchmark'
+        service.exchange_service.BASE_URL = f"{base_url}/latest"
+        for source_type in service.SOURCE_TYPES:
+            # The fake server has no quota; don't let real provider limits pace it
+            api_service = service.service_for(source_type)
+            api_service.rate_limiter = RateLimiter(api_service.provider)
+            # A cached response would let later rounds and modes skip the requests being timed
+            api_service.cache_ttl = lambda endpoint: 0
+        return service
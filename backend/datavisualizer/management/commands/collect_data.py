@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datavisualizer.services import DataCollectionService
+from datavisualizer.services import DataCollectionService, publish_provider_status
 import time
 
 
@@ -27,6 +27,11 @@ class Command(BaseCommand):
             default=60,
             help='Delay in seconds between repeated collections',
         )
+        parser.add_argument(
+            '--serial',
+            action='store_true',
+            help='Fetch providers and symbols one at a time instead of concurrently',
+        )
 
     def handle(self, *args, **options):
         source = options['source']
@@ -42,7 +47,7 @@ class Command(BaseCommand):
                 self.style.WARNING(f"Will collect {repeat} times with {delay}s delays")
             )
         
-        service = DataCollectionService()
+        service = DataCollectionService(concurrent=not options['serial'])
         total_collected = 0
         
         for i in range(repeat):
@@ -89,6 +94,7 @@ class Command(BaseCommand):
                 )
                 continue
         
+        publish_provider_status()
         self.stdout.write(
             self.style.SUCCESS(
                 f"Data collection completed at {timezone.now()}. "
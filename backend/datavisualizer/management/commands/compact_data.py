@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datavisualizer.retention import Compactor
+import signal
+import threading
+
+
+class Command(BaseCommand):
+    help = 'Apply the DATA_RETENTION policy, deleting expired raw points and rollups in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            type=str,
+            choices=['crypto', 'stock', 'weather', 'currency'],
+            action='append',
+            help='Only compact this source type (repeatable, defaults to all)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Rows deleted per transaction (defaults to DATA_RETENTION_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.05,
+            help='Seconds to sleep between batches so other writers get the lock',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            help='Keep running and compact again every N seconds (0 runs once)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many rows would be deleted without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        compactor = Compactor(
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+
+        stopped = threading.Event()
+        if options['every']:
+            def shutdown(signum, frame):
+                self.stdout.write(self.style.WARNING("Stopping compactor..."))
+                stopped.set()
+
+            signal.signal(signal.SIGINT, shutdown)
+            signal.signal(signal.SIGTERM, shutdown)
+
+        while not stopped.is_set():
+            deleted = compactor.compact(options['source'])
+            verb = 'Would delete' if options['dry_run'] else 'Deleted'
+            for (source_type, tier), count in sorted(deleted.items()):
+                self.stdout.write(f"{verb} {count} {tier} rows for {source_type}")
+            self.stdout.write(
+                self.style.SUCCESS(f"Compaction finished at {timezone.now()}: {sum(deleted.values())} rows")
+            )
+
+            if not options['every']:
+                break
+            stopped.wait(options['every'])
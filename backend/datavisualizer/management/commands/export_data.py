@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from datavisualizer.exporting import (
+    EXPORT_CHUNK_SIZE, FORMATS, ExportError, export_chunks, export_rows, parse_window
+)
+import sys
+import time
+
+
+class Command(BaseCommand):
+    help = 'Stream raw data points to a file as NDJSON, CSV, Arrow or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            type=str,
+            choices=FORMATS,
+            default='ndjson',
+            help='Output format (arrow and parquet need pyarrow)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='-',
+            help='File to write to, or - for stdout',
+        )
+        parser.add_argument(
+            '--source',
+            type=str,
+            choices=['crypto', 'stock', 'weather', 'currency'],
+            help='Only export this source type',
+        )
+        parser.add_argument('--symbol', type=str, help='Only export this symbol')
+        parser.add_argument('--start', type=str, help='Oldest timestamp to export (ISO 8601)')
+        parser.add_argument('--end', type=str, help='Newest timestamp to export (ISO 8601)')
+        parser.add_argument('--hours', type=int, help='Export the last N hours instead of --start')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Rows fetched and encoded per chunk',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_window(options['start'], options['end'], options['hours'])
+            rows = export_rows(options['source'], options['symbol'], start, end, options['chunk_size'])
+            chunks = export_chunks(options['format'], rows, options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        if options['output'] != '-':
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote {written} bytes to {options['output']} in {elapsed:.2f}s")
+            )
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from datavisualizer.importing import ADAPTERS, IMPORT_CHUNK_SIZE, HistoryImportError, HistoryImporter
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Backfill historical data points from CSV/NDJSON/Parquet files or a provider history adapter'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            type=str,
+            help='File to load, or the provider id for adapters such as coingecko (e.g. bitcoin)',
+        )
+        parser.add_argument(
+            '--adapter',
+            type=str,
+            choices=sorted(ADAPTERS),
+            help='How to read the source (defaults to the file extension)',
+        )
+        parser.add_argument(
+            '--source-type',
+            type=str,
+            choices=['crypto', 'stock', 'weather', 'currency'],
+            help='Source type for records that do not carry one',
+        )
+        parser.add_argument('--symbol', type=str, help='Symbol for records that do not carry one')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Days of history to request from provider adapters',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Rows inserted per transaction',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            help='Checkpoint file for resuming (defaults to <source>.checkpoint for files)',
+        )
+        parser.add_argument(
+            '--defer-indexes',
+            action='store_true',
+            help='Drop secondary DataPoint indexes during the load and rebuild them afterwards',
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        adapter_name = options['adapter'] or os.path.splitext(source)[1].lstrip('.').lower()
+        if adapter_name not in ADAPTERS:
+            raise CommandError(f"Cannot tell how to read {source}; pass --adapter ({', '.join(sorted(ADAPTERS))})")
+
+        checkpoint = options['checkpoint']
+        if checkpoint is None and os.path.exists(source):
+            checkpoint = f"{source}.checkpoint"
+
+        try:
+            adapter = ADAPTERS[adapter_name](source, days=options['days'])
+            importer = HistoryImporter(
+                chunk_size=options['chunk_size'],
+                checkpoint=checkpoint,
+                defer_indexes=options['defer_indexes'],
+                source_type=options['source_type'],
+                symbol=options['symbol'],
+            )
+            started = time.monotonic()
+            count = importer.run(adapter.records())
+        except (HistoryImportError, OSError) as e:
+            raise CommandError(str(e))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Submitted {count} of {importer.read} records in {elapsed:.1f}s "
+                f"({importer.invalid} invalid skipped, rows already stored are ignored)"
+            )
+        )
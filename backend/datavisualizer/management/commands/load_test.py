@@ -0,0 +1,145 @@
+from django.core.management.base import BaseCommand, CommandError
+from urllib.parse import urlsplit
+import asyncio
+import time
+
+# What a dashboard asks for on load and on every refresh
+DASHBOARD_PATHS = [
+    '/api/datapoints/summary/',
+    '/api/datapoints/chart_data/?hours=24&points=500&format=columnar',
+    '/api/datapoints/chart_data/?hours=24&points=500&source_type=crypto',
+    '/api/datapoints/?hours=24&page_size=100',
+]
+
+
+async def read_response(reader):
+    """Status code of one HTTP/1.1 response, consuming its body; None if the server hung up"""
+    status_line = await reader.readline()
+    if not status_line:
+        return None, False
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    return status, keep_alive
+
+
+async def client(host, port, paths, offset, deadline, timeout, results):
+    """One keep-alive client requesting paths in turn until deadline"""
+    reader = writer = None
+    i = offset
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: application/json\r\n"
+                f"Accept-Encoding: gzip\r\nConnection: keep-alive\r\n\r\n".encode()
+            )
+            await writer.drain()
+            status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            results.append((time.perf_counter() - started, type(e).__name__))
+            status, keep_alive = None, False
+        else:
+            results.append((time.perf_counter() - started, status))
+        if status is None or not keep_alive:
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Load-test the read endpoints of a running server with many concurrent keep-alive dashboard clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Base URL of the server under test',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='Path to request (repeatable, defaults to the dashboard refresh mix)',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=100,
+            help='Concurrent clients, each with its own connection',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds to run for',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Seconds before a request counts as failed',
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--url must be a plain http:// URL')
+        paths = options['path'] or DASHBOARD_PATHS
+        clients = max(1, options['clients'])
+
+        results = []
+
+        async def run():
+            deadline = time.monotonic() + options['duration']
+            await asyncio.gather(*(
+                client(url.hostname, url.port or 80, paths, i, deadline, options['timeout'], results)
+                for i in range(clients)
+            ))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        ok = sorted(latency for latency, outcome in results if outcome in (200, 304))
+        failures = {}
+        for _, outcome in results:
+            if outcome not in (200, 304):
+                failures[outcome] = failures.get(outcome, 0) + 1
+
+        self.stdout.write(f"{clients} clients, {len(paths)} paths, {elapsed:.1f}s")
+        self.stdout.write(f"  requests:  {len(results)} ({len(ok) / elapsed:.1f} successful/s)")
+        if ok:
+            self.stdout.write(
+                f"  latency:   p50 {percentile(ok, 0.5) * 1000:.0f} ms, p95 {percentile(ok, 0.95) * 1000:.0f} ms, "
+                f"p99 {percentile(ok, 0.99) * 1000:.0f} ms, max {ok[-1] * 1000:.0f} ms"
+            )
+        if failures:
+            summary = ', '.join(f"{outcome}: {count}" for outcome, count in sorted(failures.items(), key=str))
+            self.stdout.write(self.style.WARNING(f"  failures:  {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('  no failures'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from datavisualizer.partitions import ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly DataPoint partitions (PostgreSQL profile only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Months after the current one to create partitions for',
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write(self.style.WARNING('DataPoint is not partitioned on this database; nothing to do'))
+            return
+        created = ensure_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from datavisualizer.compactstore import BACKFILL_CHUNK_SIZE, backfill
+
+
+class Command(BaseCommand):
+    help = 'Copy existing data points into the compact Series/SeriesPoint schema'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--after',
+            type=int,
+            default=0,
+            help='Resume after this DataPoint id (printed as the backfill progresses)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=BACKFILL_CHUNK_SIZE,
+            help='Rows copied per transaction',
+        )
+
+    def handle(self, *args, **options):
+        last = options['after']
+        for last in backfill(options['after'], max(1, options['chunk_size'])):
+            self.stdout.write(f"Copied up to DataPoint {last}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill finished at DataPoint {last}; set COMPACT_STORAGE=read to serve reads from it"
+        ))
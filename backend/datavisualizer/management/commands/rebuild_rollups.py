@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from datavisualizer.rollups import INTERVALS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the OHLC rollup tables from raw data points (buckets older than the raw data are kept)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            action='append',
+            choices=list(INTERVALS),
+            help='Interval to rebuild (repeatable, defaults to all)',
+        )
+        parser.add_argument(
+            '--source',
+            type=str,
+            choices=['crypto', 'stock', 'weather', 'currency'],
+            help='Only rebuild rollups for this source type',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(options['interval'], options['source'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup buckets"))
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datavisualizer.models import DataSource
+from datavisualizer.scheduler import CollectorScheduler
+from datavisualizer.services import DataCollectionService
+import signal
+
+
+class Command(BaseCommand):
+    help = 'Run the collector daemon, polling each active DataSource on its own interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of sources that may be collected at the same time',
+        )
+        parser.add_argument(
+            '--reload-interval',
+            type=int,
+            default=60,
+            help='Seconds between re-reading DataSource rows from the database',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Collect every source that is due right now and exit',
+        )
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Create default data sources when none exist yet',
+        )
+
+    def handle(self, *args, **options):
+        service = DataCollectionService()
+
+        if options['seed']:
+            self._seed_sources(service)
+
+        scheduler = CollectorScheduler(
+            service=service,
+            max_workers=options['workers'],
+            reload_interval=options['reload_interval'],
+        )
+
+        if options['once']:
+            count = scheduler.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Collected {count} data points from due sources"))
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write(self.style.WARNING("Stopping collector..."))
+            scheduler.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(self.style.SUCCESS(f"Collector started at {timezone.now()}"))
+        scheduler.run()
+        self.stdout.write(self.style.SUCCESS(f"Collector stopped at {timezone.now()}"))
+
+    def _seed_sources(self, service):
+        if DataSource.objects.exists():
+            return
+
+        defaults = [
+            ('CoinGecko', 'crypto', service.crypto_service, False),
+            ('Alpha Vantage', 'stock', service.stock_service, True),
+            ('OpenWeather', 'weather', service.weather_service, True),
+            ('ExchangeRate', 'currency', service.exchange_service, False),
+        ]
+        for name, source_type, api_service, api_key_required in defaults:
+            DataSource.objects.create(
+                name=name,
+                source_type=source_type,
+                api_url=api_service.BASE_URL,
+                api_key_required=api_key_required,
+                symbols=list(api_service.DEFAULT_SYMBOLS),
+            )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(defaults)} default data sources"))
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:18
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def populate_latest_values(apps, schema_editor):
+    DataPoint = apps.get_model("datavisualizer", "DataPoint")
+    LatestValue = apps.get_model("datavisualizer", "LatestValue")
+
+    series = (
+        DataPoint.objects.order_by()
+        .values("source_type", "symbol")
+        .annotate(total=models.Count("id"))
+    )
+    rows = []
+    for entry in series:
+        points = DataPoint.objects.filter(
+            source_type=entry["source_type"], symbol=entry["symbol"]
+        ).order_by("-timestamp")
+        latest = points.first()
+        reference = points.filter(
+            timestamp__lte=latest.timestamp - timedelta(hours=24)
+        ).first()
+        rows.append(
+            LatestValue(
+                source_type=entry["source_type"],
+                symbol=entry["symbol"],
+                value=latest.value,
+                timestamp=latest.timestamp,
+                reference_value=reference.value if reference else None,
+                reference_timestamp=reference.timestamp if reference else None,
+                data_points=entry["total"],
+            )
+        )
+    LatestValue.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datavisualizer", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source_type",
+                    models.CharField(
+                        choices=[
+                            ("crypto", "Cryptocurrency"),
+                            ("stock", "Stock Market"),
+                            ("weather", "Weather"),
+                            ("currency", "Currency Exchange"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=20)),
+                ("value", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "reference_value",
+                    models.DecimalField(
+                        blank=True, decimal_places=8, max_digits=20, null=True
+                    ),
+                ),
+                ("reference_timestamp", models.DateTimeField(blank=True, null=True)),
+                ("data_points", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["source_type", "symbol"],
+                "unique_together": {("source_type", "symbol")},
+            },
+        ),
+        migrations.RunPython(populate_latest_values, migrations.RunPython.noop),
+    ]
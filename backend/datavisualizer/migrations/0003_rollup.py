@@ -0,0 +1,110 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:23
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+
+def populate_rollups(apps, schema_editor):
+    DataPoint = apps.get_model("datavisualizer", "DataPoint")
+    Rollup = apps.get_model("datavisualizer", "Rollup")
+
+    buckets = {}
+    points = DataPoint.objects.order_by("timestamp").values_list(
+        "source_type", "symbol", "timestamp", "value"
+    )
+    for source_type, symbol, timestamp, value in points.iterator():
+        epoch = int(timestamp.timestamp())
+        for interval, seconds in INTERVALS.items():
+            start = datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+            key = (source_type, symbol, interval, start)
+            row = buckets.get(key)
+            if row is None:
+                buckets[key] = Rollup(
+                    source_type=source_type,
+                    symbol=symbol,
+                    interval=interval,
+                    bucket=start,
+                    open=value,
+                    high=value,
+                    low=value,
+                    close=value,
+                    open_timestamp=timestamp,
+                    close_timestamp=timestamp,
+                    total=value,
+                    count=1,
+                )
+            else:
+                row.high = max(row.high, value)
+                row.low = min(row.low, value)
+                row.close = value
+                row.close_timestamp = timestamp
+                row.total += value
+                row.count += 1
+    Rollup.objects.bulk_create(buckets.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datavisualizer", "0002_latestvalue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Rollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source_type",
+                    models.CharField(
+                        choices=[
+                            ("crypto", "Cryptocurrency"),
+                            ("stock", "Stock Market"),
+                            ("weather", "Weather"),
+                            ("currency", "Currency Exchange"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=20)),
+                (
+                    "interval",
+                    models.CharField(
+                        choices=[
+                            ("1m", "1 minute"),
+                            ("5m", "5 minutes"),
+                            ("1h", "1 hour"),
+                            ("1d", "1 day"),
+                        ],
+                        max_length=4,
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("open", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("high", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("low", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("close", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("open_timestamp", models.DateTimeField()),
+                ("close_timestamp", models.DateTimeField()),
+                ("total", models.DecimalField(decimal_places=8, max_digits=30)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["source_type", "symbol", "interval", "bucket"],
+                "unique_together": {("source_type", "symbol", "interval", "bucket")},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.1 on 2026-10-17 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datavisualizer", "0003_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Series",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source_type",
+                    models.CharField(
+                        choices=[
+                            ("crypto", "Cryptocurrency"),
+                            ("stock", "Stock Market"),
+                            ("weather", "Weather"),
+                            ("currency", "Currency Exchange"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=20)),
+                ("attributes", models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                "verbose_name_plural": "series",
+                "ordering": ["source_type", "symbol"],
+                "unique_together": {("source_type", "symbol")},
+            },
+        ),
+        migrations.CreateModel(
+            name="SeriesPoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                ("value", models.FloatField()),
+                ("market_cap", models.FloatField(blank=True, null=True)),
+                ("volume_24h", models.FloatField(blank=True, null=True)),
+                ("change_24h", models.FloatField(blank=True, null=True)),
+                ("change", models.FloatField(blank=True, null=True)),
+                ("change_percent", models.FloatField(blank=True, null=True)),
+                ("humidity", models.FloatField(blank=True, null=True)),
+                ("pressure", models.FloatField(blank=True, null=True)),
+                (
+                    "series",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="points",
+                        to="datavisualizer.series",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("series", "timestamp")},
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+import re
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+TABLE = "datavisualizer_datapoint"
+OLD_TABLE = f"{TABLE}_unpartitioned"
+MONTHS_AHEAD = 3
+
+
+def month_start(moment, offset=0):
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_datapoints(apps, schema_editor):
+    """Rebuild DataPoint as a table partitioned by month of timestamp (PostgreSQL only)
+
+    Primary and unique keys of a partitioned table must include the
+    partition key, so the primary key becomes (id, timestamp). The plain
+    index on timestamp becomes a BRIN index, which is tiny for
+    append-mostly time series; the other indexes are recreated as they
+    were.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}")
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+            [OLD_TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s",
+            [OLD_TABLE],
+        )
+        constraint_names = {name for name, _, _ in constraints}
+        indexes = [
+            (name, definition)
+            for name, definition in cursor.fetchall()
+            if name not in constraint_names
+        ]
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+            'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+        cursor.execute(f'SELECT min("timestamp") FROM {OLD_TABLE}')
+        oldest = cursor.fetchone()[0]
+        now = datetime.now(timezone.utc)
+        start = month_start(oldest or now)
+        while start <= month_start(now, MONTHS_AHEAD):
+            end = month_start(start, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_{start:%Y%m} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+            start = end
+
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(max(id), 0) + 1, false) FROM {TABLE}"
+        )
+        cursor.execute(f"DROP TABLE {OLD_TABLE}")
+
+        for name, kind, definition in constraints:
+            if kind == "p":
+                definition = 'PRIMARY KEY (id, "timestamp")'
+            cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+        for name, definition in indexes:
+            definition = re.sub(
+                rf" ON (\S+\.)?{OLD_TABLE} ", f" ON {TABLE} ", definition
+            )
+            if definition.endswith('USING btree ("timestamp")'):
+                definition = definition.replace(
+                    'USING btree ("timestamp")', 'USING brin ("timestamp")'
+                )
+            cursor.execute(definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datavisualizer", "0004_series_seriespoint"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_datapoints, migrations.RunPython.noop),
+    ]
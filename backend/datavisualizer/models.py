@@ -31,6 +31,115 @@ class DataPoint(models.Model):
         return f"{self.source_type} - {self.symbol}: {self.value} at {self.timestamp}"
 
 
+class LatestValue(models.Model):
+    """Latest value per series, maintained by the ingestion path
+    
+    Keeps everything the dashboard summary needs so it can be served from a
+    single query: the newest point, the newest point at least 24 hours older
+    than it (for the 24h change) and the series' total point count.
+    """
+    source_type = models.CharField(max_length=20, choices=DataPoint.SOURCE_CHOICES)
+    symbol = models.CharField(max_length=20)
+    value = models.DecimalField(max_digits=20, decimal_places=8)
+    timestamp = models.DateTimeField()
+    reference_value = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True)
+    reference_timestamp = models.DateTimeField(null=True, blank=True)
+    data_points = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['source_type', 'symbol']
+        unique_together = ['source_type', 'symbol']
+    
+    def __str__(self):
+        return f"{self.source_type} - {self.symbol}: {self.value} at {self.timestamp}"
+
+
+class Rollup(models.Model):
+    """Precomputed OHLC bucket for one series at one interval
+    
+    Maintained incrementally by the ingestion path so long-range aggregate
+    queries read a handful of buckets instead of scanning raw data points.
+    open_timestamp/close_timestamp record which raw points set open and
+    close, so late or out-of-order points can be merged correctly.
+    """
+    INTERVAL_CHOICES = [
+        ('1m', '1 minute'),
+        ('5m', '5 minutes'),
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    ]
+    
+    source_type = models.CharField(max_length=20, choices=DataPoint.SOURCE_CHOICES)
+    symbol = models.CharField(max_length=20)
+    interval = models.CharField(max_length=4, choices=INTERVAL_CHOICES)
+    bucket = models.DateTimeField()
+    open = models.DecimalField(max_digits=20, decimal_places=8)
+    high = models.DecimalField(max_digits=20, decimal_places=8)
+    low = models.DecimalField(max_digits=20, decimal_places=8)
+    close = models.DecimalField(max_digits=20, decimal_places=8)
+    open_timestamp = models.DateTimeField()
+    close_timestamp = models.DateTimeField()
+    total = models.DecimalField(max_digits=30, decimal_places=8)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['source_type', 'symbol', 'interval', 'bucket']
+        unique_together = ['source_type', 'symbol', 'interval', 'bucket']
+    
+    @property
+    def avg(self):
+        return self.total / self.count if self.count else None
+    
+    def __str__(self):
+        return f"{self.source_type} - {self.symbol} {self.interval} at {self.bucket}"
+
+
+class Series(models.Model):
+    """One (source_type, symbol) of the compact storage schema
+    
+    Metadata that never changes for a series (a currency pair's base and
+    target) is stored here once instead of on every point.
+    """
+    source_type = models.CharField(max_length=20, choices=DataPoint.SOURCE_CHOICES)
+    symbol = models.CharField(max_length=20)
+    attributes = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        ordering = ['source_type', 'symbol']
+        unique_together = ['source_type', 'symbol']
+        verbose_name_plural = 'series'
+    
+    def __str__(self):
+        return f"{self.source_type} - {self.symbol}"
+
+
+class SeriesPoint(models.Model):
+    """Narrow fact row of the compact storage schema (see compactstore.py)
+    
+    A float value and the per-point metrics providers send as typed,
+    nullable columns; the (series, timestamp) unique index serves range
+    scans on its own.
+    """
+    series = models.ForeignKey(Series, on_delete=models.CASCADE, related_name='points', db_index=False)
+    timestamp = models.DateTimeField()
+    value = models.FloatField()
+    market_cap = models.FloatField(null=True, blank=True)
+    volume_24h = models.FloatField(null=True, blank=True)
+    change_24h = models.FloatField(null=True, blank=True)
+    change = models.FloatField(null=True, blank=True)
+    change_percent = models.FloatField(null=True, blank=True)
+    humidity = models.FloatField(null=True, blank=True)
+    pressure = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['series', 'timestamp']
+    
+    def __str__(self):
+        return f"{self.series_id}: {self.value} at {self.timestamp}"
+
+
 class DataSource(models.Model):
     """Configuration for different data sources"""
     name = models.CharField(max_length=100, unique=True)
@@ -0,0 +1,78 @@
+"""Monthly partitions of DataPoint on PostgreSQL
+
+Migration 0005 makes datavisualizer_datapoint a table partitioned by
+range of timestamp, with a default partition catching rows no monthly
+partition covers. ensure_partitions() creates the partitions for the
+coming months; a month whose rows already went to the default partition
+has them moved into its new partition in the same transaction.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import DataPoint
+
+logger = logging.getLogger(__name__)
+
+PARENT = DataPoint._meta.db_table
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+
+def month_start(moment, offset=0):
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(start):
+    return f"{PARENT}_{start:%Y%m}"
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [PARENT])
+        return cursor.fetchone() is not None
+
+
+def existing_partitions():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass',
+            [PARENT],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_partition(start):
+    """Create the partition for the month starting at start, adopting its rows from the default one"""
+    end = month_start(start, 1)
+    name = connection.ops.quote_name(partition_name(start))
+    parent = connection.ops.quote_name(PARENT)
+    default = connection.ops.quote_name(DEFAULT_PARTITION)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(f'ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+
+
+def ensure_partitions(months_ahead=3, now=None):
+    """Create missing partitions from this month to months_ahead; returns their names"""
+    if not is_partitioned():
+        return []
+    now = now or timezone.now()
+    existing = existing_partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        start = month_start(now, offset)
+        if partition_name(start) not in existing:
+            create_partition(start)
+            created.append(partition_name(start))
+            logger.info(f"Created DataPoint partition {partition_name(start)}")
+    return created
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Window name -> seconds it spans, in the order quotas are configured
+WINDOWS = {
+    'per_second': 1,
+    'per_minute': 60,
+    'per_day': 86400,
+}
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to capacity tokens, refilled continuously"""
+
+    def __init__(self, capacity, period, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until one whole token is available (0 when one is ready)"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-provider limiter combining one token bucket per quota window
+
+    acquire() blocks until every window has a token, so calls beyond the quota
+    are queued and paced instead of being sent and wasted on errors. Usage
+    counters are kept so symbol lists can be tuned against the real limits.
+    """
+
+    def __init__(self, provider, limits=None, clock=time.monotonic):
+        self.provider = provider
+        self.clock = clock
+        self.limits = {window: limit for window, limit in (limits or {}).items() if limit}
+        self.buckets = {
+            window: TokenBucket(limit, WINDOWS[window], clock)
+            for window, limit in self.limits.items()
+        }
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, timeout=None):
+        """Take one call from every window, waiting for tokens if needed
+
+        Returns False without consuming anything if the wait would exceed
+        timeout seconds (e.g. the daily quota is exhausted).
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                for bucket in self.buckets.values():
+                    bucket.refill(now)
+                wait = max((bucket.wait_time() for bucket in self.buckets.values()), default=0.0)
+
+                if wait <= 0:
+                    for bucket in self.buckets.values():
+                        bucket.tokens -= 1
+                    self.calls += 1
+                    if waited:
+                        self.throttled += 1
+                        self.wait_seconds += waited
+                    return True
+
+                if timeout is not None and waited + wait > timeout:
+                    self.rejected += 1
+                    logger.warning(
+                        f"{self.provider} quota exhausted; next call possible in {wait:.0f}s"
+                    )
+                    return False
+
+            time.sleep(wait)
+            waited += wait
+
+    def usage(self):
+        """Snapshot of quota usage for monitoring"""
+        with self._lock:
+            now = self.clock()
+            windows = {}
+            for window, bucket in self.buckets.items():
+                bucket.refill(now)
+                windows[window] = {
+                    'limit': self.limits[window],
+                    'remaining': int(bucket.tokens),
+                }
+            return {
+                'calls': self.calls,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+                'wait_seconds': round(self.wait_seconds, 3),
+                'windows': windows,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """Return the process-wide limiter shared by every service for provider"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limits = getattr(settings, 'PROVIDER_RATE_LIMITS', {}).get(provider)
+            limiter = RateLimiter(provider, limits)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def quota_usage():
+    """Usage counters for every provider that has made calls in this process"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {provider: limiter.usage() for provider, limiter in limiters.items()}
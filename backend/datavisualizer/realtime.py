@@ -0,0 +1,212 @@
+"""Server-Sent Events push of newly ingested data points
+
+Subscribers are async generators on the ASGI event loop, so idle
+connections cost a queue each rather than a thread. A channel layer fans
+each batch out to the subscribers whose source_type/symbol filter matches;
+InMemoryChannelLayer serves the subscribers of one server process and is
+the stand-in for a shared layer (e.g. Redis) with the same interface.
+
+The collector runs in its own process, so batches reach the layer through
+DeltaRelay: one task per server process polls for rows after the delta
+cursor and publishes them, one query per interval however many clients
+are connected.
+
+Every subscriber has a bounded queue. A client too slow to drain it has
+its backlog dropped and receives a ``resync`` event instead, after which
+it refetches with since=<last event id> rather than holding server memory.
+"""
+import asyncio
+import json
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .deltas import MAX_DELTA_ROWS, acurrent_cursor
+from .models import DataPoint
+
+logger = logging.getLogger(__name__)
+
+POINT_FIELDS = ['id', 'timestamp', 'source_type', 'symbol', 'value']
+
+# Queued in place of a slow subscriber's dropped backlog
+RESYNC = object()
+
+
+class Subscription:
+    """One client's filter and bounded queue, owned by the event loop it was created on"""
+
+    def __init__(self, source_type=None, symbol=None, queue_size=None):
+        self.source_type = source_type
+        self.symbol = symbol
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size or settings.REALTIME_QUEUE_SIZE)
+        self.overflowed = False
+
+    @property
+    def group(self):
+        return (self.source_type, self.symbol)
+
+    def offer(self, message):
+        """Queue a message without ever blocking the publisher (runs on self.loop)"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = True
+            self.queue.put_nowait(RESYNC)
+            logger.info(f"Subscriber to {self.group} fell behind, asking it to resync")
+
+    async def get(self, timeout=None):
+        message = await asyncio.wait_for(self.queue.get(), timeout)
+        if message is RESYNC:
+            self.overflowed = False
+        return message
+
+
+class InMemoryChannelLayer:
+    """Fan-out of point batches to the subscribers of this process
+
+    Subscribers join the group of their filter: (source_type, symbol) with
+    None for "any". A point is delivered to the four groups that can match
+    it, so publishing costs the number of interested subscribers rather
+    than the number connected. publish() may be called from any thread.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(members) for members in self.groups.values())
+
+    def subscribe(self, source_type=None, symbol=None, queue_size=None):
+        subscription = Subscription(source_type or None, symbol or None, queue_size)
+        with self.lock:
+            self.groups.setdefault(subscription.group, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            members = self.groups.get(subscription.group)
+            if members is not None:
+                members.discard(subscription)
+                if not members:
+                    del self.groups[subscription.group]
+
+    def publish(self, points, cursor):
+        """Deliver point dicts to matching subscribers, each getting one message"""
+        deliveries = {}
+        with self.lock:
+            for point in points:
+                source_type, symbol = point['source_type'], point['symbol']
+                for group in [(source_type, symbol), (source_type, None), (None, symbol), (None, None)]:
+                    for subscription in self.groups.get(group, ()):
+                        deliveries.setdefault(subscription, []).append(point)
+
+        for subscription, matching in deliveries.items():
+            message = {'cursor': cursor, 'points': matching}
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+        return len(deliveries)
+
+
+class DeltaRelay:
+    """Polls for newly inserted data points and publishes them to a layer
+
+    Runs as a task on the server's event loop while anyone is subscribed.
+    """
+
+    def __init__(self, layer, interval=None):
+        self.layer = layer
+        self.interval = interval
+        self.task = None
+
+    def ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+
+    async def run(self):
+        interval = self.interval or settings.REALTIME_POLL_INTERVAL
+        cursor = await acurrent_cursor()
+        while len(self.layer):
+            await asyncio.sleep(interval)
+            try:
+                points, cursor = await sync_to_async(self.fetch)(cursor)
+            except Exception as e:
+                logger.error(f"Realtime relay failed to read new points: {e}")
+                continue
+            if points:
+                self.layer.publish(points, cursor)
+
+    def fetch(self, cursor):
+        points = list(
+            DataPoint.objects.filter(id__gt=cursor).order_by('id').values(*POINT_FIELDS)[:MAX_DELTA_ROWS]
+        )
+        if points:
+            cursor = points[-1]['id']
+        return points, cursor
+
+
+layer = InMemoryChannelLayer()
+relay = DeltaRelay(layer)
+
+
+def _event(name, data, event_id=None):
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _catch_up(since, source_type, symbol):
+    queryset = DataPoint.objects.all()
+    if source_type:
+        queryset = queryset.filter(source_type=source_type)
+    if symbol:
+        queryset = queryset.filter(symbol=symbol)
+    points = list(since.filter(queryset).values(*POINT_FIELDS)[:MAX_DELTA_ROWS])
+    cursor = points[-1]['id'] if points else since.cursor or 0
+    return points, cursor
+
+
+async def event_stream(subscription, since=None, heartbeat=None):
+    """SSE text for one subscription, unsubscribing when the client goes away
+
+    With since (a deltas.Since) the points stored after it are sent first,
+    so a reconnecting EventSource (Last-Event-ID) misses nothing.
+    """
+    heartbeat = heartbeat or settings.REALTIME_HEARTBEAT
+    cursor = 0
+    try:
+        yield "retry: 3000\n\n"
+        if since is not None:
+            points, cursor = await sync_to_async(_catch_up)(since, subscription.source_type, subscription.symbol)
+            if points:
+                yield _event('datapoints', points, cursor)
+
+        while True:
+            try:
+                message = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if message is RESYNC:
+                yield _event('resync', {'cursor': cursor})
+                continue
+            # Live batches can overlap the catch-up read
+            points = [point for point in message['points'] if point['id'] > cursor]
+            cursor = max(cursor, message['cursor'])
+            if points:
+                yield _event('datapoints', points, cursor)
+    finally:
+        layer.unsubscribe(subscription)
@@ -0,0 +1,37 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed
+
+    Produces the same compact output as DRF's renderer. Datetimes and the
+    types orjson does not know (Decimal, lazy strings, querysets...) go
+    through DRF's own encoder, so values render exactly as before.
+    Indented output for browsers and a missing orjson fall back to the
+    stock renderer.
+    """
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self._encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """Selected with ?format=columnar by time-series actions
+
+    The views build parallel arrays ({"t": [epoch ms], "v": [float]})
+    for it instead of one serialized object per point.
+    """
+
+    format = 'columnar'
@@ -0,0 +1,138 @@
+import logging
+import random
+import threading
+import time
+from datetime import timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Per-host breaker that fails fast while a provider is unhealthy
+
+    closed: requests flow; consecutive failures are counted.
+    open: requests are refused until reset_timeout has passed.
+    half_open: a single trial request is let through; success closes the
+    breaker again, failure re-opens it for another reset_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=60, clock=time.monotonic):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request to this host may go ahead"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self.trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self.trial_in_flight = True
+            return True
+
+    def release(self):
+        """Give back a permission from allow() without reporting an outcome"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.host} closed again")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit for {self.host} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, round(self.reset_timeout - (self.clock() - self.opened_at), 1))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in': retry_in,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(host):
+    """Return the process-wide breaker for host"""
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                failure_threshold=getattr(settings, 'CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5),
+                reset_timeout=getattr(settings, 'CIRCUIT_BREAKER_RESET_TIMEOUT', 60),
+            )
+            _breakers[host] = breaker
+        return breaker
+
+
+def circuit_states():
+    """Breaker state for every host contacted in this process"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {host: breaker.snapshot() for host, breaker in breakers.items()}
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if timezone.is_naive(retry_at):
+        retry_at = timezone.make_aware(retry_at, dt_timezone.utc)
+    return max(0.0, (retry_at - timezone.now()).total_seconds())
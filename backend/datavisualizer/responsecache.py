@@ -0,0 +1,214 @@
+"""Cache for read endpoints whose answers only change when data is written
+
+Responses are stored in the Django cache under a key made of the request
+path, its query parameters and the data version of the series the request
+covers, so a write makes the old entries unreachable and nothing has to be
+deleted. Keys and ETags also roll over every RESPONSE_CACHE_TTL seconds,
+which bounds how far a sliding ``hours`` window can lag behind the clock,
+even for clients that keep getting 304s. Eviction (LRU for
+locmem, culling for file) is the cache backend's.
+
+Only one worker recomputes a cold key: it claims a lock with cache.add()
+while the others serve the previous version of the response if there is
+one, or wait for the winner. Every response carries an ETag and
+Last-Modified, and a request whose If-None-Match still matches is
+answered 304 without touching the database.
+
+Versions are bumped by the collector, a separate process, so the cache
+must be shared with it. With a process-local backend (locmem) writes
+would never invalidate anything, so the cache is bypassed instead.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from .dataversions import adata_version, data_version, version_time
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth keeping with a cached body
+CACHED_HEADERS = ['X-Data-Cursor']
+
+# How often a worker waiting for another one's recomputation checks for it
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _request_key(request):
+    params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+    return hashlib.sha256(f"{request.path}?{params}".encode()).hexdigest()[:32]
+
+
+def _wait_for(key, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+async def _await_for(key, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        entry = await cache.aget(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _entry(response):
+    """What is cached of a response, or None if it must not be"""
+    if response.status_code != status.HTTP_200_OK:
+        return None
+    return {
+        'data': list(response.data) if isinstance(response.data, list) else response.data,
+        'headers': {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+    }
+
+
+def _compute(render, key, request_key):
+    response = render()
+    entry = _entry(response)
+    if entry is not None:
+        cache.set_many({key: entry, _latest_key(request_key): entry}, settings.RESPONSE_CACHE_TTL)
+    return entry, response
+
+
+async def _acompute(render, key, request_key):
+    response = await render()
+    entry = _entry(response)
+    if entry is not None:
+        await cache.aset_many({key: entry, _latest_key(request_key): entry}, settings.RESPONSE_CACHE_TTL)
+    return entry, response
+
+
+def _latest_key(request_key):
+    return f"response:{request_key}:latest"
+
+
+def _bypass(request):
+    if not settings.RESPONSE_CACHE_ENABLED or 'since' in request.query_params:
+        return True
+    # Fail closed: a per-process cache never sees the collector's version bumps
+    return isinstance(caches['default'], LocMemCache)
+
+
+def _not_modified(request, etag):
+    """Whether If-None-Match lists etag (weak comparison, as for GET)"""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in etags or etag in {tag.removeprefix('W/') for tag in etags}
+
+
+def _validators(request, version):
+    """(request key, cache key, ETag, response headers) for a request at a data version"""
+    request_key = _request_key(request)
+    period = int(time.time() // settings.RESPONSE_CACHE_TTL)
+    etag = f'"{request_key[:16]}-{version}-{period}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(version_time(version)),
+        # Cacheable, but always revalidated so new data shows up at once
+        'Cache-Control': 'no-cache',
+    }
+    return request_key, f"response:{request_key}:{version}:{period}", etag, headers
+
+
+def cached_response(view):
+    """Cache a DRF action by query parameters and data version
+
+    Requests with ``since`` are deltas against a client cursor and bypass
+    the cache. Async actions get an async wrapper using the cache's async
+    API.
+    """
+    if iscoroutinefunction(view):
+        return _async_cached_response(view)
+
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        if _bypass(request):
+            return view(self, request, *args, **kwargs)
+
+        version = data_version(request.query_params.get('source_type'), request.query_params.get('symbol'))
+        request_key, key, etag, headers = _validators(request, version)
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        def render():
+            return view(self, request, *args, **kwargs)
+
+        entry = cache.get(key)
+        if entry is None:
+            lock_key = f"{key}:lock"
+            lock_timeout = settings.RESPONSE_CACHE_LOCK_TIMEOUT
+            if cache.add(lock_key, 1, lock_timeout):
+                try:
+                    entry, response = _compute(render, key, request_key)
+                finally:
+                    cache.delete(lock_key)
+            else:
+                # Someone else is recomputing: serve the previous answer rather than pile on
+                entry = cache.get(_latest_key(request_key))
+                if entry is not None:
+                    # Possibly an older version, so it must not validate or date itself as the current one
+                    del headers['ETag']
+                    del headers['Last-Modified']
+                else:
+                    entry = _wait_for(key, lock_timeout)
+                if entry is None:
+                    logger.info(f"Gave up waiting for {request.path} to be recomputed")
+                    entry, response = _compute(render, key, request_key)
+            if entry is None:
+                return response
+
+        return Response(entry['data'], headers={**entry['headers'], **headers})
+    return wrapper
+
+
+def _async_cached_response(view):
+    @wraps(view)
+    async def wrapper(self, request, *args, **kwargs):
+        if _bypass(request):
+            return await view(self, request, *args, **kwargs)
+
+        version = await adata_version(request.query_params.get('source_type'), request.query_params.get('symbol'))
+        request_key, key, etag, headers = _validators(request, version)
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        def render():
+            return view(self, request, *args, **kwargs)
+
+        entry = await cache.aget(key)
+        if entry is None:
+            lock_key = f"{key}:lock"
+            lock_timeout = settings.RESPONSE_CACHE_LOCK_TIMEOUT
+            if await cache.aadd(lock_key, 1, lock_timeout):
+                try:
+                    entry, response = await _acompute(render, key, request_key)
+                finally:
+                    await cache.adelete(lock_key)
+            else:
+                entry = await cache.aget(_latest_key(request_key))
+                if entry is not None:
+                    del headers['ETag']
+                    del headers['Last-Modified']
+                else:
+                    entry = await _await_for(key, lock_timeout)
+                if entry is None:
+                    logger.info(f"Gave up waiting for {request.path} to be recomputed")
+                    entry, response = await _acompute(render, key, request_key)
+            if entry is None:
+                return response
+
+        return Response(entry['data'], headers={**entry['headers'], **headers})
+    return wrapper
@@ -0,0 +1,128 @@
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from . import compactstore
+from .dataversions import bump_data_versions
+from .models import DataPoint, LatestValue, Rollup
+from .rollups import INTERVALS, bucket_start
+
+logger = logging.getLogger(__name__)
+
+RAW = 'raw'
+TIERS = [RAW] + list(INTERVALS)
+
+
+def retention_policy(source_type):
+    """Days to keep each tier for source_type; None means forever"""
+    policies = getattr(settings, 'DATA_RETENTION', {})
+    policy = {tier: None for tier in TIERS}
+    policy.update(policies.get('default', {}))
+    policy.update(policies.get(source_type, {}))
+    return policy
+
+
+def tier_cutoff(days, now=None):
+    """Oldest timestamp a tier keeps, aligned to a day boundary
+
+    Alignment means a daily bucket is never left half-covered by raw rows,
+    so rollups recomputed from raw data stay complete.
+    """
+    if days is None:
+        return None
+    now = now or timezone.now()
+    return bucket_start(now - timedelta(days=days), '1d')
+
+
+class Compactor:
+    """Applies the retention policy by deleting expired rows in small batches
+
+    Each batch is its own short transaction, so the collector and API keep
+    writing and reading between batches. Rollups are maintained at ingestion
+    time, so raw rows only need deleting once they age out; the coarser
+    tiers already hold their history.
+    """
+
+    def __init__(self, chunk_size=None, pause=0, dry_run=False):
+        if chunk_size is None:
+            chunk_size = getattr(settings, 'DATA_RETENTION_CHUNK_SIZE', 5000)
+        self.chunk_size = max(1, chunk_size)
+        self.pause = pause
+        self.dry_run = dry_run
+
+    def compact(self, source_types=None, now=None):
+        """Apply retention to every source type; returns {(source_type, tier): rows deleted}"""
+        now = now or timezone.now()
+        source_types = source_types or [choice for choice, _ in DataPoint.SOURCE_CHOICES]
+
+        deleted = {}
+        for source_type in source_types:
+            policy = retention_policy(source_type)
+            for tier in TIERS:
+                cutoff = tier_cutoff(policy.get(tier), now)
+                if cutoff is None:
+                    continue
+                if tier == RAW:
+                    count = self.compact_raw(source_type, cutoff)
+                else:
+                    count = self.compact_rollups(source_type, tier, cutoff)
+                if count:
+                    deleted[(source_type, tier)] = count
+                    logger.info(f"Compacted {count} {tier} rows for {source_type} older than {cutoff}")
+        return deleted
+
+    def compact_raw(self, source_type, cutoff):
+        expired = DataPoint.objects.filter(source_type=source_type, timestamp__lt=cutoff)
+        if self.dry_run:
+            return expired.count()
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(expired.order_by('timestamp').values_list('id', 'symbol')[:self.chunk_size])
+                if not rows:
+                    break
+                DataPoint.objects.filter(id__in=[row[0] for row in rows]).delete()
+                bump_data_versions({(source_type, row[1]) for row in rows})
+
+                # Keep the summary's point counts in line with what is stored
+                for symbol, count in Counter(row[1] for row in rows).items():
+                    LatestValue.objects.filter(source_type=source_type, symbol=symbol).update(
+                        data_points=Greatest(F('data_points') - count, Value(0))
+                    )
+            total += len(rows)
+            self._sleep()
+
+        # The compact schema's copy of the same points
+        while compactstore.writes_enabled():
+            with transaction.atomic():
+                if not compactstore.delete_before(source_type, cutoff, self.chunk_size):
+                    break
+            self._sleep()
+        return total
+
+    def compact_rollups(self, source_type, interval, cutoff):
+        expired = Rollup.objects.filter(source_type=source_type, interval=interval, bucket__lt=cutoff)
+        if self.dry_run:
+            return expired.count()
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(expired.order_by('bucket').values_list('id', 'symbol')[:self.chunk_size])
+                if not rows:
+                    break
+                Rollup.objects.filter(id__in=[row[0] for row in rows]).delete()
+                bump_data_versions({(source_type, row[1]) for row in rows})
+            total += len(rows)
+            self._sleep()
+        return total
+
+    def _sleep(self):
+        if self.pause:
+            time.sleep(self.pause)
@@ -0,0 +1,252 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from .bulk import insert_rows
+from .models import DataPoint, Rollup
+
+logger = logging.getLogger(__name__)
+
+# Rollup interval -> bucket width in seconds
+INTERVALS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '1h': 60 * 60,
+    '1d': 24 * 60 * 60,
+}
+
+ROLLUP_UPDATE_FIELDS = [
+    'open', 'high', 'low', 'close', 'open_timestamp', 'close_timestamp', 'total', 'count', 'updated_at',
+]
+
+REBUILD_BATCH_SIZE = 1000
+
+# DataPoint stores values with 8 decimal places
+VALUE_QUANTUM = Decimal('0.00000001')
+
+
+def bucket_start(timestamp, interval):
+    """Start of the UTC-aligned bucket of the given interval containing timestamp"""
+    seconds = INTERVALS[interval]
+    epoch = int(timestamp.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+
+
+def bucket_end(bucket, interval):
+    return bucket + timedelta(seconds=INTERVALS[interval])
+
+
+class Bucket:
+    """Running OHLC/sum/count aggregate that can absorb points or other buckets"""
+
+    def __init__(self):
+        self.open = self.high = self.low = self.close = None
+        self.open_timestamp = self.close_timestamp = None
+        self.total = 0
+        self.count = 0
+
+    @classmethod
+    def from_rollup(cls, rollup):
+        bucket = cls()
+        bucket.open, bucket.open_timestamp = rollup.open, rollup.open_timestamp
+        bucket.close, bucket.close_timestamp = rollup.close, rollup.close_timestamp
+        bucket.high, bucket.low = rollup.high, rollup.low
+        bucket.total, bucket.count = rollup.total, rollup.count
+        return bucket
+
+    def add(self, timestamp, value):
+        if self.count == 0:
+            self.open = self.high = self.low = self.close = value
+            self.open_timestamp = self.close_timestamp = timestamp
+        else:
+            if timestamp < self.open_timestamp:
+                self.open, self.open_timestamp = value, timestamp
+            if timestamp >= self.close_timestamp:
+                self.close, self.close_timestamp = value, timestamp
+            self.high = max(self.high, value)
+            self.low = min(self.low, value)
+        self.total += value
+        self.count += 1
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        if other.open_timestamp < self.open_timestamp:
+            self.open, self.open_timestamp = other.open, other.open_timestamp
+        if other.close_timestamp >= self.close_timestamp:
+            self.close, self.close_timestamp = other.close, other.close_timestamp
+        self.high = max(self.high, other.high)
+        self.low = min(self.low, other.low)
+        self.total += other.total
+        self.count += other.count
+
+    def apply_to(self, rollup):
+        rollup.open, rollup.open_timestamp = self.open, self.open_timestamp
+        rollup.close, rollup.close_timestamp = self.close, self.close_timestamp
+        rollup.high, rollup.low = self.high, self.low
+        rollup.total, rollup.count = self.total, self.count
+        return rollup
+
+
+def _aggregate(points, intervals):
+    """Group points into {(source_type, symbol, interval, bucket): Bucket}"""
+    buckets = {}
+    for obj in points:
+        # Match what the DecimalField column stores, whatever type the writer was given
+        value = Decimal(str(obj.value)).quantize(VALUE_QUANTUM)
+        for interval in intervals:
+            key = (obj.source_type, obj.symbol, interval, bucket_start(obj.timestamp, interval))
+            buckets.setdefault(key, Bucket()).add(obj.timestamp, value)
+    return buckets
+
+
+def _load_rollups(keys):
+    """Existing Rollup rows for keys, one range query per interval"""
+    existing = {}
+    by_interval = {}
+    for key in keys:
+        by_interval.setdefault(key[2], []).append(key)
+
+    for interval, interval_keys in by_interval.items():
+        rows = Rollup.objects.filter(
+            interval=interval,
+            source_type__in={key[0] for key in interval_keys},
+            symbol__in={key[1] for key in interval_keys},
+            bucket__gte=min(key[3] for key in interval_keys),
+            bucket__lte=max(key[3] for key in interval_keys),
+        )
+        for row in rows:
+            existing[(row.source_type, row.symbol, row.interval, row.bucket)] = row
+    return existing
+
+
+def _raw_buckets(keys):
+    """Recompute buckets from raw DataPoint rows, one query per series"""
+    series = {}
+    for key in keys:
+        series.setdefault(key[:2], []).append(key)
+
+    buckets = {key: Bucket() for key in keys}
+    for (source_type, symbol), series_keys in series.items():
+        rows = DataPoint.objects.filter(
+            source_type=source_type,
+            symbol=symbol,
+            timestamp__gte=min(key[3] for key in series_keys),
+            timestamp__lt=max(bucket_end(key[3], key[2]) for key in series_keys),
+        ).order_by().values_list('timestamp', 'value')
+        for timestamp, value in rows:
+            for key in series_keys:
+                if key[3] <= timestamp < bucket_end(key[3], key[2]):
+                    buckets[key].add(timestamp, value)
+    return buckets
+
+
+def update_rollups(inserted, replaced=(), intervals=None):
+    """Fold freshly written points into the Rollup table
+
+    inserted are points that added a new raw row and are merged into their
+    buckets directly. replaced are points that overwrote an existing row;
+    their buckets are recomputed from the raw table since the old value's
+    contribution cannot be subtracted from open/high/low/close.
+    """
+    intervals = list(intervals or INTERVALS)
+    recompute = set(_aggregate(replaced, intervals))
+    merges = {key: bucket for key, bucket in _aggregate(inserted, intervals).items() if key not in recompute}
+    if not merges and not recompute:
+        return
+
+    existing = _load_rollups(set(merges) | recompute)
+    fresh = _raw_buckets(recompute) if recompute else {}
+
+    created, updated = [], []
+    for key in set(merges) | recompute:
+        row = existing.get(key)
+        if key in fresh:
+            bucket = fresh[key]
+            if bucket.count == 0:
+                continue
+        else:
+            bucket = Bucket.from_rollup(row) if row else Bucket()
+            bucket.merge(merges[key])
+
+        if row is None:
+            row = Rollup(source_type=key[0], symbol=key[1], interval=key[2], bucket=key[3])
+            created.append(bucket.apply_to(row))
+        else:
+            updated.append(bucket.apply_to(row))
+
+    if created:
+        Rollup.objects.bulk_create(created)
+    if updated:
+        Rollup.objects.bulk_update(updated, ROLLUP_UPDATE_FIELDS)
+
+
+def rebuild_rollups(intervals=None, source_type=None):
+    """Recompute rollups from the raw DataPoint table
+
+    Streams raw rows one series at a time, so memory is bounded by the
+    number of buckets in a single series. For repairs and after bulk loads
+    that ran with update_derived=False. Returns the number of rollup rows.
+
+    Only buckets from the one holding a series' oldest raw row onwards
+    are rebuilt. Older buckets are all that is left of history retention
+    has compacted away, so they are kept as they are; retention cuts raw
+    data on day boundaries, so the buckets rebuilt are fully covered.
+    """
+    intervals = list(intervals or INTERVALS)
+    points = DataPoint.objects.order_by('source_type', 'symbol', 'timestamp')
+    if source_type:
+        points = points.filter(source_type=source_type)
+    oldest = points.order_by().values_list('source_type', 'symbol').annotate(oldest=Min('timestamp'))
+
+    total = 0
+    with transaction.atomic():
+        for series_type, symbol, oldest_timestamp in oldest:
+            for interval in intervals:
+                Rollup.objects.filter(
+                    source_type=series_type,
+                    symbol=symbol,
+                    interval=interval,
+                    bucket__gte=bucket_start(oldest_timestamp, interval),
+                ).delete()
+
+        current = None
+        buckets = {}
+        rows = points.values_list('source_type', 'symbol', 'timestamp', 'value').iterator(chunk_size=REBUILD_BATCH_SIZE)
+        for series_type, symbol, timestamp, value in rows:
+            if (series_type, symbol) != current:
+                total += _write_buckets(current, buckets)
+                current = (series_type, symbol)
+                buckets = {}
+            for interval in intervals:
+                key = (interval, bucket_start(timestamp, interval))
+                buckets.setdefault(key, Bucket()).add(timestamp, value)
+        total += _write_buckets(current, buckets)
+
+    logger.info(f"Rebuilt {total} rollups for intervals {', '.join(intervals)}")
+    return total
+
+
+ROLLUP_INSERT_FIELDS = [
+    'source_type', 'symbol', 'interval', 'bucket', 'open', 'high', 'low', 'close',
+    'open_timestamp', 'close_timestamp', 'total', 'count', 'updated_at',
+]
+
+
+def _write_buckets(series, buckets):
+    if not buckets:
+        return 0
+    now = timezone.now()
+    rows = (
+        (
+            series[0], series[1], interval, start, bucket.open, bucket.high, bucket.low, bucket.close,
+            bucket.open_timestamp, bucket.close_timestamp, bucket.total, bucket.count, now,
+        )
+        for (interval, start), bucket in buckets.items()
+    )
+    return insert_rows(Rollup, ROLLUP_INSERT_FIELDS, rows, batch_size=REBUILD_BATCH_SIZE)
@@ -0,0 +1,186 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import close_old_connections
+from django.utils import timezone
+from .ingestion import DataPointWriter
+from .models import DataSource
+from .services import DataCollectionService, publish_provider_status
+
+logger = logging.getLogger(__name__)
+
+
+class CollectorScheduler:
+    """Polls every active DataSource on its own update interval
+
+    Due times live in a min-heap keyed on a monotonic clock, so the loop only
+    wakes when the earliest source is due (or a reload is scheduled) and sleeps
+    on an Event the rest of the time. Next runs are computed from the slot a
+    source was scheduled for rather than from when it finished, which keeps
+    timing drift from accumulating. Sources run on a worker pool so an overdue
+    slow provider never holds up a fast one, and a source that is still
+    running when its next slot comes round is skipped rather than doubled up.
+    Sources of the same type that fall due together are collected as one job
+    so providers with bulk endpoints serve them in a single request.
+    """
+
+    def __init__(self, service=None, max_workers=4, reload_interval=60, clock=time.monotonic):
+        self.service = service or DataCollectionService()
+        self.max_workers = max_workers
+        self.reload_interval = reload_interval
+        self.clock = clock
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._sources = {}
+        self._generations = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        # SQLite allows one writer at a time, so fetch in parallel but write serially
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._next_reload = 0
+
+    def stop(self):
+        """Ask the run loop to exit after the jobs in flight finish"""
+        self._stop.set()
+
+    def reload_sources(self):
+        """Refresh the set of active sources from the database
+
+        New sources are scheduled from their last_updated timestamp so a
+        restart does not re-poll everything at once. Sources that were
+        removed or deactivated drop out of the heap lazily when popped.
+        """
+        now = self.clock()
+        wall_now = timezone.now()
+        sources = {source.pk: source for source in DataSource.objects.filter(is_active=True)}
+
+        for pk, source in sources.items():
+            previous = self._sources.get(pk)
+            if previous is not None and previous.update_interval_minutes == source.update_interval_minutes:
+                continue
+
+            # Bumping the generation invalidates any entry queued under the old interval
+            self._generations[pk] = self._generations.get(pk, 0) + 1
+            delay = 0
+            if source.last_updated:
+                next_wall = source.last_updated + timedelta(minutes=self._interval_minutes(source))
+                delay = max(0, (next_wall - wall_now).total_seconds())
+            self._push(now + delay, pk)
+
+        self._sources = sources
+        self._next_reload = now + self.reload_interval
+        logger.info(f"Scheduler tracking {len(sources)} active data sources")
+
+    def run(self):
+        """Run until stop() is called"""
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='collector')
+        try:
+            while not self._stop.is_set():
+                now = self.clock()
+                if now >= self._next_reload:
+                    self.reload_sources()
+                    publish_provider_status()
+                    close_old_connections()
+
+                self._dispatch_due(executor, now)
+                self._stop.wait(self._seconds_until_next_event())
+        finally:
+            executor.shutdown(wait=True)
+            publish_provider_status()
+
+    def run_pending(self):
+        """Run every due source once on the calling thread and return the count"""
+        self.reload_sources()
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, pk, generation = heapq.heappop(self._heap)
+            source = self._sources.get(pk)
+            if source is not None and generation == self._generations.get(pk):
+                due.append(source)
+        total = sum(self._collect(group) for group in self._group_by_type(due))
+        publish_provider_status()
+        return total
+
+    def _dispatch_due(self, executor, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            slot, _, pk, generation = heapq.heappop(self._heap)
+            source = self._sources.get(pk)
+            if source is None or generation != self._generations.get(pk):
+                continue
+
+            interval = self._interval_minutes(source) * 60
+            next_due = slot + interval
+            if next_due <= now:
+                # We fell behind (e.g. the machine slept); realign to the next future slot
+                next_due += ((now - next_due) // interval + 1) * interval
+            self._push(next_due, pk)
+
+            with self._lock:
+                if pk in self._running:
+                    logger.warning(f"Skipping {source.name}: previous run still in progress")
+                    continue
+                self._running.add(pk)
+            due.append(source)
+
+        for group in self._group_by_type(due):
+            executor.submit(self._run_job, group)
+
+    def _group_by_type(self, sources):
+        groups = {}
+        for source in sources:
+            groups.setdefault(source.source_type, []).append(source)
+        return list(groups.values())
+
+    def _run_job(self, sources):
+        try:
+            self._collect(sources)
+        finally:
+            with self._lock:
+                self._running.difference_update(source.pk for source in sources)
+            close_old_connections()
+
+    def _collect(self, sources):
+        started = time.perf_counter()
+        names = ', '.join(source.name for source in sources)
+        try:
+            fetched = self.service.fetch_sources(sources)
+            with self._write_lock:
+                writer = DataPointWriter()
+                stored = set()
+                for source in sources:
+                    # Sources batched together may share symbols; store each once
+                    items = [item for item in fetched[source.pk] if item['symbol'] not in stored]
+                    stored.update(item['symbol'] for item in items)
+                    self.service.store_data(source.source_type, items, writer)
+                count = writer.flush()
+
+                updated = timezone.now()
+                DataSource.objects.filter(pk__in=[source.pk for source in sources]).update(last_updated=updated)
+                for source in sources:
+                    source.last_updated = updated
+        except Exception as e:
+            logger.error(f"Collecting {names} failed: {e}")
+            return 0
+
+        logger.info(f"Collected {count} points for {names} in {time.perf_counter() - started:.2f}s")
+        return count
+
+    def _seconds_until_next_event(self):
+        next_event = self._next_reload
+        if self._heap:
+            next_event = min(next_event, self._heap[0][0])
+        return max(0, next_event - self.clock())
+
+    def _push(self, due, pk):
+        heapq.heappush(self._heap, (due, next(self._counter), pk, self._generations[pk]))
+
+    def _interval_minutes(self, source):
+        return max(1, source.update_interval_minutes)
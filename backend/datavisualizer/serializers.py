@@ -1,5 +1,10 @@
 from rest_framework import serializers
-from .models import DataPoint, DataSource, Alert
+from . import downsampling
+from .models import DataPoint, DataSource, Alert, Rollup
+from .rollups import INTERVALS
+
+# Largest number of series one batch chart request may ask for
+MAX_BATCH_SERIES = 20
 
 
 class DataPointSerializer(serializers.ModelSerializer):
@@ -25,6 +30,15 @@ class AlertSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'last_triggered']
 
 
+class RollupSerializer(serializers.ModelSerializer):
+    """Serializer for time-bucketed OHLC aggregates"""
+    avg = serializers.DecimalField(max_digits=20, decimal_places=8, read_only=True)
+    
+    class Meta:
+        model = Rollup
+        fields = ['source_type', 'symbol', 'interval', 'bucket', 'open', 'high', 'low', 'close', 'avg', 'count']
+
+
 class ChartDataSerializer(serializers.Serializer):
     """Serializer for formatted chart data"""
     timestamp = serializers.DateTimeField()
@@ -40,4 +54,43 @@ class SummarySerializer(serializers.Serializer):
     change_24h = serializers.DecimalField(max_digits=20, decimal_places=8, allow_null=True)
     change_24h_percent = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
     last_updated = serializers.DateTimeField()
-    total_data_points = serializers.IntegerField() 
\ No newline at end of file
+    total_data_points = serializers.IntegerField() 
+
+
+class SeriesSpecSerializer(serializers.Serializer):
+    """One series in a batch chart request"""
+    source_type = serializers.ChoiceField(choices=DataPoint.SOURCE_CHOICES)
+    symbol = serializers.CharField(max_length=20)
+    hours = serializers.IntegerField(min_value=1, default=24)
+    points = serializers.IntegerField(min_value=2, max_value=downsampling.MAX_POINTS, default=500)
+    method = serializers.ChoiceField(choices=downsampling.METHODS, default='lttb')
+
+
+class SeriesBatchSerializer(serializers.Serializer):
+    """Batch chart request: several series, optionally aligned on one time axis"""
+    series = SeriesSpecSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SERIES)
+    align = serializers.ChoiceField(choices=list(INTERVALS), required=False)
+
+
+class AggregateQuerySerializer(serializers.Serializer):
+    """Query parameters of the aggregate endpoint"""
+    source_type = serializers.CharField(required=False)
+    symbol = serializers.CharField(required=False)
+    hours = serializers.IntegerField(min_value=1, default=24)
+    interval = serializers.ChoiceField(choices=list(INTERVALS), default='1h')
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """Query parameters of the analytics endpoints"""
+    source_type = serializers.ChoiceField(choices=DataPoint.SOURCE_CHOICES, required=False)
+    # Comma-separated; all series of the source type (or all series) when omitted
+    symbols = serializers.CharField(required=False)
+    hours = serializers.IntegerField(min_value=1, default=24)
+    interval = serializers.ChoiceField(choices=list(INTERVALS), required=False)
+    window = serializers.IntegerField(min_value=2, default=24)
+    
+    def validate_symbols(self, value):
+        symbols = [symbol.strip() for symbol in value.split(',') if symbol.strip()]
+        if not symbols:
+            raise serializers.ValidationError('List at least one symbol.')
+        return symbols
@@ -1,43 +1,276 @@
 import requests
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
+from urllib.parse import urlparse
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from .ingestion import DataPointWriter
 from .models import DataPoint, DataSource
+from .crossrates import CrossRateMatrix, parse_pair
+from .httpcache import ResponseCache, conditional_headers, get_response_cache
+from .ratelimit import get_rate_limiter, quota_usage
+from .resilience import backoff_delay, circuit_states, get_circuit_breaker, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+PROVIDER_STATUS_CACHE_KEY = 'datavisualizer:provider-status'
+
+# Shared by every service for stale-while-revalidate refreshes
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='http-cache-refresh')
+
+
+def provider_status():
+    """Quota counters per provider, circuit breaker state per host and HTTP cache stats"""
+    return {
+        'quotas': quota_usage(),
+        'circuits': circuit_states(),
+        'http_cache': get_response_cache().stats(),
+    }
+
+
+def provider_status_snapshot():
+    """provider_status() stamped with the time it was taken, as served by /api/providers/"""
+    return {'updated': timezone.now().isoformat(), **provider_status()}
+
+
+def publish_provider_status():
+    """Share this process's provider counters through the default cache
+    
+    The collector runs outside the web process, so the status endpoint reads
+    the last published snapshot. Needs a cache backend shared between
+    processes to be visible across them.
+    """
+    snapshot = provider_status_snapshot()
+    cache.set(PROVIDER_STATUS_CACHE_KEY, snapshot, None)
+    return snapshot
+
 
 class APIService:
     """Base class for API services"""
     
-    def __init__(self):
+    # Provider name used to look up per-provider settings
+    provider = None
+    # Maximum number of requests in flight against this provider
+    max_concurrency = 4
+    # Whether one request can fetch many symbols, so sources can be batched
+    supports_bulk = False
+    # Responses worth retrying: throttling and transient upstream failures
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Default response cache TTL in seconds per endpoint; see HTTP_CACHE_TTLS
+    CACHE_TTLS = {}
+    
+    def __init__(self, max_concurrency=None):
+        if max_concurrency is None:
+            limits = getattr(settings, 'PROVIDER_MAX_CONCURRENCY', {})
+            max_concurrency = limits.get(self.provider, self.max_concurrency)
+        self.max_concurrency = max(1, max_concurrency)
+        
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'DataDash/1.0'
+            'User-Agent': 'DataDash/1.0',
+            'Connection': 'keep-alive',
         })
+        # One pooled keep-alive connection per concurrent worker; retries are handled below
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.max_concurrency,
+            max_retries=0,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self.timeout = (
+            getattr(settings, 'HTTP_CONNECT_TIMEOUT', 5),
+            getattr(settings, 'HTTP_READ_TIMEOUT', 15),
+        )
+        self.max_retries = getattr(settings, 'HTTP_MAX_RETRIES', 2)
+        self.backoff_base = getattr(settings, 'HTTP_BACKOFF_BASE', 0.5)
+        self.backoff_cap = getattr(settings, 'HTTP_BACKOFF_CAP', 8)
+        self.max_retry_wait = getattr(settings, 'HTTP_MAX_RETRY_WAIT', 30)
+        
+        self.rate_limiter = get_rate_limiter(self.provider)
+        self.rate_limit_timeout = getattr(settings, 'RATE_LIMIT_MAX_WAIT', None)
+        self.response_cache = get_response_cache()
+    
+    def result_symbol(self, symbol):
+        """Symbol a fetched item carries for a requested symbol"""
+        return symbol
     
-    def make_request(self, url, params=None, headers=None):
-        """Make HTTP request with error handling"""
+    def map_concurrent(self, func, items):
+        """Apply func to every item with at most max_concurrency calls in flight
+        
+        Results keep the order of items, so callers get the same output as a
+        plain serial loop.
+        """
+        items = list(items)
+        if self.max_concurrency == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        
+        workers = min(self.max_concurrency, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{self.provider}-fetch") as executor:
+            return list(executor.map(func, items))
+    
+    def cache_ttl(self, endpoint):
+        """Seconds a response from endpoint may be served from cache (0 disables)"""
+        overrides = getattr(settings, 'HTTP_CACHE_TTLS', {}).get(self.provider, {})
+        return overrides.get(endpoint, self.CACHE_TTLS.get(endpoint, 0))
+    
+    def make_request(self, url, params=None, headers=None, cache_ttl=0):
+        """Make HTTP request with error handling
+        
+        With a cache_ttl the decoded response is cached: fresh entries are
+        returned without a request, stale ones are returned while a
+        background refresh runs, and expired ones are revalidated with
+        If-None-Match/If-Modified-Since so an unchanged upstream answers 304.
+        """
+        if not cache_ttl:
+            return self._decode(self._send(url, params, headers))
+        
+        key = requests.Request('GET', url, params=params).prepare().url
+        entry, freshness = self.response_cache.lookup(key)
+        if freshness == ResponseCache.FRESH:
+            self.response_cache.record('hits')
+            return entry['data']
+        if freshness == ResponseCache.STALE:
+            self.response_cache.record('stale_hits')
+            if self.response_cache.start_refresh(key):
+                _refresh_executor.submit(self._refresh, key, url, params, headers, cache_ttl, entry)
+            return entry['data']
+        return self._fetch_and_cache(key, url, params, headers, cache_ttl, entry)
+    
+    def _refresh(self, key, url, params, headers, cache_ttl, entry):
+        try:
+            self._fetch_and_cache(key, url, params, headers, cache_ttl, entry)
+        except Exception as e:
+            logger.error(f"Background refresh of {url} failed: {e}")
+        finally:
+            self.response_cache.finish_refresh(key)
+    
+    def _fetch_and_cache(self, key, url, params, headers, cache_ttl, entry):
+        request_headers = dict(headers or {})
+        request_headers.update(conditional_headers(entry))
+        response = self._send(url, params, request_headers)
+        if response is None:
+            return None
+        
+        if response.status_code == 304 and entry:
+            self.response_cache.record('revalidated')
+            return self.response_cache.touch(key, entry)['data']
+        
+        data = self._decode(response)
+        if data is not None:
+            self.response_cache.record('misses')
+            self.response_cache.store_response(
+                key, data, cache_ttl,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+        return data
+    
+    def _decode(self, response):
+        if response is None:
+            return None
         try:
-            response = self.session.get(url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
+        except ValueError as e:
+            logger.error(f"API response from {response.url} was not valid JSON: {e}")
             return None
+    
+    def _send(self, url, params=None, headers=None):
+        """Send a GET with rate limiting, retries and the host's circuit breaker
+        
+        Each attempt waits for the provider's rate limiter; if the quota will
+        not free up within RATE_LIMIT_MAX_WAIT seconds the call is skipped.
+        Connection errors, timeouts, 429 and 5xx responses are retried up to
+        HTTP_MAX_RETRIES times with jittered exponential backoff, honouring
+        Retry-After. A per-host circuit breaker refuses calls outright while
+        the host keeps failing, so outages cost no time at all; 429 and 5xx
+        responses count against it, other 4xx do not. Returns the
+        successful (or 304) response, or None.
+        """
+        breaker = get_circuit_breaker(urlparse(url).netloc)
+        if not breaker.allow():
+            logger.warning(f"Skipping request to {url}: circuit open")
+            return None
+        
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.rate_limiter.acquire(timeout=self.rate_limit_timeout):
+                # Not a provider failure, so leave the breaker alone
+                breaker.release()
+                return None
+            
+            retry_after = None
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                if response.status_code in self.RETRY_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                response.raise_for_status()
+                breaker.record_success()
+                return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            except requests.exceptions.RequestException as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in self.RETRY_STATUSES:
+                    if status is not None and status >= 500:
+                        breaker.record_failure()
+                    else:
+                        # A client error says nothing about the host's health
+                        breaker.release()
+                    logger.error(f"API request failed: {e}")
+                    return None
+                error = e
+            
+            if attempt == self.max_retries:
+                break
+            delay = retry_after if retry_after is not None else backoff_delay(
+                attempt, self.backoff_base, self.backoff_cap
+            )
+            if delay > self.max_retry_wait:
+                # Waiting that long would stall the round; try again next round instead
+                break
+            logger.info(f"Retrying {url} in {delay:.1f}s after: {error}")
+            time.sleep(delay)
+        
+        breaker.record_failure()
+        logger.error(f"API request failed: {error}")
+        return None
 
 
 class CoinGeckoService(APIService):
     """Service for fetching cryptocurrency data from CoinGecko"""
     
+    provider = 'coingecko'
+    supports_bulk = True
     BASE_URL = "https://api.coingecko.com/api/v3"
+    DEFAULT_SYMBOLS = ['bitcoin', 'ethereum', 'cardano', 'polkadot']
+    # simple/price takes a comma separated id list; keep URLs a sane length
+    MAX_IDS_PER_REQUEST = 100
+    CACHE_TTLS = {'simple/price': 60}
+    
+    def result_symbol(self, symbol):
+        return symbol.upper()
     
     def get_crypto_prices(self, symbols=None):
         """Fetch current crypto prices"""
         if not symbols:
-            symbols = ['bitcoin', 'ethereum', 'cardano', 'polkadot']
+            symbols = self.DEFAULT_SYMBOLS
         
+        chunks = [
+            symbols[start:start + self.MAX_IDS_PER_REQUEST]
+            for start in range(0, len(symbols), self.MAX_IDS_PER_REQUEST)
+        ]
+        results = []
+        for chunk_results in self.map_concurrent(self._get_price_chunk, chunks):
+            results.extend(chunk_results)
+        return results
+    
+    def _get_price_chunk(self, symbols):
         symbols_str = ','.join(symbols)
         url = f"{self.BASE_URL}/simple/price"
         params = {
@@ -45,10 +278,11 @@ class CoinGeckoService(APIService):
             'vs_currencies': 'usd',
             'include_market_cap': 'true',
             'include_24hr_vol': 'true',
-            'include_24hr_change': 'true'
+            'include_24hr_change': 'true',
+            'include_last_updated_at': 'true'
         }
         
-        data = self.make_request(url, params)
+        data = self.make_request(url, params, cache_ttl=self.cache_ttl('simple/price'))
         if not data:
             return []
         
@@ -60,119 +294,169 @@ class CoinGeckoService(APIService):
                     'price': Decimal(str(info['usd'])),
                     'market_cap': info.get('usd_market_cap'),
                     'volume_24h': info.get('usd_24h_vol'),
-                    'change_24h': info.get('usd_24h_change')
+                    'change_24h': info.get('usd_24h_change'),
+                    'updated_at': info.get('last_updated_at')
                 })
         
         return results
+    
+    def get_price_history(self, symbol, days=30):
+        """Fetch (timestamp, price) pairs for one coin from market_chart"""
+        url = f"{self.BASE_URL}/coins/{symbol}/market_chart"
+        params = {'vs_currency': 'usd', 'days': days}
+        
+        data = self.make_request(url, params)
+        if not data:
+            return []
+        
+        return [
+            (datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc), Decimal(str(price)))
+            for millis, price in data.get('prices', [])
+            if price is not None
+        ]
 
 
 class AlphaVantageService(APIService):
     """Service for fetching stock data from Alpha Vantage"""
     
+    provider = 'alphavantage'
     BASE_URL = "https://www.alphavantage.co/query"
+    DEFAULT_SYMBOLS = ['AAPL', 'GOOGL', 'MSFT', 'TSLA']
+    CACHE_TTLS = {'GLOBAL_QUOTE': 60}
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, max_concurrency=None):
+        super().__init__(max_concurrency)
         self.api_key = settings.ALPHA_VANTAGE_API_KEY
     
     def get_stock_prices(self, symbols=None):
         """Fetch current stock prices"""
         if not symbols:
-            symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA']
+            symbols = self.DEFAULT_SYMBOLS
         
         if not self.api_key:
             logger.warning("Alpha Vantage API key not configured")
             return []
         
-        results = []
-        for symbol in symbols:
-            params = {
-                'function': 'GLOBAL_QUOTE',
-                'symbol': symbol,
-                'apikey': self.api_key
-            }
+        quotes = self.map_concurrent(self.get_stock_quote, symbols)
+        return [quote for quote in quotes if quote]
+    
+    def get_stock_quote(self, symbol):
+        """Fetch the current quote for a single stock symbol"""
+        params = {
+            'function': 'GLOBAL_QUOTE',
+            'symbol': symbol,
+            'apikey': self.api_key
+        }
+        
+        data = self.make_request(self.BASE_URL, params, cache_ttl=self.cache_ttl('GLOBAL_QUOTE'))
+        if data and 'Global Quote' in data:
+            quote = data['Global Quote']
+            price = quote.get('05. price')
+            change = quote.get('09. change')
             
-            data = self.make_request(self.BASE_URL, params)
-            if data and 'Global Quote' in data:
-                quote = data['Global Quote']
-                price = quote.get('05. price')
-                change = quote.get('09. change')
-                
-                if price:
-                    results.append({
-                        'symbol': symbol,
-                        'price': Decimal(str(price)),
-                        'change': Decimal(str(change)) if change else None,
-                        'change_percent': quote.get('10. change percent', '').replace('%', '')
-                    })
+            if price:
+                return {
+                    'symbol': symbol,
+                    'price': Decimal(str(price)),
+                    'change': Decimal(str(change)) if change else None,
+                    'change_percent': quote.get('10. change percent', '').replace('%', ''),
+                    'updated_at': quote.get('07. latest trading day')
+                }
         
-        return results
+        return None
 
 
 class OpenWeatherService(APIService):
     """Service for fetching weather data from OpenWeatherMap"""
     
+    provider = 'openweather'
     BASE_URL = "https://api.openweathermap.org/data/2.5"
+    DEFAULT_SYMBOLS = ['London', 'New York', 'Tokyo', 'Sydney']
+    # OpenWeather recomputes current conditions roughly every 10 minutes
+    CACHE_TTLS = {'weather': 600}
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, max_concurrency=None):
+        super().__init__(max_concurrency)
         self.api_key = settings.OPENWEATHER_API_KEY
     
     def get_weather_data(self, cities=None):
         """Fetch current weather data"""
         if not cities:
-            cities = ['London', 'New York', 'Tokyo', 'Sydney']
+            cities = self.DEFAULT_SYMBOLS
         
         if not self.api_key:
             logger.warning("OpenWeather API key not configured")
             return []
         
-        results = []
-        for city in cities:
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'
+        reports = self.map_concurrent(self.get_city_weather, cities)
+        return [report for report in reports if report]
+    
+    def get_city_weather(self, city):
+        """Fetch current weather data for a single city"""
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': 'metric'
+        }
+        
+        data = self.make_request(f"{self.BASE_URL}/weather", params, cache_ttl=self.cache_ttl('weather'))
+        if data and 'main' in data:
+            return {
+                'symbol': city,
+                'temperature': Decimal(str(data['main']['temp'])),
+                'humidity': data['main']['humidity'],
+                'pressure': data['main']['pressure'],
+                'description': data['weather'][0]['description'],
+                'updated_at': data.get('dt')
             }
-            
-            data = self.make_request(f"{self.BASE_URL}/weather", params)
-            if data and 'main' in data:
-                results.append({
-                    'symbol': city,
-                    'temperature': Decimal(str(data['main']['temp'])),
-                    'humidity': data['main']['humidity'],
-                    'pressure': data['main']['pressure'],
-                    'description': data['weather'][0]['description']
-                })
         
-        return results
+        return None
 
 
 class ExchangeRateService(APIService):
-    """Service for fetching currency exchange rates"""
+    """Service for fetching currency exchange rates
+    
+    Only the base currency's document is downloaded; every other pair is
+    derived locally from it, so tracking any number of pairs costs a single
+    upstream request per round.
+    """
     
+    provider = 'exchangerate'
+    supports_bulk = True
     BASE_URL = "https://api.exchangerate-api.com/v4/latest"
+    DEFAULT_SYMBOLS = ['EUR', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF']
+    # The latest document only changes about once a day
+    CACHE_TTLS = {'latest': 3600}
     
-    def get_exchange_rates(self, base_currency='USD'):
-        """Fetch current exchange rates"""
+    def result_symbol(self, symbol):
+        return '-'.join(parse_pair(symbol, 'USD'))
+    
+    def get_exchange_rates(self, base_currency='USD', currencies=None):
+        """Fetch current exchange rates
+        
+        currencies may hold target codes ('EUR', quoted against
+        base_currency) or explicit pairs ('EUR-GBP').
+        """
         url = f"{self.BASE_URL}/{base_currency}"
-        data = self.make_request(url)
+        data = self.make_request(url, cache_ttl=self.cache_ttl('latest'))
         
         if not data or 'rates' not in data:
             return []
         
-        results = []
-        # Get major currency pairs
-        major_currencies = ['EUR', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF']
+        # Get major currency pairs unless specific pairs were requested
+        pairs = [parse_pair(symbol, base_currency) for symbol in currencies or self.DEFAULT_SYMBOLS]
+        cross_rates = CrossRateMatrix(data.get('base', base_currency), data['rates'])
+        pairs, rates = cross_rates.pair_rates(pairs)
         
-        for currency in major_currencies:
-            if currency in data['rates']:
-                results.append({
-                    'symbol': f"{base_currency}-{currency}",
-                    'rate': Decimal(str(data['rates'][currency])),
-                    'base': base_currency,
-                    'target': currency
-                })
+        results = []
+        for (base, target), rate in zip(pairs, rates.tolist()):
+            results.append({
+                'symbol': f"{base}-{target}",
+                'rate': Decimal(str(rate)),
+                'base': base,
+                'target': target,
+                'updated_at': data.get('time_last_updated')
+            })
         
         return results
 
@@ -180,17 +464,103 @@ class ExchangeRateService(APIService):
 class DataCollectionService:
     """Main service for collecting data from all sources"""
     
-    def __init__(self):
-        self.crypto_service = CoinGeckoService()
-        self.stock_service = AlphaVantageService()
-        self.weather_service = OpenWeatherService()
-        self.exchange_service = ExchangeRateService()
+    SOURCE_TYPES = ['crypto', 'stock', 'weather', 'currency']
     
-    def collect_crypto_data(self):
-        """Collect and store cryptocurrency data"""
-        data = self.crypto_service.get_crypto_prices()
+    def __init__(self, concurrent=True):
+        # Serial mode pins every provider to one request at a time
+        max_concurrency = None if concurrent else 1
+        self.concurrent = concurrent
+        self.crypto_service = CoinGeckoService(max_concurrency)
+        self.stock_service = AlphaVantageService(max_concurrency)
+        self.weather_service = OpenWeatherService(max_concurrency)
+        self.exchange_service = ExchangeRateService(max_concurrency)
+    
+    def fetch_data(self, source_type, symbols=None):
+        """Fetch the current values for one source type without storing them"""
+        if source_type == 'crypto':
+            return self.crypto_service.get_crypto_prices(symbols)
+        if source_type == 'stock':
+            return self.stock_service.get_stock_prices(symbols)
+        if source_type == 'weather':
+            return self.weather_service.get_weather_data(symbols)
+        if source_type == 'currency':
+            return self.exchange_service.get_exchange_rates(currencies=symbols)
+        raise ValueError(f"Unknown source type: {source_type}")
+    
+    def fetch_sources(self, sources):
+        """Fetch several DataSource rows of one source type
+        
+        Providers with a bulk endpoint get a single request for the union of
+        every source's symbols, which is then split back per source. Returns
+        a dict of DataSource pk to fetched items.
+        """
+        if not sources:
+            return {}
+        source_type = sources[0].source_type
+        service = self.service_for(source_type)
+        
+        if not service.supports_bulk or len(sources) == 1:
+            return {source.pk: self.fetch_data(source_type, source.symbols or None) for source in sources}
+        
+        symbols = []
+        for source in sources:
+            for symbol in source.symbols or service.DEFAULT_SYMBOLS:
+                if symbol not in symbols:
+                    symbols.append(symbol)
+        
+        items = {item['symbol']: item for item in self.fetch_data(source_type, symbols)}
+        fetched = {}
+        for source in sources:
+            wanted = [service.result_symbol(symbol) for symbol in source.symbols or service.DEFAULT_SYMBOLS]
+            fetched[source.pk] = [items[symbol] for symbol in wanted if symbol in items]
+        return fetched
+    
+    def service_for(self, source_type):
+        """Return the API service that fetches the given source type"""
+        return {
+            'crypto': self.crypto_service,
+            'stock': self.stock_service,
+            'weather': self.weather_service,
+            'currency': self.exchange_service,
+        }[source_type]
+    
+    def fetch_all_data(self, symbols=None):
+        """Fetch every source type, fanning providers out in parallel
+        
+        symbols optionally maps a source type to the symbols to fetch for it.
+        Returns a dict of source type to fetched items. A provider that raises
+        is logged and contributes no items, so one failing API does not lose
+        the rest of the round.
+        """
+        symbols = symbols or {}
+        if not self.concurrent:
+            return {
+                source_type: self._safe_fetch(source_type, symbols.get(source_type))
+                for source_type in self.SOURCE_TYPES
+            }
+        
+        with ThreadPoolExecutor(max_workers=len(self.SOURCE_TYPES), thread_name_prefix='collect') as executor:
+            futures = {
+                source_type: executor.submit(self._safe_fetch, source_type, symbols.get(source_type))
+                for source_type in self.SOURCE_TYPES
+            }
+            return {source_type: future.result() for source_type, future in futures.items()}
+    
+    def _safe_fetch(self, source_type, symbols=None):
+        try:
+            return self.fetch_data(source_type, symbols)
+        except Exception as e:
+            logger.error(f"Fetching {source_type} data failed: {e}")
+            return []
+    
+    def store_crypto_data(self, data, writer=None):
+        """Store fetched cryptocurrency data"""
+        flush = writer is None
+        if flush:
+            writer = DataPointWriter()
+        queued = len(writer)
         for item in data:
-            DataPoint.objects.create(
+            writer.add(
                 source_type='crypto',
                 symbol=item['symbol'],
                 value=item['price'],
@@ -198,32 +568,44 @@ class DataCollectionService:
                     'market_cap': item.get('market_cap'),
                     'volume_24h': item.get('volume_24h'),
                     'change_24h': item.get('change_24h')
-                }
+                },
+                source_updated_at=item.get('updated_at')
             )
-        logger.info(f"Collected {len(data)} crypto data points")
-        return len(data)
+        # Skipped unchanged points and duplicates are not counted
+        count = writer.flush() if flush else len(writer) - queued
+        logger.info(f"Collected {count} crypto data points")
+        return count
     
-    def collect_stock_data(self):
-        """Collect and store stock data"""
-        data = self.stock_service.get_stock_prices()
+    def store_stock_data(self, data, writer=None):
+        """Store fetched stock data"""
+        flush = writer is None
+        if flush:
+            writer = DataPointWriter()
+        queued = len(writer)
         for item in data:
-            DataPoint.objects.create(
+            writer.add(
                 source_type='stock',
                 symbol=item['symbol'],
                 value=item['price'],
                 metadata={
                     'change': str(item.get('change', '')),
                     'change_percent': item.get('change_percent', '')
-                }
+                },
+                source_updated_at=item.get('updated_at')
             )
-        logger.info(f"Collected {len(data)} stock data points")
-        return len(data)
+        # Skipped unchanged points and duplicates are not counted
+        count = writer.flush() if flush else len(writer) - queued
+        logger.info(f"Collected {count} stock data points")
+        return count
     
-    def collect_weather_data(self):
-        """Collect and store weather data"""
-        data = self.weather_service.get_weather_data()
+    def store_weather_data(self, data, writer=None):
+        """Store fetched weather data"""
+        flush = writer is None
+        if flush:
+            writer = DataPointWriter()
+        queued = len(writer)
         for item in data:
-            DataPoint.objects.create(
+            writer.add(
                 source_type='weather',
                 symbol=item['symbol'],
                 value=item['temperature'],
@@ -231,34 +613,73 @@ class DataCollectionService:
                     'humidity': item.get('humidity'),
                     'pressure': item.get('pressure'),
                     'description': item.get('description')
-                }
+                },
+                source_updated_at=item.get('updated_at')
             )
-        logger.info(f"Collected {len(data)} weather data points")
-        return len(data)
+        # Skipped unchanged points and duplicates are not counted
+        count = writer.flush() if flush else len(writer) - queued
+        logger.info(f"Collected {count} weather data points")
+        return count
     
-    def collect_currency_data(self):
-        """Collect and store currency exchange data"""
-        data = self.exchange_service.get_exchange_rates()
+    def store_currency_data(self, data, writer=None):
+        """Store fetched currency exchange data"""
+        flush = writer is None
+        if flush:
+            writer = DataPointWriter()
+        queued = len(writer)
         for item in data:
-            DataPoint.objects.create(
+            writer.add(
                 source_type='currency',
                 symbol=item['symbol'],
                 value=item['rate'],
                 metadata={
                     'base': item.get('base'),
                     'target': item.get('target')
-                }
+                },
+                source_updated_at=item.get('updated_at')
             )
-        logger.info(f"Collected {len(data)} currency data points")
-        return len(data)
+        # Skipped unchanged points and duplicates are not counted
+        count = writer.flush() if flush else len(writer) - queued
+        logger.info(f"Collected {count} currency data points")
+        return count
+    
+    def store_data(self, source_type, data, writer=None):
+        """Store fetched items for the given source type
+        
+        Rows are queued on writer when one is given; otherwise they are
+        written in their own bulk transaction before returning. Returns the
+        rows written, or with a writer the rows newly queued on it, whose
+        flush() then tells how many landed.
+        """
+        return getattr(self, f"store_{source_type}_data")(data, writer)
+    
+    def collect_crypto_data(self):
+        """Collect and store cryptocurrency data"""
+        return self.store_crypto_data(self.fetch_data('crypto'))
+    
+    def collect_stock_data(self):
+        """Collect and store stock data"""
+        return self.store_stock_data(self.fetch_data('stock'))
+    
+    def collect_weather_data(self):
+        """Collect and store weather data"""
+        return self.store_weather_data(self.fetch_data('weather'))
+    
+    def collect_currency_data(self):
+        """Collect and store currency exchange data"""
+        return self.store_currency_data(self.fetch_data('currency'))
     
     def collect_all_data(self):
-        """Collect data from all sources"""
-        total = 0
-        total += self.collect_crypto_data()
-        total += self.collect_stock_data()
-        total += self.collect_weather_data()
-        total += self.collect_currency_data()
+        """Collect data from all sources
+        
+        Network calls run concurrently; writes stay on the calling thread and
+        the whole round is committed as one bulk transaction.
+        """
+        fetched = self.fetch_all_data()
+        writer = DataPointWriter()
+        for source_type in self.SOURCE_TYPES:
+            self.store_data(source_type, fetched[source_type], writer)
+        total = writer.flush()
         
         logger.info(f"Total data points collected: {total}")
-        return total 
\ No newline at end of file
+        return total
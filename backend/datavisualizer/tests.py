@@ -1,3 +1,1612 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from data_dash_backend.databases import sqlite_profile
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+import requests
+
+from . import compactstore, hottier, ingestion, realtime
+from .alerts import AlertEngine, EmailSink, LogSink, MemorySink
+from .crossrates import CrossRateMatrix, parse_pair
+from .hottier import HotTier, RingBuffer
+from .httpcache import FileCacheStore, MemoryCacheStore, ResponseCache
+from .importing import CsvAdapter, HistoryImporter
+from .ingestion import DataPointWriter
+from .models import Alert, DataPoint, DataSource, LatestValue, Rollup, Series, SeriesPoint
+from .ratelimit import RateLimiter, TokenBucket
+from .realtime import RESYNC, InMemoryChannelLayer
+from .resilience import CircuitBreaker
+from .retention import Compactor
+from .rollups import bucket_start, rebuild_rollups
+from .scheduler import CollectorScheduler
+from .services import APIService, DataCollectionService, ExchangeRateService, publish_provider_status
+from .timeseries import series_points
+
+
+class CacheIsolatedTestCase(TestCase):
+    """Starts every test with an empty cache
+
+    Data versions and cached responses live in the cache, which is not
+    rolled back with each test's transaction.
+    """
+
+    @classmethod
+    def _pre_setup(cls):
+        super()._pre_setup()
+        cache.clear()
+
+
+class SummaryTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def write_series(self, symbols, hours=30):
+        writer = DataPointWriter()
+        for symbol in symbols:
+            for hour in range(hours):
+                writer.add('crypto', symbol, Decimal(100 + hour), timestamp=self.now - timedelta(hours=hour))
+        writer.flush()
+
+    def test_summary_query_count_is_constant(self):
+        self.write_series(['BTC', 'ETH'])
+        with self.assertNumQueries(1):
+            self.client.get('/api/datapoints/summary/')
+
+        self.write_series([f"COIN{i}" for i in range(20)])
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/datapoints/summary/')
+        self.assertEqual(len(response.json()), 22)
+
+    def test_summary_values_follow_ingestion(self):
+        self.write_series(['BTC'])
+        latest = LatestValue.objects.get(symbol='BTC')
+        self.assertEqual(latest.value, Decimal(100))
+        self.assertEqual(latest.reference_value, Decimal(124))
+        self.assertEqual(latest.data_points, 30)
+
+        # Re-sending existing points must not inflate the count
+        self.write_series(['BTC'], hours=1)
+        row = self.client.get('/api/datapoints/summary/').json()[0]
+        self.assertEqual(row['total_data_points'], 30)
+        self.assertEqual(row['change_24h'], '-24.00000000')
+        self.assertEqual(row['change_24h_percent'], '-19.35')
+
+
+class BulkWriterTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        # The last-stored cache outlives each test's rolled back transaction
+        patcher = mock.patch.dict(ingestion._last_stored, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, value, conflict='ignore', minutes=0, **kwargs):
+        writer = DataPointWriter(conflict=conflict)
+        writer.add('crypto', 'BTC', Decimal(value), timestamp=self.now - timedelta(minutes=minutes), **kwargs)
+        writer.flush()
+        return writer
+
+    def hour(self):
+        return Rollup.objects.get(symbol='BTC', interval='1h', bucket=bucket_start(self.now, '1h'))
+
+    def test_ignore_keeps_the_stored_row(self):
+        self.write(100, metadata={'source': 'first'})
+        self.write(200, metadata={'source': 'second'})
+        point = DataPoint.objects.get(symbol='BTC')
+        self.assertEqual((point.value, point.metadata), (Decimal(100), {'source': 'first'}))
+        self.assertEqual(LatestValue.objects.get(symbol='BTC').value, Decimal(100))
+        self.assertEqual((self.hour().count, self.hour().total), (1, Decimal(100)))
+
+    def test_ignore_keeps_the_first_duplicate_in_a_batch(self):
+        writer = DataPointWriter(conflict='ignore')
+        writer.add('crypto', 'BTC', Decimal(100), timestamp=self.now)
+        writer.add('crypto', 'BTC', Decimal(200), timestamp=self.now)
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(DataPoint.objects.get(symbol='BTC').value, Decimal(100))
+
+    def test_update_overwrites_the_stored_row(self):
+        self.write(100, metadata={'source': 'first'})
+        self.write(200, conflict='update', metadata={'source': 'second'})
+        point = DataPoint.objects.get(symbol='BTC')
+        self.assertEqual((point.value, point.metadata), (Decimal(200), {'source': 'second'}))
+
+        latest = LatestValue.objects.get(symbol='BTC')
+        self.assertEqual((latest.value, latest.data_points), (Decimal(200), 1))
+        hour = self.hour()
+        self.assertEqual((hour.count, hour.total, hour.close), (1, Decimal(200), Decimal(200)))
+
+    def test_unknown_conflict_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            DataPointWriter(conflict='replace')
+
+    def test_unchanged_points_are_skipped(self):
+        self.write(100, minutes=2, source_updated_at=1700000000)
+        # The provider re-served the same reading
+        writer = self.write(100, minutes=1, source_updated_at=1700000000)
+        self.assertEqual(writer.skipped, 1)
+        self.assertEqual(DataPoint.objects.filter(symbol='BTC').count(), 1)
+
+        # A new marker, or the same marker with another value, is stored
+        self.write(100, minutes=1, source_updated_at=1700000060)
+        self.write(101, source_updated_at=1700000060)
+        self.assertEqual(DataPoint.objects.filter(symbol='BTC').count(), 3)
+
+    def test_skipping_can_be_turned_off(self):
+        self.write(100, minutes=1, source_updated_at=1700000000)
+        writer = DataPointWriter(skip_unchanged=False)
+        writer.add('crypto', 'BTC', Decimal(100), timestamp=self.now, source_updated_at=1700000000)
+        writer.flush()
+        self.assertEqual(writer.skipped, 0)
+        self.assertEqual(DataPoint.objects.filter(symbol='BTC').count(), 2)
+
+    def test_counts_leave_out_skipped_and_duplicate_points(self):
+        service = DataCollectionService()
+        items = [
+            {'symbol': 'BTC', 'price': Decimal(100), 'updated_at': 1700000000},
+            {'symbol': 'ETH', 'price': Decimal(10), 'updated_at': 1700000000},
+        ]
+        self.assertEqual(service.store_crypto_data(items), 2)
+        # The same readings served again
+        with self.assertLogs('datavisualizer.services', 'INFO') as logs:
+            self.assertEqual(service.store_crypto_data(items), 0)
+        self.assertIn('Collected 0 crypto data points', logs.output[0])
+
+        # A shared writer counts what it queued, and its flush what landed
+        writer = DataPointWriter()
+        items = [dict(item, updated_at=1700000060) for item in items]
+        self.assertEqual(service.store_crypto_data(items, writer), 2)
+        self.assertEqual(service.store_stock_data([{'symbol': 'AAPL', 'price': Decimal(1)}], writer), 1)
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(DataPoint.objects.count(), 5)
+
+    def test_flush_counts_only_rows_that_landed(self):
+        self.write(100)
+        writer = DataPointWriter(conflict='ignore')
+        writer.add('crypto', 'BTC', Decimal(200), timestamp=self.now)
+        writer.add('crypto', 'BTC', Decimal(300), timestamp=self.now - timedelta(minutes=1))
+        self.assertEqual(writer.flush(), 1)
+
+        writer = DataPointWriter(conflict='update')
+        writer.add('crypto', 'BTC', Decimal(200), timestamp=self.now)
+        writer.add('crypto', 'BTC', Decimal(400), timestamp=self.now - timedelta(minutes=2))
+        self.assertEqual(writer.flush(), 2)
+
+    def test_ignored_duplicates_do_not_become_the_last_stored_point(self):
+        self.write(100, source_updated_at=1700000000)
+        # Dropped as a duplicate of the stored row, so it must not be remembered
+        self.write(200, source_updated_at=1700000060)
+        self.assertEqual(ingestion._last_stored[('crypto', 'BTC')][:2], (Decimal(100), 1700000000))
+        writer = self.write(200, minutes=-1, source_updated_at=1700000060)
+        self.assertEqual(writer.skipped, 0)
+        self.assertEqual(DataPoint.objects.filter(symbol='BTC').count(), 2)
+
+    def test_points_without_a_marker_are_never_skipped(self):
+        self.write(100, minutes=1)
+        writer = self.write(100)
+        self.assertEqual(writer.skipped, 0)
+        self.assertEqual(DataPoint.objects.filter(symbol='BTC').count(), 2)
+
+
+class ChartDataTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        writer = DataPointWriter()
+        for minute in range(7 * 24 * 60 // 10):
+            value = Decimal(100)
+            if minute == 500:
+                value = Decimal(900)
+            writer.add('crypto', 'BTC', value, timestamp=self.now - timedelta(minutes=minute * 10))
+        writer.flush()
+
+    def test_without_points_keeps_newest_rows(self):
+        data = self.client.get('/api/datapoints/chart_data/?symbol=BTC&hours=168').json()
+        self.assertEqual(len(data), 200)
+
+    def test_downsampling_is_bounded_and_keeps_peaks(self):
+        for method in ['lttb', 'minmax', 'max']:
+            data = self.client.get(
+                f'/api/datapoints/chart_data/?symbol=BTC&hours=168&points=100&method={method}'
+            ).json()
+            self.assertLessEqual(len(data), 100)
+            self.assertIn('900.00000000', [point['value'] for point in data])
+            timestamps = [point['timestamp'] for point in data]
+            self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_invalid_method_is_rejected(self):
+        response = self.client.get('/api/datapoints/chart_data/?points=100&method=median')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_hours_are_rejected(self):
+        for hours in ['abc', '0', '-5']:
+            response = self.client.get(f'/api/datapoints/chart_data/?points=100&hours={hours}')
+            self.assertEqual(response.status_code, 400, hours)
+
+    def test_columnar_format_matches_objects(self):
+        url = '/api/datapoints/chart_data/?symbol=BTC&hours=168&points=100'
+        objects = self.client.get(url).json()
+        columns = self.client.get(url + '&format=columnar').json()
+        self.assertEqual(set(columns), {'t', 'v'})
+        self.assertEqual(columns['v'], [float(point['value']) for point in objects])
+        self.assertEqual(
+            columns['t'],
+            [round(datetime.fromisoformat(point['timestamp']).timestamp() * 1000) for point in objects]
+        )
+
+    def test_responses_are_compressed(self):
+        response = self.client.get('/api/datapoints/chart_data/?symbol=BTC&hours=168', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 200)
+
+
+class ResponseCacheTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.write(100)
+
+    def write(self, value):
+        writer = DataPointWriter()
+        writer.add('crypto', 'BTC', Decimal(value))
+        writer.flush()
+
+    def test_responses_are_cached_until_data_changes(self):
+        first = self.client.get('/api/datapoints/summary/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/datapoints/summary/')
+        self.assertEqual(second.json(), first.json())
+
+        # An unchanged poll is answered without a body
+        response = self.client.get('/api/datapoints/summary/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.write(200)
+        response = self.client.get('/api/datapoints/summary/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()[0]['current_value'], '200.00000000')
+
+    def test_other_series_keep_their_cache(self):
+        self.client.get('/api/datapoints/chart_data/?symbol=BTC')
+        writer = DataPointWriter()
+        writer.add('crypto', 'ETH', Decimal(1))
+        writer.flush()
+        with self.assertNumQueries(0):
+            self.client.get('/api/datapoints/chart_data/?symbol=BTC')
+
+    def test_stale_response_is_served_while_another_worker_recomputes(self):
+        self.client.get('/api/datapoints/summary/')
+        self.write(200)
+        with mock.patch('datavisualizer.responsecache.cache.add', return_value=False):
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/datapoints/summary/')
+        self.assertEqual(response.json()[0]['current_value'], '100.00000000')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_if_none_match_compares_parsed_etags(self):
+        etag = self.client.get('/api/datapoints/summary/')['ETag']
+        for header in [etag, f'W/{etag}', f'"other", {etag}', '*']:
+            response = self.client.get('/api/datapoints/summary/', HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+        # Contains the ETag, but is not a list of tags that includes it
+        response = self.client.get('/api/datapoints/summary/', HTTP_IF_NONE_MATCH=f'"x{etag}')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_bypassed(self):
+        self.client.get('/api/datapoints/summary/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/datapoints/summary/')
+        self.assertFalse(response.has_header('ETag'))
+
+
+class DeltaTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.write('BTC', range(1, 11))
+
+    def write(self, symbol, minutes):
+        writer = DataPointWriter()
+        for minute in minutes:
+            writer.add('crypto', symbol, Decimal(minute), timestamp=self.now - timedelta(minutes=minute))
+        writer.flush()
+
+    def test_chart_data_since_returns_only_new_points(self):
+        response = self.client.get('/api/datapoints/chart_data/?symbol=BTC&points=500')
+        cursor = response['X-Data-Cursor']
+        self.assertEqual(len(response.json()), 10)
+
+        response = self.client.get(f'/api/datapoints/chart_data/?symbol=BTC&since={cursor}')
+        self.assertEqual(response.json(), [])
+        self.assertEqual(response['X-Data-Cursor'], cursor)
+
+        self.write('BTC', [0])
+        response = self.client.get(f'/api/datapoints/chart_data/?symbol=BTC&since={cursor}')
+        self.assertEqual([point['value'] for point in response.json()], ['0.00000000'])
+        self.assertGreater(int(response['X-Data-Cursor']), int(cursor))
+
+    def test_summary_and_list_since(self):
+        response = self.client.get('/api/datapoints/summary/?since=0')
+        self.assertEqual(len(response.json()), 1)
+        cursor = response['X-Data-Cursor']
+
+        self.write('ETH', [1, 2])
+        data = self.client.get(f'/api/datapoints/summary/?since={cursor}').json()
+        self.assertEqual([row['symbol'] for row in data], ['ETH'])
+
+        data = self.client.get(f'/api/datapoints/?since={cursor}&fields=symbol,value').json()
+        self.assertEqual(data, [{'symbol': 'ETH', 'value': '1.00000000'}, {'symbol': 'ETH', 'value': '2.00000000'}])
+
+    def test_since_timestamp_and_invalid_token(self):
+        since = (self.now - timedelta(minutes=3, seconds=30)).isoformat()
+        response = self.client.get('/api/datapoints/', {'since': since})
+        self.assertEqual(len(response.json()), 3)
+        response = self.client.get('/api/datapoints/summary/?since=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class RealtimeTests(CacheIsolatedTestCase):
+    def point(self, pk, symbol):
+        return {'id': pk, 'timestamp': timezone.now(), 'source_type': 'crypto', 'symbol': symbol, 'value': Decimal(1)}
+
+    async def test_layer_fans_out_by_filter_and_resyncs_slow_subscribers(self):
+        layer = InMemoryChannelLayer()
+        btc = layer.subscribe('crypto', 'BTC')
+        crypto = layer.subscribe('crypto')
+        slow = layer.subscribe(symbol='BTC', queue_size=1)
+        layer.subscribe('stock')
+
+        self.assertEqual(layer.publish([self.point(1, 'BTC'), self.point(2, 'ETH')], 2), 3)
+        layer.publish([self.point(3, 'BTC')], 3)
+        await asyncio.sleep(0)
+
+        self.assertEqual([p['id'] for p in (await btc.get())['points']], [1])
+        self.assertEqual([p['id'] for p in (await btc.get())['points']], [3])
+        self.assertEqual([p['id'] for p in (await crypto.get())['points']], [1, 2])
+        self.assertIs(await slow.get(), RESYNC)
+        self.assertTrue(slow.queue.empty())
+
+    async def test_stream_replays_since_and_pushes_new_points(self):
+        def write():
+            writer = DataPointWriter()
+            writer.add('crypto', 'BTC', Decimal(1), timestamp=timezone.now() - timedelta(minutes=1))
+            writer.add('crypto', 'ETH', Decimal(2), timestamp=timezone.now() - timedelta(minutes=1))
+            writer.flush()
+        await sync_to_async(write)()
+
+        response = await self.async_client.get('/api/stream/?symbol=BTC&since=0')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        replay = await anext(chunks)
+        self.assertIn(b'event: datapoints', replay)
+        self.assertIn(b'"BTC"', replay)
+        self.assertNotIn(b'"ETH"', replay)
+
+        realtime.layer.publish([self.point(10 ** 6, 'ETH'), self.point(10 ** 6 + 1, 'BTC')], 10 ** 6 + 1)
+        live = await anext(chunks)
+        self.assertIn(f'id: {10 ** 6 + 1}'.encode(), live)
+        self.assertNotIn(b'"ETH"', live)
+
+        # A client disconnect cancels the task sending the response
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(len(realtime.layer), 0)
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.assertEqual(self.client.get('/api/stream/').status_code, 501)
+
+
+class SeriesBatchTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        writer = DataPointWriter()
+        for hour in range(48):
+            timestamp = self.now - timedelta(hours=hour, minutes=1)
+            writer.add('crypto', 'BTC', Decimal(100 + hour), timestamp=timestamp)
+            writer.add('crypto', 'ETH', Decimal(10 + hour), timestamp=timestamp)
+            writer.add('stock', 'BTC', Decimal(1), timestamp=timestamp)
+        writer.flush()
+
+    def post(self, payload):
+        return self.client.post('/api/series/batch/', payload, content_type='application/json')
+
+    @override_settings(HOT_TIER_ENABLED=False)
+    def test_series_are_read_in_one_query(self):
+        specs = [
+            {'source_type': 'crypto', 'symbol': 'BTC', 'hours': 24, 'points': 10},
+            {'source_type': 'crypto', 'symbol': 'ETH', 'hours': 48, 'points': 500},
+        ]
+        with self.assertNumQueries(1):
+            data = self.post({'series': specs}).json()
+        btc, eth = data['series']
+        self.assertLessEqual(len(btc['data']), 10)
+        self.assertEqual(len(eth['data']), 48)
+        # The stocks BTC series matches the IN lists but was not asked for
+        self.assertNotIn('1.00000000', [point['value'] for point in btc['data']])
+
+    def test_aligned_series_share_a_time_axis(self):
+        specs = [
+            {'source_type': 'crypto', 'symbol': 'BTC', 'hours': 6},
+            {'source_type': 'crypto', 'symbol': 'ETH', 'hours': 3},
+        ]
+        data = self.post({'series': specs, 'align': '1h'}).json()
+        btc, eth = data['series']
+        self.assertEqual(len(btc['values']), len(data['timestamps']))
+        self.assertEqual(len(eth['values']), len(data['timestamps']))
+        self.assertIn('101.00000000', btc['values'])
+        self.assertIsNone(eth['values'][0])
+
+    def test_invalid_specs_are_rejected(self):
+        self.assertEqual(self.post({'series': []}).status_code, 400)
+        response = self.post({'series': [{'source_type': 'crypto', 'symbol': 'BTC', 'method': 'median'}]})
+        self.assertEqual(response.status_code, 400)
+
+
+class AnalyticsTests(CacheIsolatedTestCase):
+    def setUp(self):
+        base = bucket_start(timezone.now(), '1h') - timedelta(hours=3)
+        writer = DataPointWriter()
+        for hour, value in enumerate([100, 120, 90, 108]):
+            timestamp = base + timedelta(hours=hour)
+            writer.add('crypto', 'BTC', Decimal(value), timestamp=timestamp)
+            writer.add('crypto', 'ETH', Decimal(value * 3), timestamp=timestamp)
+            writer.add('crypto', 'USDT', Decimal(1), timestamp=timestamp)
+        # A gap the grid fills with the previous value
+        writer.add('stock', 'AAPL', Decimal(50), timestamp=base)
+        writer.add('stock', 'AAPL', Decimal(55), timestamp=base + timedelta(hours=3))
+        writer.flush()
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response.json()
+
+    def by_symbol(self, data):
+        return {series['symbol']: series for series in data['series']}
+
+    def test_returns_and_drawdown(self):
+        data = self.get('/api/analytics/returns/?hours=4&interval=1h')
+        self.assertEqual(len(data['timestamps']), 5)
+        series = self.by_symbol(data)
+        btc = series['BTC']
+        # The oldest bucket has no data yet
+        self.assertEqual(btc['returns'][:2], [None, None])
+        for actual, expected in zip(btc['returns'][2:], [0.2, -0.25, 0.2]):
+            self.assertAlmostEqual(actual, expected)
+        for actual, expected in zip(btc['drawdown'][1:], [0, 0, -0.25, -0.1]):
+            self.assertAlmostEqual(actual, expected)
+        self.assertAlmostEqual(btc['max_drawdown'], -0.25)
+        self.assertAlmostEqual(btc['total_return'], 0.08)
+        self.assertAlmostEqual(series['USDT']['volatility'], 0)
+        self.assertEqual(series['AAPL']['returns'][2:4], [0, 0])
+        self.assertAlmostEqual(series['AAPL']['returns'][4], 0.1)
+
+    def test_rolling_mean_and_std(self):
+        data = self.get('/api/analytics/rolling/?symbols=BTC&hours=4&interval=1h&window=2')
+        [btc] = data['series']
+        self.assertEqual(btc['mean'][:2], [None, None])
+        self.assertEqual(btc['mean'][2:], [110, 105, 99])
+        self.assertAlmostEqual(btc['std'][3], 21.2132034356)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_correlation_matrix_from_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.get('/api/analytics/correlation/?source_type=crypto&hours=4&interval=1h')
+        self.assertEqual([series['symbol'] for series in data['series']], ['BTC', 'ETH', 'USDT'])
+        matrix = data['matrix']
+        self.assertAlmostEqual(matrix[0][1], 1)
+        self.assertEqual(matrix[0][0], 1)
+        # A flat series correlates with nothing
+        self.assertEqual(matrix[2], [None, None, None])
+
+    def test_invalid_queries_are_rejected(self):
+        for query in ['interval=2h', 'window=1', 'hours=0', 'symbols=,', 'interval=1m&hours=720']:
+            response = self.client.get(f'/api/analytics/rolling/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class HotTierTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        writer = DataPointWriter()
+        for minutes in range(0, 48 * 60, 30):
+            writer.add('crypto', 'BTC', Decimal('100.5') + minutes, timestamp=self.now - timedelta(minutes=minutes))
+            writer.add('crypto', 'ETH', Decimal(10), timestamp=self.now - timedelta(minutes=minutes))
+        writer.flush()
+
+        self.time = 0
+        self.tier = HotTier(capacity=100, hours=24, refresh_interval=1, resync_interval=600, clock=lambda: self.time)
+        patcher = mock.patch.object(hottier, '_hot_tier', self.tier)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tier.warm()
+        # Background work is queued here and run by run_jobs(), on this thread's connection
+        self.jobs = []
+        patcher = mock.patch.object(self.tier, '_in_background', self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, job):
+        self.jobs.append(job)
+        return True
+
+    def run_jobs(self):
+        jobs, self.jobs = self.jobs, []
+        for job in jobs:
+            job()
+
+    def cold_points(self, *args):
+        with override_settings(HOT_TIER_ENABLED=False):
+            return list(series_points(*args))
+
+    def test_ring_buffer_keeps_the_newest_points(self):
+        buffer = RingBuffer(3)
+        for t in range(5):
+            buffer.append(t, t * 10)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(list(buffer.window(0, 10)), [(2, 20), (3, 30), (4, 40)])
+        self.assertEqual(list(buffer.window(3, 3)), [(3, 30)])
+
+    def test_recent_windows_are_read_without_sql(self):
+        window = (self.now - timedelta(hours=6), self.now, 'crypto', 'BTC')
+        with self.assertNumQueries(0):
+            hot = list(series_points(*window))
+        self.assertEqual(len(hot), 13)
+        self.assertEqual(hot, self.cold_points(*window))
+
+        # Every symbol of the source type, merged in time order
+        with self.assertNumQueries(0):
+            hot = list(series_points(self.now - timedelta(hours=1), self.now, 'crypto'))
+        self.assertEqual(hot, self.cold_points(self.now - timedelta(hours=1), self.now, 'crypto'))
+
+    def test_older_windows_fall_through_to_the_database(self):
+        window = (self.now - timedelta(hours=36), self.now, 'crypto', 'BTC')
+        self.assertIsNone(self.tier.points(*window))
+        self.assertEqual(len(list(series_points(*window))), 73)
+
+        # Once the ring is full it covers less than the warm-up window
+        small = HotTier(capacity=10, hours=24, clock=lambda: self.time)
+        small.warm()
+        self.assertIsNone(small.points(self.now - timedelta(hours=6), self.now, 'crypto', 'BTC'))
+        self.assertEqual(len(small.points(self.now - timedelta(hours=4), self.now, 'crypto', 'BTC')), 9)
+
+    def test_rows_inserted_elsewhere_are_picked_up(self):
+        # Saved directly, as the collector process would, so nothing tells this process
+        DataPoint.objects.create(source_type='crypto', symbol='BTC', value=Decimal(7), timestamp=self.now + timedelta(minutes=1))
+        window = (self.now - timedelta(hours=1), self.now + timedelta(hours=1), 'crypto', 'BTC')
+        self.assertEqual(len(self.tier.points(*window)), 3)
+
+        # The read only schedules the catch-up, which tails the table in the background
+        self.time = 2
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.tier.points(*window)), 3)
+        with self.assertNumQueries(1):
+            self.run_jobs()
+        self.assertEqual(self.tier.points(*window)[-1][1], Decimal('7.00000000'))
+
+        # A late point cannot be appended in order, so the series is reloaded
+        DataPoint.objects.create(source_type='crypto', symbol='BTC', value=Decimal(8), timestamp=self.now - timedelta(minutes=15))
+        self.time = 4
+        self.tier.points(*window)
+        self.run_jobs()
+        self.assertEqual(self.tier.points(*window), self.cold_points(*window))
+
+    def test_writes_in_this_process_reload_the_series(self):
+        writer = DataPointWriter()
+        writer.add('crypto', 'ETH', Decimal(20), timestamp=self.now - timedelta(minutes=10))
+        writer.flush()
+        window = (self.now - timedelta(hours=1), self.now, 'crypto', 'ETH')
+        # Until the reload lands, reads of the series go to the database
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.tier.points(*window))
+            self.assertIsNone(self.tier.points(*window[:3]))
+        self.assertEqual(len(self.tier.points(*window[:2], 'crypto', 'BTC')), 3)
+
+        self.run_jobs()
+        self.assertEqual([value for _, value, _ in self.tier.points(*window)], [10, 10, 20, 10])
+
+    def test_reads_go_to_the_database_until_warmed(self):
+        cold = HotTier(capacity=100, hours=24)
+        window = (self.now - timedelta(hours=1), self.now, 'crypto', 'BTC')
+        with self.assertNumQueries(0):
+            self.assertIsNone(cold.points(*window))
+
+    def test_resync_runs_in_the_background(self):
+        window = (self.now - timedelta(hours=1), self.now, 'crypto', 'BTC')
+        self.time = 600
+        with self.assertNumQueries(0):
+            self.tier.points(*window)
+            self.tier.points(*window)
+        self.assertEqual(self.jobs.count(self.tier.warm), 1)
+        self.assertEqual(self.tier.points(*window), self.cold_points(*window))
+
+    def test_warm_does_not_hold_the_lock_while_loading(self):
+        acquired = []
+        load = self.tier._load
+
+        def reader():
+            if self.tier._lock.acquire(timeout=1):
+                acquired.append(True)
+                self.tier._lock.release()
+
+        def check_lock(*args):
+            # Another reader must be able to take the lock during the reload
+            thread = threading.Thread(target=reader)
+            thread.start()
+            thread.join()
+            return load(*args)
+
+        with mock.patch.object(self.tier, '_load', check_lock):
+            self.tier.warm()
+            self.tier.mark_stale([('crypto', 'ETH')])
+            self.tier.catch_up()
+        self.assertEqual(acquired, [True, True])
+
+    def test_one_background_job_runs_at_a_time(self):
+        tier = HotTier(capacity=10, hours=24)
+        release = threading.Event()
+        with mock.patch('datavisualizer.hottier.connection'):
+            self.assertTrue(tier._in_background(release.wait))
+            self.assertFalse(tier._in_background(release.wait))
+            release.set()
+            tier._worker.join()
+            self.assertTrue(tier._in_background(lambda: None))
+            tier._worker.join()
+
+
+class AlertTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.sink = MemorySink()
+        self.engine = AlertEngine(sinks=[self.sink], cooldown=3600)
+
+    def alert(self, condition, threshold, symbol='BTC'):
+        return Alert.objects.create(source_type='crypto', symbol=symbol, condition=condition, threshold_value=threshold)
+
+    def write(self, *values, symbol='BTC'):
+        writer = DataPointWriter()
+        for minute, value in values:
+            writer.add('crypto', symbol, Decimal(value), timestamp=self.now + timedelta(minutes=minute))
+        with mock.patch('datavisualizer.alerts._engine', self.engine):
+            writer.flush()
+
+    def fired(self):
+        return [(n['alert'], n['value']) for n in self.sink.sent]
+
+    def test_thresholds_fire_on_crossing_only(self):
+        above = self.alert('above', 110)
+        below = self.alert('below', 90)
+        self.alert('above', 110, symbol='ETH')
+        self.write((0, 100), (1, 105), (2, 111), (3, 115), (4, 89))
+        self.assertEqual(self.fired(), [(above.pk, 111.0), (below.pk, 89.0)])
+
+        above.refresh_from_db()
+        self.assertEqual(above.last_triggered, self.now + timedelta(minutes=2))
+
+    def test_cooldown_suppresses_repeated_crossings(self):
+        above = self.alert('above', 110)
+        self.write((0, 100), (1, 111), (2, 100), (3, 111))
+        self.write((120, 100), (121, 111))
+        self.assertEqual(self.fired(), [(above.pk, 111.0), (above.pk, 111.0)])
+        self.assertEqual(self.sink.sent[1]['timestamp'], self.now + timedelta(minutes=121))
+
+    def test_percent_change_uses_window_history(self):
+        up = self.alert('change_up', 10)
+        down = self.alert('change_down', 5)
+        # History written before the alert engine first sees the series
+        self.write((0, 100))
+        self.engine.series.clear()
+        self.write((10, 105), (20, 111), (25, 98), (30, 94))
+        self.assertEqual(self.fired(), [(up.pk, 111.0), (down.pk, 94.0)])
+
+    def test_inactive_and_edited_alerts_are_reloaded(self):
+        alert = self.alert('above', 110)
+        self.write((0, 100))
+        alert.is_active = False
+        alert.save()
+        self.engine.invalidate()
+        self.write((1, 120))
+        self.assertEqual(self.fired(), [])
+
+    def test_email_sink_mails_alerts_with_an_address(self):
+        self.engine.sinks = [EmailSink()]
+        self.alert('above', 110)
+        Alert.objects.create(
+            source_type='crypto', symbol='BTC', condition='above', threshold_value=105, email='trader@example.com'
+        )
+        self.write((0, 100), (1, 111))
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['trader@example.com'])
+        self.assertEqual(message.subject, 'BTC above 105.0')
+        self.assertIn('BTC is at 111.0', message.body)
+
+    @override_settings(ALERT_SINKS=['datavisualizer.alerts.LogSink', 'datavisualizer.alerts.EmailSink'])
+    def test_sinks_come_from_settings(self):
+        self.assertEqual([type(sink) for sink in AlertEngine().sinks], [LogSink, EmailSink])
+
+
+class RollupTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+
+    def write(self, values, conflict=None):
+        writer = DataPointWriter(conflict=conflict)
+        for minute, value in values:
+            writer.add('crypto', 'BTC', Decimal(value), timestamp=self.start + timedelta(minutes=minute))
+        writer.flush()
+
+    def hourly(self):
+        return self.client.get('/api/datapoints/aggregate/?symbol=BTC&interval=1h&hours=24').json()
+
+    def test_aggregate_buckets_follow_ingestion(self):
+        # Out of order across two flushes; open/close must follow timestamps
+        self.write([(30, 5), (10, 2), (70, 7)])
+        self.write([(5, 9), (50, 1)])
+
+        first, second = self.hourly()
+        self.assertEqual(first['open'], '9.00000000')
+        self.assertEqual(first['close'], '1.00000000')
+        self.assertEqual(first['high'], '9.00000000')
+        self.assertEqual(first['low'], '1.00000000')
+        self.assertEqual(first['avg'], '4.25000000')
+        self.assertEqual(first['count'], 4)
+        self.assertEqual(second['count'], 1)
+
+        snapshot = list(Rollup.objects.values_list('interval', 'bucket', 'open', 'close', 'total', 'count'))
+        rebuild_rollups()
+        self.assertEqual(list(Rollup.objects.values_list('interval', 'bucket', 'open', 'close', 'total', 'count')), snapshot)
+
+    def test_overwritten_points_are_recomputed(self):
+        self.write([(10, 2), (20, 4)])
+        self.write([(20, 8)], conflict=DataPointWriter.CONFLICT_UPDATE)
+
+        bucket = self.hourly()[0]
+        self.assertEqual(bucket['count'], 2)
+        self.assertEqual(bucket['high'], '8.00000000')
+        self.assertEqual(bucket['avg'], '5.00000000')
+
+    def test_unknown_interval_is_rejected(self):
+        response = self.client.get('/api/datapoints/aggregate/?interval=2h')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_hours_are_rejected(self):
+        for hours in ['abc', '0', '-5', '1.5']:
+            response = self.client.get(f'/api/datapoints/aggregate/?hours={hours}')
+            self.assertEqual(response.status_code, 400, hours)
+            self.assertIn('hours', response.json())
+
+
+class RetentionTests(CacheIsolatedTestCase):
+    def test_compaction_keeps_history_readable_from_rollups(self):
+        now = timezone.now()
+        writer = DataPointWriter()
+        for hour in range(24 * 20):
+            writer.add('crypto', 'BTC', Decimal(hour), timestamp=now - timedelta(hours=hour))
+        writer.flush()
+
+        deleted = Compactor(chunk_size=50).compact(['crypto'])
+        self.assertGreater(deleted[('crypto', 'raw')], 50)
+        self.assertEqual(
+            LatestValue.objects.get(symbol='BTC').data_points,
+            DataPoint.objects.filter(symbol='BTC').count(),
+        )
+
+        # 20 days requested: recent days come from raw rows, older ones from rollups
+        points = list(series_points(now - timedelta(days=20), now, 'crypto', 'BTC'))
+        timestamps = [point[0] for point in points]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertLess(timestamps[0], DataPoint.objects.order_by('timestamp').first().timestamp)
+        self.assertEqual(len(points), 24 * 20)
+
+
+    def test_rebuild_keeps_rollups_older_than_the_raw_data(self):
+        now = timezone.now()
+        writer = DataPointWriter()
+        for hour in range(24 * 20):
+            writer.add('crypto', 'BTC', Decimal(hour), timestamp=now - timedelta(hours=hour))
+        writer.flush()
+        Compactor().compact(['crypto'])
+
+        fields = ('interval', 'bucket', 'open', 'close', 'total', 'count')
+        snapshot = list(Rollup.objects.order_by(*fields).values_list(*fields))
+        rebuild_rollups()
+        self.assertEqual(list(Rollup.objects.order_by(*fields).values_list(*fields)), snapshot)
+        oldest_raw = DataPoint.objects.order_by('timestamp').first().timestamp
+        self.assertLess(Rollup.objects.filter(interval='1d').order_by('bucket').first().bucket, oldest_raw)
+
+@override_settings(HOT_TIER_ENABLED=False, RESPONSE_CACHE_ENABLED=False)
+class CompactStorageTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def write(self, hours=48):
+        writer = DataPointWriter()
+        for hour in range(hours):
+            timestamp = self.now - timedelta(hours=hour)
+            writer.add('crypto', 'BTC', Decimal('100.12345678') + hour, timestamp=timestamp,
+                       metadata={'market_cap': 1e12, 'volume_24h': None, 'change_24h': '-1.5'})
+            writer.add('currency', 'USD-EUR', Decimal('0.9'), timestamp=timestamp,
+                       metadata={'base': 'USD', 'target': 'EUR'})
+        writer.flush()
+
+    def chart(self, **params):
+        return self.client.get('/api/datapoints/chart_data/', {'hours': 48, 'points': 500, **params}).json()
+
+    @override_settings(COMPACT_STORAGE='write')
+    def test_writes_are_mirrored_into_narrow_rows(self):
+        self.write(hours=2)
+        self.assertEqual(SeriesPoint.objects.count(), 4)
+        self.assertEqual(Series.objects.get(symbol='USD-EUR').attributes, {'base': 'USD', 'target': 'EUR'})
+        point = SeriesPoint.objects.filter(series__symbol='BTC').latest('timestamp')
+        self.assertEqual((point.value, point.market_cap, point.volume_24h, point.change_24h),
+                         (100.12345678, 1e12, None, -1.5))
+
+    def test_backfilled_schema_serves_the_same_output(self):
+        self.write()
+        legacy = self.chart(symbol='BTC'), self.chart(source_type='currency')
+        self.assertEqual(SeriesPoint.objects.count(), 0)
+
+        self.assertEqual(list(compactstore.backfill(chunk_size=30))[-1], DataPoint.objects.latest('id').id)
+        self.assertEqual(SeriesPoint.objects.count(), 96)
+        with override_settings(COMPACT_STORAGE='read'):
+            self.assertEqual((self.chart(symbol='BTC'), self.chart(source_type='currency')), legacy)
+            response = self.client.post('/api/series/batch/', {'series': [
+                {'source_type': 'crypto', 'symbol': 'BTC', 'hours': 3},
+                {'source_type': 'stock', 'symbol': 'AAPL', 'hours': 3},
+            ]}, content_type='application/json')
+        btc, aapl = response.json()['series']
+        self.assertEqual(btc['data'][0]['value'], '102.12345678')
+        self.assertEqual(aapl['data'], [])
+
+    @override_settings(COMPACT_STORAGE='read')
+    def test_retention_also_compacts_narrow_rows(self):
+        self.write(hours=24 * 10)
+        Compactor().compact(['crypto'])
+        oldest = DataPoint.objects.filter(symbol='BTC').earliest('timestamp').timestamp
+        self.assertEqual(compactstore.oldest_timestamp('crypto', 'BTC'), oldest)
+        self.assertEqual(SeriesPoint.objects.filter(series__symbol='USD-EUR').count(), 240)
+
+
+class DataPointListTests(CacheIsolatedTestCase):
+    def setUp(self):
+        now = timezone.now()
+        writer = DataPointWriter()
+        for minute in range(125):
+            # Two series share every timestamp, so the cursor must break ties on id
+            for symbol in ['BTC', 'ETH']:
+                writer.add('crypto', symbol, Decimal(minute), timestamp=now - timedelta(minutes=minute))
+        writer.flush()
+
+    def test_cursor_walks_every_row_once(self):
+        url = '/api/datapoints/?hours=24'
+        seen = []
+        while url:
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            seen.extend(row['id'] for row in page['results'])
+            url = page['next']
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+
+    def test_fields_projection(self):
+        page = self.client.get('/api/datapoints/?fields=symbol,value&page_size=5').json()
+        self.assertEqual(len(page['results']), 5)
+        self.assertEqual(set(page['results'][0]), {'symbol', 'value'})
+        full = self.client.get('/api/datapoints/?page_size=5').json()
+        self.assertEqual(
+            page['results'],
+            [{'symbol': row['symbol'], 'value': row['value']} for row in full['results']],
+        )
+
+        second = self.client.get(page['next']).json()
+        self.assertEqual(set(second['results'][0]), {'symbol', 'value'})
+        self.assertEqual(self.client.get('/api/datapoints/?fields=secret').status_code, 400)
+
+    def test_read_endpoints_are_async_views(self):
+        for path in ['/api/datapoints/', '/api/datapoints/chart_data/', '/api/datapoints/summary/']:
+            self.assertTrue(iscoroutinefunction(resolve(path).func), path)
+        # Routes with synchronous actions keep DRF's dispatch
+        self.assertFalse(iscoroutinefunction(resolve('/api/datapoints/1/').func))
+        self.assertFalse(iscoroutinefunction(resolve('/api/datapoints/aggregate/').func))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    async def test_async_client_gets_the_same_answers(self):
+        for path in [
+            '/api/datapoints/?page_size=10',
+            '/api/datapoints/?since=0&fields=id,symbol',
+            '/api/datapoints/chart_data/?symbol=BTC',
+            '/api/datapoints/chart_data/?points=20&format=columnar',
+            '/api/datapoints/summary/',
+            '/api/datapoints/summary/?since=0',
+        ]:
+            response = await self.async_client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            expected = await sync_to_async(self.client.get)(path)
+            self.assertEqual(response.json(), expected.json(), path)
+            self.assertEqual(response.get('X-Data-Cursor'), expected.get('X-Data-Cursor'), path)
+        response = await self.async_client.get('/api/datapoints/chart_data/?since=soon')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        writer = DataPointWriter()
+        for minute in range(30):
+            writer.add('crypto', 'BTC', Decimal('1.5') * minute, timestamp=self.now - timedelta(minutes=minute))
+            writer.add('stock', 'AAPL', Decimal(minute), timestamp=self.now - timedelta(minutes=minute))
+        writer.flush()
+
+    def export(self, query):
+        response = self.client.get(f'/api/export/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        lines = self.export('format=ndjson&source_type=crypto').splitlines()
+        self.assertEqual(len(lines), 30)
+        first = json.loads(lines[0])
+        self.assertEqual(first['symbol'], 'BTC')
+        self.assertEqual(first['value'], 43.5)
+        self.assertLess(first['timestamp'], json.loads(lines[-1])['timestamp'])
+
+    def test_csv_export(self):
+        rows = list(csv.reader(io.StringIO(self.export('format=csv&symbol=AAPL&hours=1'))))
+        self.assertEqual(rows[0], ['timestamp', 'source_type', 'symbol', 'value'])
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[1][3], '29.00000000')
+
+    async def test_asgi_export_streams_asynchronously(self):
+        response = await self.async_client.get('/api/export/?format=csv&source_type=crypto')
+        self.assertEqual(response.status_code, 200)
+        # Django reads a sync iterator whole before sending it under ASGI
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body, await sync_to_async(self.export)('format=csv&source_type=crypto'))
+        self.assertEqual(len(body.splitlines()), 31)
+
+    def test_invalid_window_is_rejected(self):
+        self.assertEqual(self.client.get('/api/export/?start=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/api/export/?format=xml').status_code, 400)
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    alias = 'concurrency'
+    # Resolved when the class is set up, after the alias below is registered
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        # A file database of its own: the test database lives in memory, where WAL does not apply
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        profile = sqlite_profile(os.path.join(directory.name, 'db.sqlite3'))
+        connections.settings[cls.alias] = connections.configure_settings({'default': profile})['default']
+        cls.addClassCleanup(connections.settings.pop, cls.alias)
+        super().setUpClass()
+        cls.addClassCleanup(connections[cls.alias].close)
+        with connections[cls.alias].schema_editor() as editor:
+            editor.create_model(DataPoint)
+
+    def test_readers_and_collector_work_together_without_lock_errors(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+        now = timezone.now()
+        errors = []
+        reads = []
+        collecting = threading.Event()
+
+        def collector():
+            try:
+                for batch in range(30):
+                    with transaction.atomic(using=self.alias):
+                        DataPoint.objects.using(self.alias).bulk_create([
+                            DataPoint(source_type='crypto', symbol=f"S{i % 10}", value=i,
+                                      timestamp=now - timedelta(minutes=batch * 200 + i))
+                            for i in range(200)
+                        ])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                collecting.set()
+                connections[self.alias].close()
+
+        def reader():
+            try:
+                while not collecting.is_set():
+                    rows = DataPoint.objects.using(self.alias).filter(symbol='S3', timestamp__gte=now - timedelta(days=1))
+                    list(rows.values_list('timestamp', 'value')[:500])
+                    reads.append(DataPoint.objects.using(self.alias).count())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections[self.alias].close()
+
+        def compactor():
+            # Reads a chunk, then deletes it in the same transaction, like retention.Compactor
+            try:
+                while not collecting.is_set():
+                    with transaction.atomic(using=self.alias):
+                        rows = DataPoint.objects.using(self.alias).filter(symbol='S9')
+                        ids = list(rows.order_by('timestamp').values_list('id', flat=True)[:5])
+                        DataPoint.objects.using(self.alias).filter(id__in=ids).delete()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections[self.alias].close()
+
+        threads = [threading.Thread(target=target) for target in [collector, compactor] + [reader] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreater(len(reads), 4)
+        self.assertEqual(DataPoint.objects.using(self.alias).exclude(symbol='S9').count(), 5400)
+
+
+class ImportHistoryTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'history.csv')
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'source_type', 'symbol', 'value'])
+            for day in range(10):
+                writer.writerow([f'2025-01-{day + 1:02d}T00:00:00+00:00', 'stock', 'AAPL', f'{100 + day}.5'])
+            writer.writerow(['2025-01-01T00:00:00+00:00', 'stock', 'AAPL', '100.5'])
+            writer.writerow(['not a date', 'stock', 'AAPL', '1'])
+            writer.writerow(['2025-01-20T00:00:00+00:00', 'stock', 'AAPL', 'NaN'])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_import_dedups_validates_and_updates_derived_tables(self):
+        importer = HistoryImporter(chunk_size=3, defer_indexes=True)
+        importer.run(CsvAdapter(self.path).records())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, DataPoint._meta.db_table)
+        self.assertTrue(all(index.name in constraints for index in DataPoint._meta.indexes))
+
+        self.assertEqual(importer.invalid, 2)
+        self.assertEqual(DataPoint.objects.filter(symbol='AAPL').count(), 10)
+        self.assertEqual(LatestValue.objects.get(symbol='AAPL').value, Decimal('109.5'))
+        self.assertEqual(Rollup.objects.filter(symbol='AAPL', interval='1d').count(), 10)
+
+    def test_import_keeps_compacted_history(self):
+        now = timezone.now()
+        writer = DataPointWriter()
+        for day in range(30):
+            writer.add('crypto', 'BTC', Decimal(100 + day), timestamp=now - timedelta(days=day))
+        writer.flush()
+        Compactor().compact(['crypto'])
+        daily = list(Rollup.objects.filter(symbol='BTC', interval='1d').values_list('bucket', 'total', 'count'))
+        latest = LatestValue.objects.get(symbol='BTC')
+        self.assertLess(DataPoint.objects.filter(symbol='BTC').count(), 30)
+
+        HistoryImporter().run([
+            {'timestamp': now.isoformat(), 'source_type': 'crypto', 'symbol': 'ETH', 'value': '10'},
+            # Already stored: ignored, and not counted a second time
+            {'timestamp': now.isoformat(), 'source_type': 'crypto', 'symbol': 'BTC', 'value': '1'},
+            {'timestamp': (now - timedelta(hours=1)).isoformat(), 'source_type': 'crypto', 'symbol': 'BTC', 'value': '5'},
+        ])
+        self.assertEqual(
+            list(Rollup.objects.filter(symbol='BTC', interval='1d').values_list('bucket', 'total', 'count')),
+            [
+                (bucket, total + 5, count + 1) if bucket == bucket_start(now - timedelta(hours=1), '1d')
+                else (bucket, total, count)
+                for bucket, total, count in daily
+            ],
+        )
+        btc = LatestValue.objects.get(symbol='BTC')
+        self.assertEqual((btc.value, btc.data_points), (latest.value, latest.data_points + 1))
+        self.assertEqual(LatestValue.objects.get(symbol='ETH').value, Decimal('10'))
+
+    def test_resumes_from_checkpoint(self):
+        checkpoint = os.path.join(self.directory.name, 'history.checkpoint')
+        with open(checkpoint, 'w') as f:
+            json.dump({'position': 5}, f)
+
+        HistoryImporter(checkpoint=checkpoint).run(CsvAdapter(self.path).records())
+        # Days 6-10, plus the repeated day 1 row which is new because day 1 was skipped
+        self.assertEqual(DataPoint.objects.count(), 6)
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append(args)
+
+
+class SchedulerTests(CacheIsolatedTestCase):
+    def setUp(self):
+        self.now = 0
+        self.scheduler = CollectorScheduler(service=mock.Mock(), clock=lambda: self.now)
+        for name, source_type, minutes in [('btc', 'crypto', 1), ('eth', 'crypto', 1), ('aapl', 'stock', 5)]:
+            DataSource.objects.create(
+                name=name, source_type=source_type, api_url='https://example.com', update_interval_minutes=minutes
+            )
+        self.scheduler.reload_sources()
+
+    def dispatch(self):
+        executor = FakeExecutor()
+        self.scheduler._dispatch_due(executor, self.now)
+        # Finished jobs free their sources for the next slot
+        self.scheduler._running.clear()
+        return [sorted(source.name for source in group) for (group,) in executor.jobs]
+
+    def test_due_sources_are_grouped_by_source_type(self):
+        self.assertEqual(sorted(self.dispatch()), [['aapl'], ['btc', 'eth']])
+        self.assertEqual(self.dispatch(), [])
+
+        self.now = 60
+        self.assertEqual(self.dispatch(), [['btc', 'eth']])
+
+    def test_overdue_slots_realign_to_the_next_future_slot(self):
+        self.dispatch()
+        # Slept through several slots: one catch-up run, then back on the original grid
+        self.now = 250
+        self.assertEqual(self.dispatch(), [['btc', 'eth']])
+        self.assertEqual(sorted(due for due, _, _, _ in self.scheduler._heap), [300, 300, 300])
+
+        self.now = 299
+        self.assertEqual(self.dispatch(), [])
+        self.now = 300
+        self.assertEqual(sorted(self.dispatch()), [['aapl'], ['btc', 'eth']])
+
+    def test_running_sources_are_skipped(self):
+        self.scheduler._dispatch_due(FakeExecutor(), self.now)
+        self.now = 60
+        with self.assertLogs('datavisualizer.scheduler', 'WARNING'):
+            self.assertEqual(self.dispatch(), [])
+
+    def due_times(self, name):
+        pk = DataSource.objects.get(name=name).pk
+        return [due for due, _, source_pk, generation in self.scheduler._heap
+                if source_pk == pk and generation == self.scheduler._generations[pk]]
+
+    def test_interval_changes_reschedule_under_a_new_generation(self):
+        DataSource.objects.filter(name='aapl').update(update_interval_minutes=10)
+        self.scheduler.reload_sources()
+        # The entry queued under the old interval is ignored when popped
+        self.assertEqual(sorted(self.dispatch()), [['aapl'], ['btc', 'eth']])
+        self.assertEqual(self.due_times('aapl'), [600])
+        self.assertEqual(self.scheduler._generations[DataSource.objects.get(name='btc').pk], 1)
+
+    def test_deactivated_sources_drop_out(self):
+        DataSource.objects.filter(name='eth').update(is_active=False)
+        self.scheduler.reload_sources()
+        self.assertEqual(sorted(self.dispatch()), [['aapl'], ['btc']])
+        self.now = 60
+        self.assertEqual(self.dispatch(), [['btc']])
+
+    def test_first_run_is_scheduled_from_last_updated(self):
+        now = timezone.now()
+        DataSource.objects.create(
+            name='recent', source_type='stock', api_url='https://example.com',
+            update_interval_minutes=5, last_updated=now - timedelta(minutes=2),
+        )
+        DataSource.objects.create(
+            name='overdue', source_type='stock', api_url='https://example.com',
+            update_interval_minutes=5, last_updated=now - timedelta(hours=1),
+        )
+        self.scheduler.reload_sources()
+        [due] = self.due_times('recent')
+        self.assertAlmostEqual(due, 180, delta=5)
+        self.assertEqual(self.due_times('overdue'), [0])
+
+    def test_run_pending_collects_due_sources_once(self):
+        self.scheduler.service.fetch_sources.side_effect = lambda sources: {
+            source.pk: [{'symbol': 'BTC', 'price': Decimal(1)}, {'symbol': source.name, 'price': Decimal(1)}]
+            for source in sources
+        }
+        self.scheduler.service.store_data.side_effect = DataCollectionService().store_data
+
+        # btc and eth share BTC, which is stored once
+        self.assertEqual(self.scheduler.run_pending(), 5)
+        self.assertEqual(DataPoint.objects.count(), 5)
+        self.assertEqual(self.scheduler.service.fetch_sources.call_count, 2)
+        self.assertFalse(DataSource.objects.filter(last_updated=None).exists())
+
+        # A fresh scheduler, as on the next invocation, finds nothing due yet
+        self.assertEqual(CollectorScheduler(service=self.scheduler.service, clock=lambda: self.now).run_pending(), 0)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.time = 0.0
+        self.sleeps = []
+        patcher = mock.patch('datavisualizer.ratelimit.time.sleep', self.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+    def limiter(self, **limits):
+        return RateLimiter('test', limits, clock=lambda: self.time)
+
+    def test_bucket_refills_at_its_rate(self):
+        bucket = TokenBucket(2, 1, clock=lambda: self.time)
+        bucket.tokens = 0
+        self.assertEqual(bucket.wait_time(), 0.5)
+        self.time = 0.25
+        bucket.refill(self.time)
+        self.assertEqual(bucket.tokens, 0.5)
+        self.time = 10
+        bucket.refill(self.time)
+        self.assertEqual((bucket.tokens, bucket.wait_time()), (2, 0))
+
+    def test_calls_beyond_the_quota_are_paced(self):
+        limiter = self.limiter(per_second=2)
+        for _ in range(4):
+            self.assertTrue(limiter.acquire())
+        self.assertEqual(self.sleeps, [0.5, 0.5])
+        usage = limiter.usage()
+        self.assertEqual((usage['calls'], usage['throttled'], usage['wait_seconds']), (4, 2, 1.0))
+
+    def test_the_tightest_window_sets_the_pace(self):
+        limiter = self.limiter(per_second=10, per_minute=2)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(self.sleeps, [30.0])
+
+    def test_waits_beyond_the_timeout_are_rejected(self):
+        limiter = self.limiter(per_day=1)
+        self.assertTrue(limiter.acquire(timeout=5))
+        with self.assertLogs('datavisualizer.ratelimit', 'WARNING'):
+            self.assertFalse(limiter.acquire(timeout=5))
+        self.assertEqual(self.sleeps, [])
+        usage = limiter.usage()
+        self.assertEqual((usage['calls'], usage['rejected']), (1, 1))
+
+        # Once the window has refilled, the call goes through
+        self.time = 86400
+        self.assertTrue(limiter.acquire(timeout=5))
+
+    def test_no_limits_never_wait(self):
+        limiter = self.limiter()
+        for _ in range(100):
+            self.assertTrue(limiter.acquire(timeout=0))
+        self.assertEqual(self.sleeps, [])
+
+
+class BatchedFetchTests(SimpleTestCase):
+    def setUp(self):
+        self.service = DataCollectionService()
+
+    def sources(self, source_type, *symbol_lists):
+        return [
+            DataSource(pk=pk, name=f"source{pk}", source_type=source_type, symbols=symbols)
+            for pk, symbols in enumerate(symbol_lists, start=1)
+        ]
+
+    def test_bulk_providers_fetch_the_union_once_and_split_it(self):
+        sources = self.sources('crypto', ['bitcoin', 'ethereum'], ['ethereum', 'solana'], [])
+
+        def prices(symbols):
+            return [{'symbol': symbol.upper(), 'price': Decimal(1)} for symbol in symbols]
+
+        with mock.patch.object(self.service.crypto_service, 'get_crypto_prices', side_effect=prices) as fetch:
+            fetched = self.service.fetch_sources(sources)
+        fetch.assert_called_once_with(['bitcoin', 'ethereum', 'solana', 'cardano', 'polkadot'])
+        self.assertEqual(
+            {pk: [item['symbol'] for item in items] for pk, items in fetched.items()},
+            {1: ['BITCOIN', 'ETHEREUM'], 2: ['ETHEREUM', 'SOLANA'], 3: ['BITCOIN', 'ETHEREUM', 'CARDANO', 'POLKADOT']},
+        )
+
+    def test_symbols_missing_from_the_response_are_left_out(self):
+        sources = self.sources('currency', ['EUR', 'GBP-JPY'], ['XXX'])
+        rows = [{'symbol': 'USD-EUR'}, {'symbol': 'GBP-JPY'}]
+        with mock.patch.object(self.service.exchange_service, 'get_exchange_rates', return_value=rows):
+            fetched = self.service.fetch_sources(sources)
+        self.assertEqual(fetched, {1: rows, 2: []})
+
+    def test_other_providers_fetch_each_source(self):
+        sources = self.sources('stock', ['AAPL'], ['MSFT'])
+        with mock.patch.object(self.service.stock_service, 'get_stock_prices', return_value=[]) as fetch:
+            self.service.fetch_sources(sources)
+        self.assertEqual(fetch.call_args_list, [mock.call(['AAPL']), mock.call(['MSFT'])])
+
+def fake_provider(url, params=None, headers=None, timeout=None):
+    """Canned provider answers for a mocked requests session"""
+    params = params or {}
+    if url.endswith('/simple/price'):
+        body = {coin: {'usd': 100.0 + i, 'last_updated_at': 1700000000} for i, coin in enumerate(params['ids'].split(','))}
+    elif 'alphavantage' in url:
+        body = {'Global Quote': {'05. price': f"{len(params['symbol'])}.5", '09. change': '1.25'}}
+    elif url.endswith('/weather'):
+        body = {'main': {'temp': len(params['q']), 'humidity': 60, 'pressure': 1012}, 'weather': [{'description': 'clear'}]}
+    else:
+        body = {'base': 'USD', 'rates': {'EUR': 0.9, 'GBP': 0.8, 'JPY': 150, 'AUD': 1.5, 'CAD': 1.4, 'CHF': 0.9}}
+    response = http_response(200, body=body)
+    response.url = url
+    return response
+
+
+class ConcurrentCollectionTests(CacheIsolatedTestCase):
+    symbols = {
+        'crypto': [f"coin{i}" for i in range(5)],
+        'stock': [f"SYM{i}" for i in range(5)],
+        'weather': [f"City {i}" for i in range(5)],
+    }
+
+    def service(self, concurrent):
+        service = DataCollectionService(concurrent=concurrent)
+        service.stock_service.api_key = service.weather_service.api_key = 'test'
+        self.threads = set()
+
+        def get(*args, **kwargs):
+            self.threads.add(threading.current_thread().name)
+            return fake_provider(*args, **kwargs)
+
+        for source_type in service.SOURCE_TYPES:
+            api_service = service.service_for(source_type)
+            api_service.session = mock.Mock(get=mock.Mock(side_effect=get))
+            # Neither mode may be served from the other's responses or paced by real quotas
+            api_service.response_cache = ResponseCache(MemoryCacheStore())
+            api_service.rate_limiter = RateLimiter(api_service.provider)
+        return service
+
+    def collect(self, concurrent):
+        """(fetched items, reported count, stored rows) of one round, rolled back afterwards"""
+        service = self.service(concurrent)
+        fetched = service.fetch_all_data(self.symbols)
+        with mock.patch.dict(ingestion._last_stored, clear=True), transaction.atomic():
+            with mock.patch.object(service, 'fetch_all_data', return_value=fetched):
+                total = service.collect_all_data()
+            stored = sorted(DataPoint.objects.values_list('source_type', 'symbol', 'value'))
+            transaction.set_rollback(True)
+        return fetched, total, stored
+
+    def test_concurrent_rounds_match_serial_ones(self):
+        serial = self.collect(concurrent=False)
+        self.assertEqual(self.threads, {'MainThread'})
+        concurrent = self.collect(concurrent=True)
+        self.assertGreater(len(self.threads), 1)
+
+        self.assertEqual(serial, concurrent)
+        fetched, total, stored = serial
+        self.assertEqual({source_type: len(items) for source_type, items in fetched.items()},
+                         {'crypto': 5, 'stock': 5, 'weather': 5, 'currency': 6})
+        self.assertEqual((total, len(stored)), (21, 21))
+
+def http_response(status, headers=None, body=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = json.dumps(body).encode() if body is not None else b''
+    response.url = 'https://api.example.com/prices'
+    return response
+
+
+@override_settings(HTTP_MAX_RETRIES=2, HTTP_MAX_RETRY_WAIT=30)
+class RequestRetryTests(SimpleTestCase):
+    url = 'https://api.example.com/prices'
+
+    def setUp(self):
+        self.time = 0
+        self.breaker = CircuitBreaker('api.example.com', failure_threshold=2, reset_timeout=60, clock=lambda: self.time)
+        self.sleep = mock.Mock()
+        for target, value in [('get_circuit_breaker', lambda host: self.breaker), ('time.sleep', self.sleep)]:
+            patcher = mock.patch(f'datavisualizer.services.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.service = APIService()
+        self.service.session = mock.Mock()
+
+    def send(self, *responses):
+        self.service.session.get.side_effect = list(responses)
+        return self.service._send(self.url)
+
+    def test_transient_errors_are_retried(self):
+        response = self.send(http_response(503), requests.exceptions.ConnectionError('reset'), http_response(200))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.service.session.get.call_count, 3)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_retry_after_is_honoured(self):
+        self.send(http_response(429, {'Retry-After': '3'}), http_response(200))
+        self.sleep.assert_called_once_with(3.0)
+
+    def test_long_retry_after_gives_up_for_this_round(self):
+        with self.assertLogs('datavisualizer.services', 'ERROR'):
+            self.assertIsNone(self.send(http_response(429, {'Retry-After': '120'})))
+        self.assertEqual(self.service.session.get.call_count, 1)
+        self.assertEqual(self.breaker.failures, 1)
+
+    def test_exhausted_retries_count_one_failure(self):
+        with self.assertLogs('datavisualizer.services', 'ERROR'):
+            self.assertIsNone(self.send(http_response(500), http_response(502), http_response(503)))
+        self.assertEqual(self.breaker.failures, 1)
+
+    def test_server_errors_count_against_the_breaker_but_client_errors_do_not(self):
+        with self.assertLogs('datavisualizer.services', 'ERROR'):
+            self.assertIsNone(self.send(http_response(501)))
+        self.assertEqual(self.breaker.failures, 1)
+
+        # Neither a failure nor a success: the count of consecutive failures stands
+        with self.assertLogs('datavisualizer.services', 'ERROR'):
+            self.assertIsNone(self.send(http_response(404)))
+        self.assertEqual(self.breaker.failures, 1)
+        # Neither is retried
+        self.assertEqual(self.service.session.get.call_count, 2)
+
+    def test_breaker_opens_and_recovers_through_a_trial_request(self):
+        with self.assertLogs('datavisualizer', 'WARNING'):
+            for _ in range(2):
+                self.send(http_response(500), http_response(500), http_response(500))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        # Open: refused without touching the network
+        self.service.session.get.reset_mock()
+        with self.assertLogs('datavisualizer.services', 'WARNING'):
+            self.assertIsNone(self.service._send(self.url))
+        self.service.session.get.assert_not_called()
+
+        # After the reset timeout one trial request goes through and closes it again
+        self.time = 61
+        self.assertEqual(self.send(http_response(200)).status_code, 200)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_request_reopens_the_breaker(self):
+        self.breaker.state, self.breaker.opened_at = CircuitBreaker.OPEN, 0
+        self.time = 61
+        with self.assertLogs('datavisualizer', 'WARNING'):
+            self.send(http_response(503), http_response(503), http_response(503))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.opened_at, 61)
+
+
+class ProviderStatusTests(CacheIsolatedTestCase):
+    fields = {'updated', 'quotas', 'circuits', 'http_cache'}
+
+    def test_live_status_is_served_until_the_collector_publishes(self):
+        body = self.client.get('/api/providers/').json()
+        self.assertEqual(set(body), self.fields)
+
+    def test_published_snapshot_has_the_same_shape(self):
+        status = {'quotas': {'coingecko': {'used': 3}}, 'circuits': {}, 'http_cache': {'hits': 7}}
+        with mock.patch('datavisualizer.services.provider_status', return_value=status):
+            publish_provider_status()
+        body = self.client.get('/api/providers/').json()
+        self.assertEqual(set(body), self.fields)
+        self.assertEqual(body['quotas'], {'coingecko': {'used': 3}})
+        self.assertEqual(body['http_cache'], {'hits': 7})
+
+class ProviderCacheTests(SimpleTestCase):
+    url = 'https://api.example.com/prices'
+
+    def setUp(self):
+        self.time = 1000
+        self.executor = mock.Mock()
+        breaker = CircuitBreaker('api.example.com')
+        for target, value in [('get_circuit_breaker', lambda host: breaker), ('_refresh_executor', self.executor)]:
+            patcher = mock.patch(f'datavisualizer.services.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.service = APIService()
+        self.service.session = mock.Mock()
+        self.cache = ResponseCache(MemoryCacheStore(), stale_while_revalidate=30, clock=lambda: self.time)
+        self.service.response_cache = self.cache
+
+    def get(self, *responses):
+        self.service.session.get.side_effect = list(responses)
+        return self.service.make_request(self.url, {'ids': 'btc'}, cache_ttl=60)
+
+    def sent_headers(self):
+        return self.service.session.get.call_args.kwargs['headers']
+
+    def test_fresh_entries_are_served_without_a_request(self):
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Mon, 02 Jan 2026 00:00:00 GMT'}
+        self.assertEqual(self.get(http_response(200, validators, {'btc': 1})), {'btc': 1})
+        self.time += 59
+        self.assertEqual(self.get(), {'btc': 1})
+        self.assertEqual(self.service.session.get.call_count, 1)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'stale_hits': 0, 'revalidated': 0, 'misses': 1})
+
+    def test_expired_entries_are_revalidated(self):
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Mon, 02 Jan 2026 00:00:00 GMT'}
+        self.get(http_response(200, validators, {'btc': 1}))
+
+        self.time += 100
+        self.assertEqual(self.get(http_response(304)), {'btc': 1})
+        self.assertEqual(self.sent_headers(), {
+            'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 02 Jan 2026 00:00:00 GMT',
+        })
+        self.assertEqual(self.cache.stats()['revalidated'], 1)
+        # The 304 made the entry fresh again
+        key = requests.Request('GET', self.url, params={'ids': 'btc'}).prepare().url
+        self.assertEqual(self.cache.lookup(key)[1], ResponseCache.FRESH)
+
+        # A changed upstream answers 200 and replaces the entry
+        self.time += 100
+        self.assertEqual(self.get(http_response(200, {'ETag': '"v2"'}, {'btc': 2})), {'btc': 2})
+        self.time += 100
+        self.get(http_response(304))
+        self.assertEqual(self.sent_headers(), {'If-None-Match': '"v2"'})
+
+    def test_stale_entries_are_served_while_one_refresh_runs(self):
+        self.get(http_response(200, {}, {'btc': 1}))
+        self.time += 70
+
+        self.assertEqual(self.get(), {'btc': 1})
+        self.assertEqual(self.get(), {'btc': 1})
+        self.assertEqual(self.service.session.get.call_count, 1)
+        self.executor.submit.assert_called_once()
+        self.assertEqual(self.cache.stats()['stale_hits'], 2)
+
+        fn, *args = self.executor.submit.call_args.args
+        self.service.session.get.side_effect = [http_response(200, {}, {'btc': 2})]
+        fn(*args)
+        self.assertEqual(self.get(), {'btc': 2})
+        # The finished refresh released its claim
+        self.time += 70
+        self.get()
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_file_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileCacheStore(directory)
+            self.assertIsNone(store.get('key'))
+            store.set('key', {'data': [1, 2], 'ttl': 60})
+            self.assertEqual(FileCacheStore(directory).get('key'), {'data': [1, 2], 'ttl': 60})
+
+
+class CrossRateTests(SimpleTestCase):
+    # Units of each currency per US dollar
+    document = {'base': 'USD', 'rates': {'EUR': 0.8, 'GBP': 0.5, 'JPY': 150, 'XXX': 0}, 'time_last_updated': 1700000000}
+
+    def test_pairs_default_to_the_base_currency(self):
+        self.assertEqual(parse_pair('eur', 'usd'), ('USD', 'EUR'))
+        self.assertEqual(parse_pair('eur-gbp', 'USD'), ('EUR', 'GBP'))
+
+    def test_any_pair_is_derived_from_one_document(self):
+        matrix = CrossRateMatrix('usd', self.document['rates'])
+        pairs, rates = matrix.pair_rates([('USD', 'EUR'), ('EUR', 'GBP'), ('GBP', 'USD'), ('JPY', 'EUR'), ('EUR', 'EUR')])
+        self.assertEqual(pairs, [('USD', 'EUR'), ('EUR', 'GBP'), ('GBP', 'USD'), ('JPY', 'EUR'), ('EUR', 'EUR')])
+        for rate, expected in zip(rates, [0.8, 0.625, 2.0, 0.8 / 150, 1.0]):
+            self.assertAlmostEqual(rate, expected)
+
+    def test_unknown_and_unpriced_currencies_are_skipped(self):
+        matrix = CrossRateMatrix('USD', self.document['rates'])
+        pairs, rates = matrix.pair_rates([('USD', 'XXX'), ('ABC', 'EUR'), ('GBP', 'EUR')])
+        self.assertEqual(pairs, [('GBP', 'EUR')])
+        self.assertEqual(len(rates), 1)
+        self.assertEqual(matrix.pair_rates([('ABC', 'EUR')])[0], [])
+
+    def test_service_fetches_the_base_document_once(self):
+        service = ExchangeRateService()
+        with mock.patch.object(service, 'make_request', return_value=self.document) as request:
+            results = service.get_exchange_rates(currencies=['EUR', 'EUR-GBP', 'ABC'])
+        request.assert_called_once()
+        self.assertEqual([row['symbol'] for row in results], ['USD-EUR', 'EUR-GBP'])
+        self.assertEqual(results[1]['rate'], Decimal('0.625'))
+        self.assertEqual(results[1]['updated_at'], 1700000000)
+        self.assertEqual(service.result_symbol('gbp'), 'USD-GBP')
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from . import compactstore
+from .hottier import get_hot_tier
+from .models import DataPoint, Rollup
+from .rollups import INTERVALS, VALUE_QUANTUM, bucket_start
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def series_points(start, end, source_type=None, symbol=None):
+    """Yield (timestamp, value, symbol) in time order across storage tiers
+
+    Raw data points (SeriesPoint rows with COMPACT_STORAGE = 'read') are
+    used wherever they still exist. Older parts of the
+    window, whose raw rows were compacted away, are filled from the finest
+    rollup interval that still covers them, each bucket contributing its
+    average at the bucket's start. Readers therefore see one continuous
+    series whatever the retention policy has removed. Windows the hot tier
+    covers are answered from memory.
+    """
+    hot = get_hot_tier().points(start, end, source_type, symbol)
+    if hot is not None:
+        yield from hot
+        return
+
+    filters = {}
+    if source_type:
+        filters['source_type'] = source_type
+    if symbol:
+        filters['symbol'] = symbol
+
+    compact = compactstore.reads_enabled()
+    if compact:
+        oldest_raw = compactstore.oldest_timestamp(source_type, symbol)
+    else:
+        raw = DataPoint.objects.filter(**filters)
+        oldest_raw = raw.order_by('timestamp').values_list('timestamp', flat=True).first()
+
+    # Walk from the finest tier to the coarsest, each covering what is older than the last
+    segments = []
+    upper = oldest_raw or end
+    for interval, seconds in INTERVALS.items():
+        if upper <= start:
+            break
+        rollups = Rollup.objects.filter(
+            interval=interval,
+            bucket__gte=bucket_start(start, interval),
+            bucket__lte=min(upper, end) - timedelta(seconds=seconds),
+            **filters
+        )
+        oldest = rollups.order_by('bucket').values_list('bucket', flat=True).first()
+        if oldest is None:
+            continue
+        segments.append(rollups)
+        upper = oldest
+
+    for rollups in reversed(segments):
+        rows = rollups.order_by('bucket').values_list('bucket', 'total', 'count', 'symbol')
+        for bucket, total, count, row_symbol in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            yield bucket, (total / count).quantize(VALUE_QUANTUM), row_symbol
+
+    if compact:
+        yield from compactstore.points(start, end, source_type, symbol)
+        return
+    rows = raw.filter(timestamp__gte=start, timestamp__lte=end).order_by('timestamp')
+    yield from rows.values_list('timestamp', 'value', 'symbol').iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+
+def batch_points(series, start, end):
+    """Raw (timestamp, value) lists for several series from a single query
+
+    series is an iterable of (source_type, symbol) keys. Rows come from one
+    IN query over the union of their source types and symbols and are split
+    per series in Python, dropping combinations nobody asked for. Unlike
+    series_points() this does not fall back to rollups, so windows should
+    stay within raw retention. Series the hot tier covers need no query,
+    and with COMPACT_STORAGE = 'read' the rest come from SeriesPoint.
+    """
+    points = {}
+    hot_tier = get_hot_tier()
+    for source_type, symbol in series:
+        hot = hot_tier.points(start, end, source_type, symbol)
+        if hot is not None:
+            points[(source_type, symbol)] = [(timestamp, value) for timestamp, value, _ in hot]
+    cold = {key: [] for key in series if key not in points}
+    if not cold:
+        return points
+    if compactstore.reads_enabled():
+        points.update(compactstore.batch_points(cold, start, end))
+        return points
+    points.update(cold)
+    rows = DataPoint.objects.filter(
+        source_type__in={source_type for source_type, _ in cold},
+        symbol__in={symbol for _, symbol in cold},
+        timestamp__gte=start,
+        timestamp__lte=end,
+    ).order_by('timestamp').values_list('source_type', 'symbol', 'timestamp', 'value')
+    for source_type, symbol, timestamp, value in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        series_rows = cold.get((source_type, symbol))
+        if series_rows is not None:
+            series_rows.append((timestamp, value))
+    return points
+
+
+def time_axis(start, end, interval):
+    """Bucket starts of interval covering start..end"""
+    step = timedelta(seconds=INTERVALS[interval])
+    bucket = bucket_start(start, interval)
+    axis = []
+    while bucket <= end:
+        axis.append(bucket)
+        bucket += step
+    return axis
+
+
+def align_points(points, axis, interval):
+    """Average time-sorted (timestamp, value) points into the buckets of axis
+
+    Buckets without data are None, so every aligned series has one value
+    per axis entry.
+    """
+    totals = dict.fromkeys(axis)
+    counts = {}
+    for timestamp, value in points:
+        bucket = bucket_start(timestamp, interval)
+        if bucket in totals:
+            totals[bucket] = (totals[bucket] or 0) + value
+            counts[bucket] = counts.get(bucket, 0) + 1
+    return [
+        None if totals[bucket] is None else (totals[bucket] / counts[bucket]).quantize(VALUE_QUANTUM)
+        for bucket in axis
+    ]
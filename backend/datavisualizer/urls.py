@@ -1,12 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DataPointViewSet, DataSourceViewSet, AlertViewSet
+from .views import (
+    DataPointViewSet, DataSourceViewSet, AlertViewSet, ProviderStatusViewSet, SeriesViewSet, AnalyticsViewSet,
+    export_data, stream
+)
 
 router = DefaultRouter()
 router.register(r'datapoints', DataPointViewSet)
 router.register(r'datasources', DataSourceViewSet)
 router.register(r'alerts', AlertViewSet)
+router.register(r'providers', ProviderStatusViewSet, basename='provider')
+router.register(r'series', SeriesViewSet, basename='series')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics')
 
 urlpatterns = [
+    path('api/export/', export_data, name='export-data'),
+    path('api/stream/', stream, name='stream'),
     path('api/', include(router.urls)),
 ] 
\ No newline at end of file
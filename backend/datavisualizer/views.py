@@ -1,21 +1,85 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.cache import cache
 from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
-from .models import DataPoint, DataSource, Alert
+import numpy as np
+from .models import DataPoint, DataSource, Alert, LatestValue, Rollup
 from .serializers import (
     DataPointSerializer, DataSourceSerializer, AlertSerializer,
-    ChartDataSerializer, SummarySerializer
+    ChartDataSerializer, SummarySerializer, RollupSerializer, SeriesBatchSerializer, AggregateQuerySerializer,
+    AnalyticsQuerySerializer
 )
+from . import analytics, downsampling, realtime
+from .asyncviews import AsyncViewSetMixin
+from .deltas import CURSOR_HEADER, DeltaError, Since, acurrent_cursor, delta_rows
+from .exporting import CONTENT_TYPES, ExportError, aiter_chunks, export_chunks, export_rows, parse_window
+from .pagination import TimestampCursorPagination
+from .renderers import ColumnarJSONRenderer, FastJSONRenderer
+from .responsecache import cached_response
+from .rollups import VALUE_QUANTUM, bucket_start
+from .timeseries import align_points, batch_points, series_points, time_axis
+from .services import PROVIDER_STATUS_CACHE_KEY, provider_status_snapshot
 
+# Time-series actions additionally render the compact format=columnar arrays
+CHART_RENDERERS = [FastJSONRenderer, ColumnarJSONRenderer]
 
-class DataPointViewSet(viewsets.ReadOnlyModelViewSet):
+
+def _chart_points(sampled, symbol=None):
+    """Turn downsampled (x, y, payload) tuples into ChartDataSerializer dicts"""
+    chart_data = []
+    for x, y, row in sampled:
+        if row is None:
+            # Bucket averages are synthetic points
+            timestamp = datetime.fromtimestamp(x, tz=dt_timezone.utc)
+            value = Decimal(str(y)).quantize(VALUE_QUANTUM)
+            label = f"{symbol}: {value}" if symbol else str(value)
+        else:
+            timestamp, value, row_symbol = row
+            label = f"{row_symbol}: {value}"
+        chart_data.append({'timestamp': timestamp, 'value': value, 'label': label})
+    return chart_data
+
+
+def _wants_columns(request):
+    return request.accepted_renderer.format == ColumnarJSONRenderer.format
+
+
+def _chart_columns(points, symbol=None):
+    """Parallel arrays for format=columnar from (epoch seconds, value, symbol) tuples
+    
+    Values become floats, which is plenty for drawing and far cheaper to
+    encode and parse than decimal strings.
+    """
+    times = []
+    values = []
+    symbols = []
+    for x, y, row_symbol in points:
+        times.append(round(x * 1000))
+        values.append(float(y))
+        symbols.append(row_symbol)
+    columns = {'t': times, 'v': values}
+    if not symbol:
+        columns['s'] = symbols
+    return columns
+
+
+class DataPointViewSet(AsyncViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """Data points; list, chart_data and summary are async views (see asyncviews.py)"""
     queryset = DataPoint.objects.all()
     serializer_class = DataPointSerializer
+    pagination_class = TimestampCursorPagination
+    # Public data: no per-request session lookup
+    authentication_classes = []
     
     def get_queryset(self):
         queryset = DataPoint.objects.all()
@@ -35,16 +99,101 @@ class DataPointViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset.order_by('-timestamp')
     
-    @action(detail=False, methods=['get'])
-    def chart_data(self, request):
-        """Get formatted data for charts with proper time-series"""
+    async def list(self, request, *args, **kwargs):
+        """List data points, optionally projected to ``fields=a,b,c``
+        
+        A projection reads only the requested columns with values() and
+        renders them through the serializer's own fields, so unused columns
+        such as metadata are neither loaded nor decoded.
+        """
+        fields = request.query_params.get('fields')
+        since = request.query_params.get('since')
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        def render(rows):
+            return self.get_serializer(rows, many=True).data
+        
+        if fields:
+            serializer_fields = self.get_serializer().fields
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+            unknown = [name for name in fields if name not in serializer_fields]
+            if unknown or not fields:
+                return Response(
+                    {'error': f"fields must be chosen from: {', '.join(serializer_fields)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # The cursors need timestamp and id even when they are not requested
+            queryset = queryset.values(*dict.fromkeys(fields + ['timestamp', 'id']))
+            
+            def render(rows):
+                return [
+                    {
+                        name: None if row[name] is None else serializer_fields[name].to_representation(row[name])
+                        for name in fields
+                    }
+                    for row in rows
+                ]
+        
+        if since is None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            return self.get_paginated_response(render(page))
+        
+        # since= returns the rows inserted after it, oldest first, instead of a page
+        try:
+            since = Since.parse(since)
+        except DeltaError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        rows, cursor = await delta_rows(queryset, since, await acurrent_cursor())
+        response = Response(render(rows))
+        response[CURSOR_HEADER] = str(cursor)
+        return response
+    
+    @action(detail=False, methods=['get'], renderer_classes=CHART_RENDERERS)
+    @cached_response
+    async def chart_data(self, request):
+        """Get formatted data for charts with proper time-series
+        
+        Without ``points`` the newest 200 rows are returned as before. With
+        ``points=N`` the whole window is streamed from the database and
+        reduced to about N points using ``method`` (lttb, minmax, min, max
+        or avg), so long windows keep their shape at a bounded payload size.
+        
+        Every response carries a delta cursor in the X-Data-Cursor header.
+        Polling with ``since=<cursor>`` then returns only the raw points
+        inserted since, so a refresh costs the size of the delta.
+        
+        ``format=columnar`` returns ``{"t": [epoch ms], "v": [float]}``
+        (plus ``"s"``, the symbols, unless one symbol was requested) instead
+        of one object per point.
+        """
+        since = request.query_params.get('since')
+        if since is not None:
+            return await self._chart_data_delta(request, since)
+        
+        cursor = await acurrent_cursor()
+        points = request.query_params.get('points')
+        if points is not None:
+            # Reads through the hot tier and downsamples, both synchronous, in the request's thread
+            response = await sync_to_async(self._downsampled_chart_data)(request, points)
+            response[CURSOR_HEADER] = str(cursor)
+            return response
+        
         queryset = self.get_queryset()
         
+        if _wants_columns(request):
+            rows = [row async for row in queryset.values_list('timestamp', 'value', 'symbol')[:200]]
+            rows.reverse()
+            response = Response(_chart_columns(
+                ((timestamp.timestamp(), value, symbol) for timestamp, value, symbol in rows),
+                request.query_params.get('symbol')
+            ))
+            response[CURSOR_HEADER] = str(cursor)
+            return response
+        
         # Get more data points for better charts (up to 200 points)
         chart_data = []
-        data_points = queryset[:200]
-        
-        for data_point in data_points:
+        async for data_point in queryset[:200]:
             chart_data.append({
                 'timestamp': data_point.timestamp.isoformat(),
                 'value': str(data_point.value),
@@ -55,61 +204,152 @@ class DataPointViewSet(viewsets.ReadOnlyModelViewSet):
         chart_data.sort(key=lambda x: x['timestamp'])
         
         serializer = ChartDataSerializer(chart_data, many=True)
+        response = Response(serializer.data)
+        response[CURSOR_HEADER] = str(cursor)
+        return response
+    
+    async def _chart_data_delta(self, request, since):
+        try:
+            since = Since.parse(since)
+        except DeltaError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset().values('id', 'timestamp', 'value', 'symbol')
+        rows, cursor = await delta_rows(queryset, since, await acurrent_cursor())
+        rows.sort(key=lambda row: row['timestamp'])
+        if _wants_columns(request):
+            response = Response(_chart_columns(
+                ((row['timestamp'].timestamp(), row['value'], row['symbol']) for row in rows),
+                request.query_params.get('symbol')
+            ))
+            response[CURSOR_HEADER] = str(cursor)
+            return response
+        
+        chart_data = [
+            {'timestamp': row['timestamp'], 'value': row['value'], 'label': f"{row['symbol']}: {row['value']}"}
+            for row in rows
+        ]
+        
+        serializer = ChartDataSerializer(chart_data, many=True)
+        response = Response(serializer.data)
+        response[CURSOR_HEADER] = str(cursor)
+        return response
+    
+    def _downsampled_chart_data(self, request, points):
+        method = request.query_params.get('method', 'lttb')
+        try:
+            points = int(points)
+        except ValueError:
+            return Response({'error': 'points must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({'error': 'hours must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if hours < 1:
+            return Response({'error': 'hours must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 2 <= points <= downsampling.MAX_POINTS:
+            return Response(
+                {'error': f"points must be between 2 and {downsampling.MAX_POINTS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if method not in downsampling.METHODS:
+            return Response(
+                {'error': f"method must be one of: {', '.join(downsampling.METHODS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        end = timezone.now()
+        start = end - timedelta(hours=hours)
+        source_type = request.query_params.get('source_type')
+        symbol = request.query_params.get('symbol')
+        # Reads across raw points and rollups so compacted history still charts
+        rows = series_points(start, end, source_type, symbol)
+        series = (
+            (timestamp.timestamp(), float(value), (timestamp, value, row_symbol))
+            for timestamp, value, row_symbol in rows
+        )
+        sampled = downsampling.downsample(series, points, method, start.timestamp(), end.timestamp())
+        
+        if _wants_columns(request):
+            return Response(_chart_columns(
+                ((x, y, symbol if row is None else row[2]) for x, y, row in sampled), symbol
+            ))
+        serializer = ChartDataSerializer(_chart_points(sampled, symbol), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
-    def summary(self, request):
-        """Get summary data for dashboard"""
-        summaries = []
+    def aggregate(self, request):
+        """Get OHLC/avg/count buckets at interval=1m|5m|1h|1d
         
-        # Get unique source_type and symbol combinations
-        unique_combinations = DataPoint.objects.values('source_type', 'symbol').distinct()
+        Reads the Rollup table that ingestion keeps current, so the cost
+        depends on the number of buckets in the window, not on raw rows.
+        """
+        serializer = AggregateQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        query = serializer.validated_data
+        interval = query['interval']
         
-        for combo in unique_combinations:
-            source_type = combo['source_type']
-            symbol = combo['symbol']
-            
-            # Get latest data point
-            latest = DataPoint.objects.filter(
-                source_type=source_type, symbol=symbol
-            ).first()
-            
-            if not latest:
-                continue
-            
-            # Get 24h ago data point for change calculation
-            time_24h_ago = timezone.now() - timedelta(hours=24)
-            old_data = DataPoint.objects.filter(
-                source_type=source_type,
-                symbol=symbol,
-                timestamp__lte=time_24h_ago
-            ).first()
-            
+        queryset = Rollup.objects.filter(
+            interval=interval,
+            bucket__gte=bucket_start(timezone.now() - timedelta(hours=query['hours']), interval),
+        )
+        if query.get('source_type'):
+            queryset = queryset.filter(source_type=query['source_type'])
+        if query.get('symbol'):
+            queryset = queryset.filter(symbol=query['symbol'])
+        
+        serializer = RollupSerializer(queryset.order_by('source_type', 'symbol', 'bucket'), many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    async def summary(self, request):
+        """Get summary data for dashboard
+        
+        Served from the LatestValue table that ingestion keeps current, so
+        this is a single query however many series and points exist.
+        
+        With ``since=<cursor>`` only series that received points since are
+        returned, with the next cursor in the X-Data-Cursor header; clients
+        start from ``since=0``.
+        """
+        queryset = LatestValue.objects.all()
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = Since.parse(since)
+            except DeltaError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            cursor = await acurrent_cursor()
+            queryset = queryset.filter(await since.changed_series())
+        
+        summaries = []
+        
+        async for latest in queryset:
             change_24h = None
             change_24h_percent = None
             
-            if old_data:
-                change_24h = latest.value - old_data.value
-                if old_data.value != 0:
-                    change_24h_percent = (change_24h / old_data.value) * 100
-            
-            # Count total data points
-            total_points = DataPoint.objects.filter(
-                source_type=source_type, symbol=symbol
-            ).count()
+            if latest.reference_value is not None:
+                change_24h = latest.value - latest.reference_value
+                if latest.reference_value != 0:
+                    change_24h_percent = (change_24h / latest.reference_value) * 100
             
             summaries.append({
-                'source_type': source_type,
-                'symbol': symbol,
+                'source_type': latest.source_type,
+                'symbol': latest.symbol,
                 'current_value': latest.value,
                 'change_24h': change_24h,
                 'change_24h_percent': change_24h_percent,
                 'last_updated': latest.timestamp,
-                'total_data_points': total_points
+                'total_data_points': latest.data_points
             })
         
         serializer = SummarySerializer(summaries, many=True)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        if since is not None:
+            response[CURSOR_HEADER] = str(cursor)
+        return response
 
 
 class DataSourceViewSet(viewsets.ModelViewSet):
@@ -150,3 +390,264 @@ class AlertViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         
         return queryset
+
+
+class ProviderStatusViewSet(viewsets.ViewSet):
+    """Quota usage and health counters for upstream API providers"""
+    
+    def list(self, request):
+        # Prefer the snapshot published by the collector process
+        snapshot = cache.get(PROVIDER_STATUS_CACHE_KEY)
+        if snapshot is None:
+            snapshot = provider_status_snapshot()
+        return Response(snapshot)
+
+
+class SeriesViewSet(viewsets.ViewSet):
+    """Charts for several series in one request"""
+    
+    @action(detail=False, methods=['post'], renderer_classes=CHART_RENDERERS)
+    def batch(self, request):
+        """Chart data for a list of {source_type, symbol, hours, points, method} specs
+        
+        Every series is read by one query and split in Python, so a
+        dashboard costs one round trip instead of one per chart. Each series
+        is downsampled on its own, unless ``align`` names an interval
+        (1m|5m|1h|1d): then all series are averaged onto one shared time
+        axis, returned once as ``timestamps``, and each series carries a
+        ``values`` list with one entry (or null) per timestamp.
+        
+        With ``format=columnar`` each series carries ``t``/``v`` arrays as
+        in chart_data, and an aligned axis is returned once as ``t``.
+        """
+        serializer = SeriesBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        specs = serializer.validated_data['series']
+        align = serializer.validated_data.get('align')
+        
+        end = timezone.now()
+        starts = [end - timedelta(hours=spec['hours']) for spec in specs]
+        axis = None
+        if align:
+            axis = time_axis(min(starts), end, align)
+            if len(axis) > downsampling.MAX_POINTS:
+                return Response(
+                    {'error': f"align={align} gives more than {downsampling.MAX_POINTS} buckets"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        points = batch_points({(spec['source_type'], spec['symbol']) for spec in specs}, min(starts), end)
+        
+        columnar = _wants_columns(request)
+        results = []
+        for spec, start in zip(specs, starts):
+            rows = points[(spec['source_type'], spec['symbol'])]
+            # Rows are time-sorted, so a series with a shorter window is a suffix
+            rows = rows[bisect_left(rows, start, key=lambda row: row[0]):]
+            result = {'source_type': spec['source_type'], 'symbol': spec['symbol'], 'hours': spec['hours']}
+            if axis is not None:
+                values = align_points(rows, axis, align)
+                if columnar:
+                    result['v'] = [None if value is None else float(value) for value in values]
+                else:
+                    # Strings like every other value in the API, null for empty buckets
+                    result['values'] = [None if value is None else str(value) for value in values]
+            else:
+                series = (
+                    (timestamp.timestamp(), float(value), (timestamp, value, spec['symbol']))
+                    for timestamp, value in rows
+                )
+                sampled = downsampling.downsample(
+                    series, spec['points'], spec['method'], start.timestamp(), end.timestamp()
+                )
+                if columnar:
+                    result.update(_chart_columns(((x, y, None) for x, y, _ in sampled), spec['symbol']))
+                else:
+                    result['data'] = ChartDataSerializer(_chart_points(sampled, spec['symbol']), many=True).data
+            results.append(result)
+        
+        response = {'series': results}
+        if axis is not None and columnar:
+            response = {'t': [round(bucket.timestamp() * 1000) for bucket in axis], 'series': results}
+        elif axis is not None:
+            response = {'timestamps': axis, 'series': results}
+        return Response(response)
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """Statistics comparing series, computed with NumPy over a common time grid
+    
+    Every action takes ``source_type``, ``symbols`` (comma-separated),
+    ``hours`` and ``interval`` (1m|5m|1h|1d, by default the finest giving
+    at most 1000 buckets). All matching series are read from the rollups
+    in one query and forward-filled over empty buckets (see analytics.py).
+    Responses are cached per data version like chart_data.
+    """
+    
+    def _grid(self, request):
+        """(query, keys, axis, forward-filled values) for a request, or an error Response"""
+        serializer = AnalyticsQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        query = serializer.validated_data
+        
+        end = timezone.now()
+        start = end - timedelta(hours=query['hours'])
+        query.setdefault('interval', analytics.default_interval(start, end))
+        if analytics.bucket_count(start, end, query['interval']) > analytics.MAX_BUCKETS:
+            return Response(
+                {'error': f"interval={query['interval']} gives more than {analytics.MAX_BUCKETS} buckets"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        keys, axis, values = analytics.load_grid(
+            start, end, query['interval'], query.get('source_type'), query.get('symbols')
+        )
+        return query, keys, axis, analytics.fill_forward(values)
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def rolling(self, request):
+        """Rolling mean and standard deviation over ``window`` buckets (default 24)"""
+        grid = self._grid(request)
+        if isinstance(grid, Response):
+            return grid
+        query, keys, axis, values = grid
+        
+        mean, std = analytics.rolling_mean_std(values, query['window'])
+        return Response({
+            'interval': query['interval'],
+            'window': query['window'],
+            'timestamps': axis,
+            'series': [
+                {'source_type': source_type, 'symbol': symbol, 'mean': series_mean, 'std': series_std}
+                for (source_type, symbol), series_mean, series_std
+                in zip(keys, analytics.to_list(mean), analytics.to_list(std))
+            ],
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def returns(self, request):
+        """Returns, drawdown and volatility per series
+        
+        ``returns`` and ``drawdown`` have one entry per timestamp. The
+        summary figures cover the whole window: ``volatility`` is the
+        standard deviation of the interval returns and
+        ``annualized_volatility`` scales it to a year.
+        """
+        grid = self._grid(request)
+        if isinstance(grid, Response):
+            return grid
+        query, keys, axis, values = grid
+        
+        returns = analytics.returns(values)
+        drawdown = analytics.drawdown(values)
+        volatility = analytics.nan_std(returns)
+        summary = np.stack([
+            analytics.total_return(values),
+            volatility,
+            volatility * analytics.annualization(query['interval']),
+            np.fmin.reduce(drawdown, axis=1),
+        ], axis=1)
+        return Response({
+            'interval': query['interval'],
+            'timestamps': axis,
+            'series': [
+                {
+                    'source_type': source_type,
+                    'symbol': symbol,
+                    'total_return': total_return,
+                    'volatility': series_volatility,
+                    'annualized_volatility': annualized_volatility,
+                    'max_drawdown': max_drawdown,
+                    'returns': series_returns,
+                    'drawdown': series_drawdown,
+                }
+                for (source_type, symbol), (total_return, series_volatility, annualized_volatility, max_drawdown),
+                series_returns, series_drawdown
+                in zip(keys, analytics.to_list(summary), analytics.to_list(returns), analytics.to_list(drawdown))
+            ],
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def correlation(self, request):
+        """Correlation matrix of the interval returns of every matching series
+        
+        ``matrix[i][j]`` correlates ``series[i]`` with ``series[j]`` over
+        the buckets both have data for, null with fewer than 3 of them or
+        when either series is flat.
+        """
+        grid = self._grid(request)
+        if isinstance(grid, Response):
+            return grid
+        query, keys, axis, values = grid
+        
+        return Response({
+            'interval': query['interval'],
+            'series': [{'source_type': source_type, 'symbol': symbol} for source_type, symbol in keys],
+            'matrix': analytics.to_list(analytics.correlation(analytics.returns(values))),
+        })
+
+
+@require_GET
+async def stream(request):
+    """Push newly ingested data points as Server-Sent Events
+    
+    Filters with ``source_type`` and ``symbol``. ``since`` (or the
+    Last-Event-ID header an EventSource sends when it reconnects) replays
+    the points stored after that cursor first. Each connection is an async
+    generator, so this must be served by the ASGI application.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI an endless async stream would tie up a worker for good
+        return JsonResponse({'error': 'streaming needs the ASGI server; poll with since= instead'}, status=501)
+    
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    if since is not None:
+        try:
+            since = Since.parse(since)
+        except DeltaError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    
+    subscription = realtime.layer.subscribe(request.GET.get('source_type'), request.GET.get('symbol'))
+    realtime.relay.ensure_running()
+    response = StreamingHttpResponse(realtime.event_stream(subscription, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+def export_data(request):
+    """Stream a filtered window of raw data points as NDJSON, CSV, Arrow or Parquet
+    
+    A plain Django view rather than a DRF action: rows go straight from a
+    database cursor to the response without serializers, and DRF would
+    claim the ``format`` query parameter for content negotiation.
+    """
+    file_format = request.GET.get('format', 'ndjson')
+    if file_format not in CONTENT_TYPES:
+        return JsonResponse({'error': f"format must be one of: {', '.join(CONTENT_TYPES)}"}, status=400)
+    
+    try:
+        start, end = parse_window(request.GET.get('start'), request.GET.get('end'), request.GET.get('hours'))
+    except ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    rows = export_rows(request.GET.get('source_type'), request.GET.get('symbol'), start, end)
+    try:
+        chunks = export_chunks(file_format, rows)
+    except ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if isinstance(request, ASGIRequest):
+        # Streamed a chunk at a time; a sync iterator would be read whole first
+        chunks = aiter_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[file_format])
+    extension = 'arrows' if file_format == 'arrow' else file_format
+    response['Content-Disposition'] = f'attachment; filename="datapoints.{extension}"'
+    return response
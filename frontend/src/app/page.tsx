@@ -1,13 +1,33 @@
 'use client';
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { RefreshCw, Activity, TrendingUp, Database, ArrowLeftRight } from 'lucide-react';
 import DataChart from '@/components/dashboard/DataChart';
 import SummaryCard from '@/components/dashboard/SummaryCard';
 import ComparisonView from '@/components/dashboard/ComparisonView';
-import { apiService, SummaryData, ChartData } from '@/lib/api';
+import { apiService, SummaryData, ChartData, StreamedPoint } from '@/lib/api';
+
+// Replace updated series in place and add new ones
+const mergeSummary = (current: SummaryData[], changed: SummaryData[]) => {
+  const key = (row: SummaryData) => `${row.source_type}:${row.symbol}`;
+  const updates = new Map(changed.map(row => [key(row), row]));
+  const merged = current.map(row => updates.get(key(row)) ?? row);
+  const known = new Set(current.map(key));
+  return [...merged, ...changed.filter(row => !known.has(key(row)))];
+};
+
+// Append new points, dropping duplicates and points that left the window
+const pointKey = (point: ChartData) => `${new Date(point.timestamp).getTime()}|${point.label.split(':')[0]}`;
+
+const mergeChart = (current: ChartData[], added: ChartData[], hours: number) => {
+  const cutoff = Date.now() - hours * 60 * 60 * 1000;
+  const seen = new Set(current.map(pointKey));
+  return [...current, ...added.filter(point => !seen.has(pointKey(point)))]
+    .filter(point => new Date(point.timestamp).getTime() >= cutoff)
+    .sort((a, b) => new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime());
+};
 
 export default function Dashboard() {
   const [summaryData, setSummaryData] = useState<SummaryData[]>([]);
@@ -18,37 +38,27 @@ export default function Dashboard() {
   const [lastUpdated, setLastUpdated] = useState<Date>(new Date());
   const [isComparisonMode, setIsComparisonMode] = useState(false);
 
-  const fetchData = async () => {
+  // Delta cursors from the last responses; null forces a full fetch
+  const summaryCursor = useRef<string | null>(null);
+  const chartCursor = useRef<string | null>(null);
+
+  const fetchData = async (incremental = false) => {
     try {
       setLoading(true);
       
-      // Fetch summary data
-      const summary = await apiService.getSummary();
-      
-      // Deduplicate summary data based on source_type and symbol combination
-      const deduplicatedSummary = summary.reduce((acc: SummaryData[], current) => {
-        const existingIndex = acc.findIndex(
-          item => item.source_type === current.source_type && item.symbol === current.symbol
-        );
-        
-        if (existingIndex === -1) {
-          acc.push(current);
-        } else {
-          // Keep the one with the most recent timestamp
-          const existing = acc[existingIndex];
-          if (new Date(current.last_updated) > new Date(existing.last_updated)) {
-            acc[existingIndex] = current;
-          }
-        }
-        
-        return acc;
-      }, []);
-      
-      setSummaryData(deduplicatedSummary);
+      // Fetch summary data (one row per source_type/symbol); polls only get series with new points
+      const summarySince = incremental && summaryCursor.current ? summaryCursor.current : '0';
+      const summary = await apiService.getSummary({ since: summarySince });
+      summaryCursor.current = summary.cursor;
+      if (summarySince === '0') {
+        setSummaryData(summary.data);
+      } else if (summary.data.length) {
+        setSummaryData(prev => mergeSummary(prev, summary.data));
+      }
 
       // Fetch chart data based on selection (only if not in comparison mode)
       if (!isComparisonMode) {
-        const chartParams: any = { hours: 24 };
+        const chartParams: any = { hours: 24, points: 500, method: 'lttb' };
         if (selectedSource !== 'all') {
           chartParams.source_type = selectedSource;
         }
@@ -56,8 +66,19 @@ export default function Dashboard() {
           chartParams.symbol = selectedSymbol;
         }
 
-        const chart = await apiService.getChartData(chartParams);
-        setChartData(chart);
+        if (incremental && chartCursor.current) {
+          // Deltas are raw points, so no downsampling parameters
+          const { points, method, ...deltaParams } = chartParams;
+          const delta = await apiService.getChartData({ ...deltaParams, since: chartCursor.current });
+          if (delta.data.length) {
+            setChartData(prev => mergeChart(prev, delta.data, 24));
+          }
+          chartCursor.current = delta.cursor;
+        } else {
+          const chart = await apiService.getChartData(chartParams);
+          setChartData(chart.data);
+          chartCursor.current = chart.cursor;
+        }
       }
       
       setLastUpdated(new Date());
@@ -72,9 +93,34 @@ export default function Dashboard() {
     fetchData();
   }, [selectedSource, selectedSymbol, isComparisonMode]);
 
-  // Auto-refresh every 5 minutes
+  // Live updates pushed by the server; polling below remains as a fallback
+  useEffect(() => {
+    if (isComparisonMode) {
+      return;
+    }
+    const source = apiService.openStream({
+      source_type: selectedSource !== 'all' ? selectedSource : undefined,
+      symbol: selectedSymbol !== 'all' ? selectedSymbol : undefined,
+      since: chartCursor.current ?? undefined,
+    });
+    source.addEventListener('datapoints', (event) => {
+      const points: StreamedPoint[] = JSON.parse((event as MessageEvent).data);
+      setChartData(prev => mergeChart(prev, points.map(point => ({
+        timestamp: point.timestamp,
+        value: point.value,
+        label: `${point.symbol}: ${point.value}`,
+      })), 24));
+      chartCursor.current = (event as MessageEvent).lastEventId || chartCursor.current;
+      setLastUpdated(new Date());
+    });
+    // The server dropped events we were too slow to read; catch up through the delta API
+    source.addEventListener('resync', () => fetchData(true));
+    return () => source.close();
+  }, [selectedSource, selectedSymbol, isComparisonMode]);
+
+  // Auto-refresh every 5 minutes, fetching only what arrived since the last response
   useEffect(() => {
-    const interval = setInterval(fetchData, 5 * 60 * 1000);
+    const interval = setInterval(() => fetchData(true), 5 * 60 * 1000);
     return () => clearInterval(interval);
   }, [selectedSource, selectedSymbol, isComparisonMode]);
 
@@ -137,7 +183,7 @@ export default function Dashboard() {
               <ArrowLeftRight className="h-4 w-4 mr-2" />
               Compare
             </Button>
-            <Button onClick={fetchData} disabled={loading} size="sm">
+            <Button onClick={() => fetchData()} disabled={loading} size="sm">
               <RefreshCw className={`h-4 w-4 mr-2 ${loading ? 'animate-spin' : ''}`} />
               Refresh
             </Button>
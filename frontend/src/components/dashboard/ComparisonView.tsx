@@ -48,21 +48,14 @@ const ComparisonView: React.FC<ComparisonViewProps> = ({ summaryData, onBackToNo
       
       setLoading(true);
       try {
-        const [leftData, rightData] = await Promise.all([
-          apiService.getChartData({
-            source_type: leftSelection.source_type,
-            symbol: leftSelection.symbol,
-            hours: 24
-          }),
-          apiService.getChartData({
-            source_type: rightSelection.source_type,
-            symbol: rightSelection.symbol,
-            hours: 24
-          })
+        // One round trip for both sides
+        const { series } = await apiService.getSeriesBatch([
+          { ...leftSelection, hours: 24, points: 500 },
+          { ...rightSelection, hours: 24, points: 500 }
         ]);
         
-        setLeftChartData(leftData);
-        setRightChartData(rightData);
+        setLeftChartData(series[0].data ?? []);
+        setRightChartData(series[1].data ?? []);
       } catch (error) {
         console.error('Error fetching comparison data:', error);
       } finally {
@@ -25,6 +25,45 @@ export interface ChartData {
   label: string;
 }
 
+export interface SeriesSpec {
+  source_type: string;
+  symbol: string;
+  hours?: number;
+  points?: number;
+  method?: 'lttb' | 'minmax' | 'min' | 'max' | 'avg';
+}
+
+export interface SeriesBatchResult {
+  timestamps?: string[];
+  series: Array<{
+    source_type: string;
+    symbol: string;
+    hours: number;
+    data?: ChartData[];
+    values?: Array<string | null>;
+  }>;
+}
+
+// chart_data?format=columnar: epoch ms, float values and, unless one symbol was asked for, symbols
+interface ChartColumns {
+  t: number[];
+  v: number[];
+  s?: string[];
+}
+
+const fromColumns = (columns: ChartColumns, symbol?: string): ChartData[] =>
+  columns.t.map((t, i) => ({
+    timestamp: new Date(t).toISOString(),
+    value: String(columns.v[i]),
+    label: `${columns.s ? columns.s[i] : symbol}: ${columns.v[i]}`,
+  }));
+
+// Response body plus the X-Data-Cursor to pass as `since` on the next poll
+export interface WithCursor<T> {
+  data: T;
+  cursor: string | null;
+}
+
 export interface SummaryData {
   source_type: string;
   symbol: string;
@@ -47,13 +86,24 @@ export interface Alert {
   created_at: string;
 }
 
+export interface StreamedPoint {
+  id: number;
+  timestamp: string;
+  source_type: string;
+  symbol: string;
+  value: string;
+}
+
 export const apiService = {
   // Data Points
   getDataPoints: async (params?: {
     source_type?: string;
     symbol?: string;
     hours?: number;
-  }): Promise<{ results: DataPoint[] }> => {
+    cursor?: string;
+    page_size?: number;
+    fields?: string;
+  }): Promise<{ next: string | null; results: DataPoint[] }> => {
     const response = await api.get('/api/datapoints/', { params });
     return response.data;
   },
@@ -62,16 +112,35 @@ export const apiService = {
     source_type?: string;
     symbol?: string;
     hours?: number;
-  }): Promise<ChartData[]> => {
-    const response = await api.get('/api/datapoints/chart_data/', { params });
-    return response.data;
+    points?: number;
+    method?: 'lttb' | 'minmax' | 'min' | 'max' | 'avg';
+    since?: string;
+  }): Promise<WithCursor<ChartData[]>> => {
+    // The columnar format is several times smaller and cheaper to encode than one object per point
+    const response = await api.get('/api/datapoints/chart_data/', { params: { ...params, format: 'columnar' } });
+    return { data: fromColumns(response.data, params?.symbol), cursor: response.headers['x-data-cursor'] ?? null };
   },
 
-  getSummary: async (): Promise<SummaryData[]> => {
-    const response = await api.get('/api/datapoints/summary/');
+  // All series in one request; with align they share the returned timestamps
+  getSeriesBatch: async (series: SeriesSpec[], align?: '1m' | '5m' | '1h' | '1d'): Promise<SeriesBatchResult> => {
+    const response = await api.post('/api/series/batch/', { series, align });
     return response.data;
   },
 
+  // since='0' returns every series; a cursor returns only series with new points
+  getSummary: async (params?: { since?: string }): Promise<WithCursor<SummaryData[]>> => {
+    const response = await api.get('/api/datapoints/summary/', { params });
+    return { data: response.data, cursor: response.headers['x-data-cursor'] ?? null };
+  },
+
+  // Server-Sent Events of new points; the browser resumes from Last-Event-ID on reconnect
+  openStream: (params?: { source_type?: string; symbol?: string; since?: string }): EventSource => {
+    const query = new URLSearchParams(
+      Object.entries(params ?? {}).filter(([, value]) => value) as [string, string][]
+    );
+    return new EventSource(`${API_BASE_URL}/api/stream/?${query}`);
+  },
+
   // Alerts
   getAlerts: async (params?: {
     source_type?: string;